@@ -1,14 +1,32 @@
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 class Settings:
-    STORAGE_BASE_PATH = "app/storage"
-    UPLOADS_PATH = "app/storage/uploads"
-    THUMBNAILS_PATH = "app/storage/thumbs"
-    RESULTS_PATH = "app/storage/results"
+    STORAGE_BASE_PATH = os.getenv("STORAGE_PATH", "app/storage")
+    UPLOADS_PATH = f"{STORAGE_BASE_PATH}/uploads"
+    THUMBNAILS_PATH = f"{STORAGE_BASE_PATH}/thumbs"
+    RESULTS_PATH = f"{STORAGE_BASE_PATH}/results"
+    CACHE_PATH = f"{STORAGE_BASE_PATH}/cache"
+    WEIGHT_PROFILES_PATH = f"{STORAGE_BASE_PATH}/weight_profiles.json"
+    JOBS_DB_PATH = f"{STORAGE_BASE_PATH}/jobs.sqlite3"
+    PROFILES_PATH = f"{STORAGE_BASE_PATH}/profiles"
     
     THUMBNAIL_MAX_SIZE = 512
+    THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "4"))
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    EXPORT_CHUNK_SIZE = 1024 * 1024
     ANALYSIS_MAX_SIZE = 1600
+    # Longest side each scorer works at, taken from the analysis image pyramid; None uses ANALYSIS_MAX_SIZE.
+    # Duplicate groups change below full size (benchmarks/drift.py), so duplicate stays at None.
+    SCORER_MAX_SIZE: Dict[str, Optional[int]] = {
+        "sharpness": None,
+        "composition": 800,
+        "emotion": None,
+        "action": None,
+        "duplicate": None
+    }
+    FAST_JPEG_DECODE = True
+    USE_EMBEDDED_PREVIEWS = True
     
     SCORING_WEIGHTS: Dict[str, float] = {
         "sharpness": 0.35,
@@ -26,12 +44,65 @@ class Settings:
         "enable_clustering": False,
         "enable_hash_comparison": True,
         "enable_feature_comparison": True,
-        "min_duplicate_similarity": 0.99
+        "min_duplicate_similarity": 0.99,
+        "feature_block_mb": 64,
+        # Compare images only within and across adjacent capture-time windows (see pipeline/bursts.py).
+        "enable_time_windows": True,
+        "burst_gap_seconds": 2.0,
+        "max_sequence_gap": 3,
+        "max_window_size": 64,
+        "batch_size": 8,
+        # "ultralytics" or "onnx"; onnx needs the optional onnxruntime package (requirements.txt).
+        "detector_backend": os.getenv("DUPLICATE_DETECTOR_BACKEND", "ultralytics"),
+        "detector_weights": "yolov8n.pt",
+        "onnx_model_path": os.getenv("DUPLICATE_DETECTOR_ONNX_MODEL", "yolov8n.onnx"),
+        "detector_conf": 0.25,
+        "detector_iou": 0.7
+    }
+    
+    TRIAGE = {
+        "enabled": os.getenv("TRIAGE_ENABLED", "false").lower() == "true",
+        "size": 256,
+        "min_brightness": 12.0,
+        "max_brightness": 245.0,
+        "min_laplacian_variance": 15.0
     }
     
-    MAX_WORKERS = 2
+    WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+    RESULTS_CACHE_SIZE = 8
+    RESULTS_PAGE_MAX_LIMIT = 500
+    ENABLE_MEASUREMENT_CACHE = os.getenv("ENABLE_MEASUREMENT_CACHE", "true").lower() == "true"
+    MEASUREMENT_CACHE_MAX_MB = int(os.getenv("MEASUREMENT_CACHE_MAX_MB", "1024"))
+    MEASUREMENT_CACHE_MAX_AGE_DAYS = float(os.getenv("MEASUREMENT_CACHE_MAX_AGE_DAYS", "90"))
+    MEASUREMENT_CACHE_PRUNE_INTERVAL_SECONDS = 3600.0
+    
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "2"))
+    ANALYSIS_MEMORY_LIMIT_MB = int(os.getenv("ANALYSIS_MEMORY_LIMIT_MB", "2048"))
+    
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_SECONDS = 2.0
+    JOB_HEARTBEAT_SECONDS = 10.0
+    JOB_STALE_SECONDS = 60.0
+    JOB_PROGRESS_INTERVAL_SECONDS = 0.5
+    JOB_CANCEL_POLL_SECONDS = 1.0
+    JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "32"))
+    JOB_EVENTS_POLL_SECONDS = 0.5
+    JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
+    PROFILE_INTERVAL_SECONDS = 0.01
     
     SUPPORTED_FORMATS = {".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".webp"}
+    SUPPORTED_VIDEO_FORMATS = {".mp4", ".mov", ".m4v", ".avi", ".mkv", ".webm"}
+    
+    # Frames sampled from uploaded videos: at most one every `interval_seconds` unless a
+    # cut is detected, and only if it differs from the last kept frame (hash bits of 64).
+    VIDEO_SAMPLING = {
+        "interval_seconds": float(os.getenv("VIDEO_SAMPLE_INTERVAL_SECONDS", "0.5")),
+        "check_interval_seconds": 0.1,
+        "min_hash_distance": 4,
+        "scene_threshold": 20,
+        "max_frames": int(os.getenv("VIDEO_MAX_FRAMES", "3000")),
+        "jpeg_quality": 95
+    }
     
     def __init__(self):
         os.makedirs(self.UPLOADS_PATH, exist_ok=True)
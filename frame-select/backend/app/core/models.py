@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from pydantic import BaseModel
 
 class UploadResponse(BaseModel):
@@ -15,6 +15,9 @@ class JobStatus(BaseModel):
     progress: float
     upload_id: str
     error: Optional[str] = None
+    priority: int = 0
+    timings: Dict[str, float] = {}
+    profile: bool = False
 
 class ImageScore(BaseModel):
     image_id: str
@@ -30,9 +33,18 @@ class DuplicateGroup(BaseModel):
     count: int
     recommended_keep: Optional[str] = None
 
+class DuplicateBurst(BaseModel):
+    burst_id: int
+    images: List[str]
+    count: int
+    source: str
+    start: Optional[float] = None
+    end: Optional[float] = None
+
 class DuplicateReport(BaseModel):
     summary: Dict
     groups: List[DuplicateGroup]
+    bursts: List[DuplicateBurst] = []
     recommendations: List[str]
 
 class ResultsResponse(BaseModel):
@@ -41,6 +53,23 @@ class ResultsResponse(BaseModel):
     metadata: Optional[Dict] = None
     duplicate_report: Optional[DuplicateReport] = None
 
+class ResultsPage(BaseModel):
+    upload_id: str
+    total: int
+    offset: int
+    limit: int
+    images: List[Dict[str, Any]]
+    partial: bool = False
+
+class RerankRequest(BaseModel):
+    weights: Optional[Dict[str, float]] = None
+    profile: Optional[str] = None
+    save_as: Optional[str] = None
+
+class WeightProfile(BaseModel):
+    name: str
+    weights: Dict[str, float]
+
 class ScoringResult(BaseModel):
     score: float
     tags: List[str]
\ No newline at end of file
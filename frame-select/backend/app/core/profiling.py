@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+from core.config import settings
+from core.utils import ensure_dir
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a background thread.
+
+    Stacks are aggregated in the collapsed format (`outer;inner;leaf count`) read
+    by flamegraph.pl and speedscope. Sampling only sees Python frames: time in
+    OpenCV or torch shows up under the Python function that called into them.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = settings.PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def write(self, path: str):
+        ensure_dir(os.path.dirname(path))
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+def merge_collapsed(paths: Iterable[str]) -> str:
+    """Sum several collapsed-stack files into one."""
+    samples: Counter = Counter()
+    for path in paths:
+        with open(path, 'r') as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    samples[stack] += int(count)
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
@@ -1,5 +1,7 @@
 import os
+import numpy as np
 from pathlib import Path
+from typing import Any
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
@@ -11,7 +13,19 @@ def is_image_file(filename: str) -> bool:
     from .config import settings
     return get_file_extension(filename) in settings.SUPPORTED_FORMATS
 
+def is_video_file(filename: str) -> bool:
+    from .config import settings
+    return get_file_extension(filename) in settings.SUPPORTED_VIDEO_FORMATS
+
 def safe_filename(filename: str) -> str:
     import re
     safe_name = re.sub(r'[^\w\-_\.]', '_', filename)
-    return safe_name
\ No newline at end of file
+    return safe_name
+
+def json_default(value: Any):
+    """`json.dump` fallback for numpy arrays and scalars."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,23 +1,27 @@
 import os
 import sys
+import glob
 import uuid
 import asyncio
-import threading
-import zipfile
-import tempfile
-from typing import List
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 sys.path.append(os.path.dirname(__file__))
 
 from core.config import settings
-from core.models import UploadResponse, AnalyzeResponse, JobStatus, ResultsResponse
+from core.metrics import REGISTRY, JOBS
+from core.profiling import merge_collapsed
+from core.models import UploadResponse, AnalyzeResponse, JobStatus, ResultsResponse, ResultsPage, RerankRequest, WeightProfile
 from services.storage import StorageService
 from services.analyze import AnalysisService
+from services.job_queue import JobQueue
+from services.job_runner import JobRunner
+from services.job_events import JobEventStream
+from services.export import stream_zip
 
 app = FastAPI(title="Frame Select API", version="1.0.0")
 
@@ -30,14 +34,38 @@ app.add_middleware(
 )
 
 storage_service = StorageService()
-analysis_service = AnalysisService(storage_service)
+# An API-only process (JOB_WORKERS=0) never measures images, so it gets no process pool.
+analysis_service = AnalysisService(storage_service, use_pool=settings.JOB_WORKERS > 0)
+job_queue = JobQueue()
+job_runner = JobRunner(job_queue, analysis_service)
 
-jobs = {}
+@app.on_event("startup")
+def start_analysis_warm_up():
+    job_runner.start(warm_up=settings.WARM_UP_ON_STARTUP)
+
+@app.on_event("shutdown")
+def shutdown_analysis_service():
+    job_runner.stop()
+    analysis_service.shutdown()
+    storage_service.shutdown()
 
 @app.get("/health")
 async def health_check():
     return {"ok": True}
 
+@app.get("/ready")
+async def readiness_check():
+    if not job_runner.ready:
+        raise HTTPException(status_code=503, detail="Analysis pipeline is warming up")
+    return {"ready": True}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Stage and image metrics cover work done in this process; standalone workers record theirs in job timings.
+    for status, count in job_queue.status_counts().items():
+        JOBS.set(count, status=status)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_files(files: List[UploadFile] = File(...)):
     if not files or len(files) == 0:
@@ -54,33 +82,56 @@ async def upload_files(files: List[UploadFile] = File(...)):
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @app.post("/analyze/{upload_id}", response_model=AnalyzeResponse)
-async def analyze_images(upload_id: str, background_tasks: BackgroundTasks):
+def analyze_images(upload_id: str, priority: int = 0, profile: bool = False):
     if not storage_service.upload_exists(upload_id):
         raise HTTPException(status_code=404, detail="Upload ID not found")
     
-    job_id = str(uuid.uuid4())
+    job = job_queue.enqueue(upload_id, storage_service.get_image_files(upload_id), priority, profile=profile)
+    job_runner.notify()
     
-    jobs[job_id] = {
-        "status": "queued",
-        "progress": 0.0,
-        "upload_id": upload_id,
-        "error": None
-    }
+    return AnalyzeResponse(job_id=job["job_id"], upload_id=upload_id, status=job["status"])
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    background_tasks.add_task(run_analysis_job, job_id, upload_id)
+    return JobStatus(**job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    stream = JobEventStream(job_id, job_queue, analysis_service.results_store)
+    return StreamingResponse(
+        stream.events(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/{job_id}/profile", response_class=PlainTextResponse)
+def get_job_profile(job_id: str):
+    paths = sorted(glob.glob(os.path.join(storage_service.get_profiles_dir(job_id), "*.folded")))
+    if not paths:
+        raise HTTPException(status_code=404, detail="No profile recorded. Analyze with ?profile=true.")
     
-    return AnalyzeResponse(job_id=job_id, upload_id=upload_id, status="queued")
+    return PlainTextResponse(merge_collapsed(paths))
 
-@app.get("/jobs/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
-    if job_id not in jobs:
+@app.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+def cancel_job(job_id: str):
+    job = job_queue.request_cancel(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobStatus(**jobs[job_id])
+    return JobStatus(**job)
 
 @app.get("/results/{upload_id}", response_model=ResultsResponse)
-async def get_results(upload_id: str):
+def get_results(upload_id: str, profile: Optional[str] = None):
     try:
+        if profile:
+            return analysis_service.rerank_results(upload_id, profile=profile)
         results = analysis_service.load_results(upload_id)
         return results
     except FileNotFoundError:
@@ -88,6 +139,65 @@ async def get_results(upload_id: str):
             status_code=404, 
             detail="Results not found. Run analysis first."
         )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@app.get("/results/{upload_id}/images", response_model=ResultsPage)
+def query_results(
+    upload_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=settings.RESULTS_PAGE_MAX_LIMIT),
+    sort: str = "rank",
+    order: str = "asc",
+    tags: Optional[List[str]] = Query(None),
+    exclude_tags: Optional[List[str]] = Query(None),
+    min_score: Optional[List[str]] = Query(None, description="name:value, e.g. sharpness:0.6"),
+    max_score: Optional[List[str]] = Query(None, description="name:value, e.g. duplicate:0.5"),
+    fields: Optional[str] = Query(None, description="Comma-separated ImageScore fields; debug_info is omitted by default")
+):
+    try:
+        return analysis_service.query_results(
+            upload_id,
+            offset=offset,
+            limit=limit,
+            sort=sort,
+            order=order,
+            tags=tags,
+            exclude_tags=exclude_tags,
+            min_score=min_score,
+            max_score=max_score,
+            fields=fields.split(",") if fields else None
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, 
+            detail="Results not found. Run analysis first."
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/results/{upload_id}/rerank", response_model=ResultsResponse)
+def rerank_results(upload_id: str, request: RerankRequest):
+    try:
+        return analysis_service.rerank_results(
+            upload_id,
+            weights=request.weights,
+            profile=request.profile,
+            save_as=request.save_as
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, 
+            detail="Results not found. Run analysis first."
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/profiles", response_model=List[WeightProfile])
+async def list_weight_profiles():
+    return analysis_service.weight_profiles.list()
 
 @app.get("/image/{upload_id}/{filename}")
 async def get_image(upload_id: str, filename: str):
@@ -113,7 +223,7 @@ async def export_selected_images(upload_id: str, image_ids: List[str]):
     if not image_ids:
         raise HTTPException(status_code=400, detail="No images selected for export")
     
-    available_images = storage_service.get_image_files(upload_id)
+    available_images = set(storage_service.get_image_files(upload_id))
     invalid_images = [img for img in image_ids if img not in available_images]
     if invalid_images:
         raise HTTPException(
@@ -121,52 +231,17 @@ async def export_selected_images(upload_id: str, image_ids: List[str]):
             detail=f"Images not found: {', '.join(invalid_images)}"
         )
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-        temp_zip_path = temp_zip.name
+    files = [
+        (storage_service.get_image_path(upload_id, image_id), image_id)
+        for image_id in dict.fromkeys(image_ids)
+    ]
+    zip_filename = f"frame_select_export_{upload_id[:8]}_{len(files)}_images.zip"
     
-    try:
-        with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for image_id in image_ids:
-                image_path = storage_service.get_image_path(upload_id, image_id)
-                if os.path.exists(image_path):
-                    zip_file.write(image_path, image_id)
-        
-        zip_filename = f"frame_select_export_{upload_id[:8]}_{len(image_ids)}_images.zip"
-        
-        return FileResponse(
-            path=temp_zip_path,
-            filename=zip_filename,
-            media_type='application/zip',
-            background=BackgroundTasks().add_task(cleanup_temp_file, temp_zip_path)
-        )
-        
-    except Exception as e:
-        if os.path.exists(temp_zip_path):
-            os.unlink(temp_zip_path)
-        raise HTTPException(status_code=500, detail=f"Failed to create ZIP: {str(e)}")
-
-def cleanup_temp_file(file_path: str):
-    try:
-        if os.path.exists(file_path):
-            os.unlink(file_path)
-    except Exception as e:
-        print(f"Failed to cleanup temp file {file_path}: {e}")
-
-def run_analysis_job(job_id: str, upload_id: str):
-    try:
-        jobs[job_id]["status"] = "running"
-        
-        def progress_callback(progress: float):
-            jobs[job_id]["progress"] = progress
-        
-        analysis_service.analyze_upload(upload_id, progress_callback)
-        
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["progress"] = 1.0
-        
-    except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+    return StreamingResponse(
+        stream_zip(files),
+        media_type='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
+    )
 
 if __name__ == "__main__":
     uvicorn.run(
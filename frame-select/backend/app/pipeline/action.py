@@ -1,13 +1,18 @@
 import cv2
 import numpy as np
+from typing import Optional
 from core.models import ScoringResult
+from pipeline.context import ImageContext
 
 class ActionScorer:
+    VERSION = 1
+    
     def __init__(self):
         self.motion_threshold = 0.15
         
-    def detect_motion_blur(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def detect_motion_blur(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
+        gray = context.gray
         
         grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
         grad_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
@@ -16,8 +21,8 @@ class ActionScorer:
         kernel_h = np.array([[-1, -1, -1], [2, 2, 2], [-1, -1, -1]])
         kernel_v = np.array([[-1, 2, -1], [-1, 2, -1], [-1, 2, -1]])
         
-        motion_h = cv2.filter2D(gray.astype(np.float32), -1, kernel_h)
-        motion_v = cv2.filter2D(gray.astype(np.float32), -1, kernel_v)
+        motion_h = cv2.filter2D(context.gray_float, -1, kernel_h)
+        motion_v = cv2.filter2D(context.gray_float, -1, kernel_v)
         
         motion_energy = np.sqrt(motion_h**2 + motion_v**2)
         motion_score = np.mean(motion_energy) / 255.0
@@ -28,10 +33,11 @@ class ActionScorer:
         
         return action_intensity
     
-    def detect_dynamic_elements(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def detect_dynamic_elements(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
+        gray = context.gray
         
-        edges = cv2.Canny(gray, 50, 150)
+        edges = context.canny(50, 150)
         edge_density = np.sum(edges > 0) / edges.size
         
         texture_variance = np.var(gray) / 10000.0
@@ -40,10 +46,12 @@ class ActionScorer:
         
         return dynamic_score
     
-    def score(self, image: np.ndarray, filename: str) -> ScoringResult:
-        motion_intensity = self.detect_motion_blur(image)
+    def score(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> ScoringResult:
+        context = context or ImageContext(image, filename)
+        
+        motion_intensity = self.detect_motion_blur(image, context)
         
-        dynamic_score = self.detect_dynamic_elements(image)
+        dynamic_score = self.detect_dynamic_elements(image, context)
         
         action_score = (motion_intensity * 0.7 + dynamic_score * 0.3)
         
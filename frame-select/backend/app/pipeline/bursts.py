@@ -0,0 +1,122 @@
+import re
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Frames sampled from uploaded videos are named `<clip>_t<milliseconds>.jpg`.
+_VIDEO_FRAME_PATTERN = re.compile(r"^(?P<clip>.+)_t(?P<milliseconds>\d{9})$")
+# The last number in a name, so IMG_0042, IMG_0042 copy and IMG_0042-edit sit together.
+_SEQUENCE_PATTERN = re.compile(r"^(?P<prefix>.*?)(?P<number>\d+)\D*$")
+
+def capture_position(filename: str, capture_time: Optional[float]) -> Optional[Tuple[str, str, float]]:
+    """Where an image sits in its shoot, as (clock, source, position).
+
+    Images are only ordered against others on the same clock: the EXIF capture
+    time when there is one, otherwise a video frame's timestamp within its clip,
+    otherwise the last number in the filename within its prefix (IMG_0042).
+    Returns None for images with neither a capture time nor a numbered name.
+    """
+    if capture_time is not None:
+        return "exif", "exif", float(capture_time)
+
+    stem = filename.rsplit(".", 1)[0]
+    match = _VIDEO_FRAME_PATTERN.match(stem)
+    if match:
+        return f"video:{match.group('clip')}", "video", int(match.group("milliseconds")) / 1000
+
+    match = _SEQUENCE_PATTERN.match(stem)
+    if match:
+        return f"sequence:{match.group('prefix')}", "filename", float(match.group("number"))
+
+    return None
+
+def find_bursts(filenames: Sequence[str], capture_times: Dict[str, Optional[float]], config: Dict) -> List[Dict]:
+    """Split images into bursts: runs on one clock with no gap above the configured limit.
+
+    Gaps are measured in seconds for EXIF and video clocks and in filename steps
+    for numbered names. Images that cannot be placed form a single unordered burst.
+    Each burst lists indices into `filenames` in capture order.
+    """
+    clocks: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    sources = {}
+    unordered = []
+
+    for index, filename in enumerate(filenames):
+        position = capture_position(filename, capture_times.get(filename))
+        if position is None:
+            unordered.append(index)
+            continue
+        clock, source, value = position
+        clocks[clock].append((value, index))
+        sources[clock] = source
+
+    bursts = []
+    for clock in sorted(clocks):
+        source = sources[clock]
+        max_gap = config["max_sequence_gap"] if source == "filename" else config["burst_gap_seconds"]
+        members = sorted(clocks[clock], key=lambda member: (member[0], filenames[member[1]]))
+
+        current = [members[0]]
+        for member in members[1:]:
+            if member[0] - current[-1][0] > max_gap:
+                bursts.append(_burst(current, clock, source))
+                current = []
+            current.append(member)
+        bursts.append(_burst(current, clock, source))
+
+    if unordered:
+        bursts.append({"indices": unordered, "clock": "unordered", "source": "unordered", "start": None, "end": None})
+
+    return bursts
+
+def _burst(members: List[Tuple[float, int]], clock: str, source: str) -> Dict:
+    return {
+        "indices": [index for _, index in members],
+        "clock": clock,
+        "source": source,
+        "start": members[0][0],
+        "end": members[-1][0]
+    }
+
+def comparison_windows(bursts: List[Dict], max_window_size: int) -> List[List[int]]:
+    """Index sets to compare for duplicates: each window together with the next window on its clock.
+
+    Bursts are cut into windows of at most `max_window_size` images so long bursts
+    (a whole video clip, a numbered card with no gaps) stay linear. Consecutive
+    bursts on the same clock are adjacent, so duplicates straddling a gap or a window
+    boundary are still compared. Unordered images could belong anywhere: up to
+    `max_window_size` of them join every window, more are only compared with each other.
+    """
+    sequences: Dict[str, List[List[int]]] = defaultdict(list)
+    unordered = []
+    for burst in bursts:
+        indices = burst["indices"]
+        if burst["source"] == "unordered":
+            unordered = indices
+            continue
+        for start in range(0, len(indices), max_window_size):
+            sequences[burst["clock"]].append(indices[start:start + max_window_size])
+
+    shared = unordered if len(unordered) <= max_window_size else []
+    windows = []
+    for sequence in sequences.values():
+        if len(sequence) == 1:
+            windows.append(sorted(sequence[0] + shared))
+            continue
+        for current, following in zip(sequence, sequence[1:]):
+            windows.append(sorted(current + following + shared))
+    if unordered and (not windows or not shared):
+        windows.append(sorted(unordered))
+    return windows
+
+def windowed_neighbors(windows: List[List[int]], find: Callable[[List[int]], Dict[int, List[int]]]) -> Dict[int, List[int]]:
+    """Run a neighbour search on each window and merge the results into global indices.
+
+    `find` gets a window's sorted global indices and returns, like the hash and
+    feature indexes, a map from each local index to the later local indices it
+    matches. The merged map has the same shape over the whole upload.
+    """
+    neighbors: Dict[int, set] = defaultdict(set)
+    for window in windows:
+        for i, matches in find(window).items():
+            neighbors[window[i]].update(window[j] for j in matches)
+    return {i: sorted(matches) for i, matches in neighbors.items()}
@@ -1,57 +1,57 @@
 import cv2
 import numpy as np
+from typing import Optional
 from core.models import ScoringResult
+from pipeline.context import ImageContext, cascade_available, FRONTAL_FACE_CASCADE
 
 class CompositionScorer:
+    VERSION = 1
+    
     def __init__(self):
         self.b_roll_threshold = 0.4
-        
-        try:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.face_detection_enabled = True
-        except:
-            self.face_detection_enabled = False
+        self.face_detection_enabled = cascade_available(FRONTAL_FACE_CASCADE)
     
-    def detect_crowd_and_audience(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        h, w = gray.shape
+    def detect_crowd_and_audience(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
+        h, w = context.gray.shape
         
         crowd_indicators = 0.0
         
         if self.face_detection_enabled:
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=2, minSize=(15, 15))
+            faces = context.detect(FRONTAL_FACE_CASCADE, 1.3, 2, (15, 15))
             face_density = len(faces) / ((w * h) / 10000)
             
             if len(faces) >= 3:
                 crowd_indicators += min(1.0, face_density * 0.3)
         
         horizontal_kernel = np.array([[-1, -1, -1], [2, 2, 2], [-1, -1, -1]])
-        horizontal_response = cv2.filter2D(gray.astype(np.float32), -1, horizontal_kernel)
+        horizontal_response = cv2.filter2D(context.gray_float, -1, horizontal_kernel)
         horizontal_energy = np.mean(np.abs(horizontal_response)) / 100.0
         
         crowd_indicators += min(0.3, horizontal_energy)
         
         return min(1.0, crowd_indicators)
     
-    def detect_non_game_elements(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        h, w = gray.shape
+    def detect_non_game_elements(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
+        gray_float = context.gray_float
+        h, w = gray_float.shape
         
         non_game_score = 0.0
         
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        laplacian_var = context.laplacian_variance
         if laplacian_var < 500:
             non_game_score += 0.3
         
-        edges = cv2.Canny(gray, 50, 150)
+        edges = context.canny(50, 150)
         edge_density = np.sum(edges > 0) / edges.size
         
         if 0.05 < edge_density < 0.15:
             non_game_score += 0.2
         
         kernel = np.ones((20, 20), np.float32) / 400
-        local_mean = cv2.filter2D(gray.astype(np.float32), -1, kernel)
-        local_variance = cv2.filter2D((gray.astype(np.float32) - local_mean)**2, -1, kernel)
+        local_mean = cv2.filter2D(gray_float, -1, kernel)
+        local_variance = cv2.filter2D((gray_float - local_mean)**2, -1, kernel)
         uniform_areas = np.sum(local_variance < 100) / (h * w)
         
         if uniform_areas > 0.4:
@@ -59,10 +59,10 @@ class CompositionScorer:
         
         return min(1.0, non_game_score)
     
-    def detect_equipment_and_facilities(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def detect_equipment_and_facilities(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
         
-        contours, _ = cv2.findContours(cv2.Canny(gray, 50, 150), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(context.canny(50, 150), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         rectangular_objects = 0
         for contour in contours:
@@ -78,12 +78,14 @@ class CompositionScorer:
         
         return equipment_score
     
-    def score(self, image: np.ndarray, filename: str) -> ScoringResult:
-        crowd_score = self.detect_crowd_and_audience(image)
+    def score(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> ScoringResult:
+        context = context or ImageContext(image, filename)
+        
+        crowd_score = self.detect_crowd_and_audience(image, context)
         
-        non_game_score = self.detect_non_game_elements(image)
+        non_game_score = self.detect_non_game_elements(image, context)
         
-        equipment_score = self.detect_equipment_and_facilities(image)
+        equipment_score = self.detect_equipment_and_facilities(image, context)
         
         b_roll_score = min(1.0, (crowd_score * 0.5 + non_game_score * 0.3 + equipment_score * 0.2))
         
@@ -0,0 +1,80 @@
+import os
+import threading
+import cv2
+import numpy as np
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FRONTAL_FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+PROFILE_FACE_CASCADE = 'haarcascade_profileface.xml'
+
+# CascadeClassifier.detectMultiScale is not safe to call concurrently on one
+# instance, so each thread (job worker) gets its own copy.
+_cascades = threading.local()
+
+def cascade_available(name: str) -> bool:
+    return os.path.exists(cv2.data.haarcascades + name)
+
+def load_cascade(name: str) -> cv2.CascadeClassifier:
+    """Load a bundled Haar cascade once per thread and reuse it."""
+    cascades: Dict[str, cv2.CascadeClassifier] = _cascades.__dict__
+    if name not in cascades:
+        cascades[name] = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+    return cascades[name]
+
+class ImageContext:
+    """Lazily computed, memoized derived products of a single analysis image.
+
+    Built once per image by ScoreCalculator and passed to every scorer so that
+    grayscale conversion, Laplacian, Canny edges and cascade detections are
+    computed at most once per image. `level` returns downscaled pyramid levels
+    as contexts of their own, so scorers that work at a lower resolution share
+    their derived products too.
+    """
+
+    def __init__(self, image: np.ndarray, filename: Optional[str] = None):
+        self.image = image
+        self.filename = filename
+        self._cache: Dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def level(self, max_size: Optional[int]) -> "ImageContext":
+        """This image downscaled so its longer side is at most `max_size`; None or a larger size returns self."""
+        height, width = self.image.shape[:2]
+        if max_size is None or max(height, width) <= max_size:
+            return self
+
+        def build() -> "ImageContext":
+            scale = max_size / max(height, width)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            return ImageContext(cv2.resize(self.image, size, interpolation=cv2.INTER_AREA), self.filename)
+
+        return self.get(("level", max_size), build)
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.get("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY) if len(self.image.shape) == 3 else self.image)
+
+    @property
+    def gray_float(self) -> np.ndarray:
+        return self.get("gray_float", lambda: self.gray.astype(np.float32))
+
+    @property
+    def laplacian(self) -> np.ndarray:
+        return self.get("laplacian", lambda: cv2.Laplacian(self.gray, cv2.CV_64F))
+
+    @property
+    def laplacian_variance(self) -> float:
+        return self.get("laplacian_variance", lambda: self.laplacian.var())
+
+    def canny(self, threshold1: float, threshold2: float) -> np.ndarray:
+        return self.get(("canny", threshold1, threshold2), lambda: cv2.Canny(self.gray, threshold1, threshold2))
+
+    def detect(self, cascade_name: str, scale_factor: float, min_neighbors: int, min_size: Tuple[int, int]) -> np.ndarray:
+        key = ("detect", cascade_name, scale_factor, min_neighbors, tuple(min_size))
+        return self.get(key, lambda: load_cascade(cascade_name).detectMultiScale(
+            self.gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=tuple(min_size)
+        ))
@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (boxes as pixel xyxy, confidences, class ids) for one image
+Detections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+class UltralyticsDetector:
+    """YOLO detector running through the PyTorch/ultralytics stack."""
+
+    def __init__(self, weights: str, conf_threshold: float = 0.25, iou_threshold: float = 0.7):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    def detect(self, images: List[np.ndarray]) -> List[Optional[Detections]]:
+        results = self.model(images, conf=self.conf_threshold, iou=self.iou_threshold, verbose=False)
+
+        detections = []
+        for result in results:
+            if result.boxes is None or len(result.boxes) == 0:
+                detections.append(None)
+                continue
+            detections.append((
+                result.boxes.xyxy.cpu().numpy(),
+                result.boxes.conf.cpu().numpy(),
+                result.boxes.cls.cpu().numpy()
+            ))
+
+        return detections
+
+class OnnxDetector:
+    """YOLOv8 detector exported to ONNX (optionally int8-quantized) and run on the ONNX Runtime CPU provider.
+
+    Pre- and post-processing mirror ultralytics: square letterbox with grey
+    padding, confidence filtering on the best class score and per-class NMS.
+    """
+
+    def __init__(self, model_path: str, conf_threshold: float = 0.25, iou_threshold: float = 0.7,
+                 max_detections: int = 300, intra_op_threads: int = 1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 640
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+    def _letterbox(self, image: np.ndarray) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+        h, w = image.shape[:2]
+        gain = min(self.input_size / h, self.input_size / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x, pad_y = (self.input_size - new_w) / 2, (self.input_size - new_h) / 2
+
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+        tensor = image[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+        return tensor, gain, (left, top)
+
+    def _postprocess(self, output: np.ndarray, gain: float, pad: Tuple[float, float], image_shape: Tuple[int, ...]) -> Optional[Detections]:
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        classes = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(predictions)), classes]
+
+        keep = confidences > self.conf_threshold
+        if not np.any(keep):
+            return None
+
+        predictions, classes, confidences = predictions[keep], classes[keep], confidences[keep]
+        cx, cy, bw, bh = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+        nms_boxes = np.stack([boxes[:, 0], boxes[:, 1], bw, bh], axis=1)
+        kept = cv2.dnn.NMSBoxesBatched(
+            nms_boxes.tolist(), confidences.tolist(), classes.tolist(),
+            self.conf_threshold, self.iou_threshold
+        )
+        kept = np.array(kept, dtype=np.int64).reshape(-1)[:self.max_detections]
+        if len(kept) == 0:
+            return None
+
+        boxes = (boxes[kept] - [pad[0], pad[1], pad[0], pad[1]]) / gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+
+        return boxes, confidences[kept], classes[kept].astype(np.float32)
+
+    def detect(self, images: List[np.ndarray]) -> List[Optional[Detections]]:
+        prepared = [self._letterbox(image) for image in images]
+
+        if self.dynamic_batch:
+            batch = np.stack([tensor for tensor, _, _ in prepared])
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: tensor[np.newaxis]})[0]
+                for tensor, _, _ in prepared
+            ])
+
+        return [
+            self._postprocess(output, gain, pad, image.shape)
+            for output, (_, gain, pad), image in zip(outputs, prepared, images)
+        ]
+
+def create_detector(config: Dict):
+    backend = config.get("detector_backend", "ultralytics")
+    conf_threshold = config.get("detector_conf", 0.25)
+    iou_threshold = config.get("detector_iou", 0.7)
+
+    if backend == "onnx":
+        return OnnxDetector(config["onnx_model_path"], conf_threshold, iou_threshold)
+    if backend == "ultralytics":
+        return UltralyticsDetector(config.get("detector_weights", "yolov8n.pt"), conf_threshold, iou_threshold)
+
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+def export_onnx_model(weights: str, output_path: Optional[str] = None, int8: bool = False) -> str:
+    """Export YOLO weights to a dynamic-batch ONNX model, optionally with int8 dynamic quantization."""
+    from ultralytics import YOLO
+    onnx_path = YOLO(weights).export(format="onnx", dynamic=True)
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_path = output_path or onnx_path.replace(".onnx", ".int8.onnx")
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QUInt8)
+        return quantized_path
+
+    if output_path and output_path != onnx_path:
+        import shutil
+        shutil.move(onnx_path, output_path)
+        return output_path
+
+    return onnx_path
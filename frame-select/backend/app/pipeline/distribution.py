@@ -0,0 +1,55 @@
+import numpy as np
+from typing import Iterable, Optional
+
+class SortedDistribution:
+    """Upload-level distribution of one measurement, kept as a sorted array.
+
+    Values are buffered as they arrive and sorted once, on the first query after
+    a change. Percentiles are then an index lookup, matching `np.percentile`'s
+    default linear interpolation exactly, and ranks are a binary search.
+    Distributions built on separate workers combine with `merge`.
+    """
+
+    def __init__(self, values: Optional[Iterable[float]] = None):
+        self._sorted = np.empty(0, dtype=np.float64)
+        self._pending = list(values) if values is not None else []
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def add(self, value: float):
+        self._pending.append(value)
+
+    def merge(self, other: "SortedDistribution"):
+        self._pending.extend(other.values.tolist())
+
+    @property
+    def values(self) -> np.ndarray:
+        if self._pending:
+            self._sorted = np.sort(np.concatenate([self._sorted, np.asarray(self._pending, dtype=np.float64)]))
+            self._pending = []
+        return self._sorted
+
+    @property
+    def max(self) -> float:
+        return float(self.values[-1])
+
+    def percentile(self, q: float) -> np.float64:
+        values = self.values
+        if not len(values):
+            raise ValueError("Percentile of an empty distribution")
+
+        index = (q / 100) * (len(values) - 1)
+        lower = int(np.floor(index))
+        upper = min(lower + 1, len(values) - 1)
+        gamma = index - lower
+        a, b = values[lower], values[upper]
+
+        # Same arithmetic as numpy's linear interpolation, so scores do not move.
+        if gamma >= 0.5:
+            return b - (b - a) * (1 - gamma)
+        return a + (b - a) * gamma
+
+    def rank(self, value: float) -> int:
+        """Number of values less than or equal to `value`."""
+        return int(np.searchsorted(self.values, value, side="right"))
@@ -2,76 +2,113 @@ import cv2
 import numpy as np
 import imagehash
 from PIL import Image
-from typing import List, Dict, Tuple, Set
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import cosine_similarity
-from ultralytics import YOLO
-import torch
+from typing import List, Dict, Tuple, Set, Optional
 from core.models import ScoringResult
 from core.config import settings
+from core.metrics import timed
+from pipeline.bursts import comparison_windows, find_bursts, windowed_neighbors
+from pipeline.context import ImageContext
+from pipeline.detectors import Detections, create_detector
+from pipeline.hash_index import MultiIndexHashTable, nibble_distance, pack_hashes
+from pipeline.similarity import FeatureSimilarityIndex, feature_matrix
 import logging
 
 logger = logging.getLogger(__name__)
 
 class DuplicateDetector:
+    VERSION = 1
+    
     def __init__(self):
-        self.model = YOLO('yolov8n.pt')
         self.config = settings.DUPLICATE_DETECTION
+        self._detector = None
         self.image_features = {}
         self.image_hashes = {}
         self.duplicate_groups = []
         self.processed_images = set()
-        
+        self.capture_times = {}
+        self.bursts = []
+        self.windows = None
+        self.summary = None
+        
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = create_detector(self.config)
+        return self._detector
+    
     def reset_for_upload(self):
         self.image_features.clear()
         self.image_hashes.clear()
         self.duplicate_groups.clear()
         self.processed_images.clear()
+        self.capture_times.clear()
+        self.bursts = []
+        self.windows = None
+        self.summary = None
+        
+    def extract_yolo_features(self, image: np.ndarray, context: Optional[ImageContext] = None) -> np.ndarray:
+        context = context or ImageContext(image)
+        detection_features = self.detect_batch([image])[0]
+        return self.combine_features(detection_features, self._extract_enhanced_statistical_features(image, context))
+    
+    def detect_batch(self, images: List[np.ndarray]) -> List[Optional[List[float]]]:
+        """Run the detector once per batch and return each image's detection features, or None if nothing was detected."""
+        batch_size = max(1, self.config.get("batch_size", 8))
+        detection_features = []
+        
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            try:
+                detections = self.detector.detect(batch)
+                detection_features.extend(
+                    self._detection_features(detection, image) for detection, image in zip(detections, batch)
+                )
+            except Exception as e:
+                logger.warning(f"YOLO feature extraction failed: {e}")
+                detection_features.extend([None] * len(batch))
+        
+        return detection_features
+    
+    def _detection_features(self, detections: Optional[Detections], image: np.ndarray) -> Optional[List[float]]:
+        if detections is None:
+            return None
         
-    def extract_yolo_features(self, image: np.ndarray) -> np.ndarray:
-        try:
-            results = self.model(image, verbose=False)
-            
-            if not results or len(results) == 0 or len(results[0].boxes) == 0:
-                logger.info("No objects detected, using statistical features")
-                return self._extract_statistical_features(image)
-            
-            detections = results[0]
-            
-            detection_features = []
-            if detections.boxes is not None:
-                boxes = detections.boxes.xyxy.cpu().numpy()
-                confidences = detections.boxes.conf.cpu().numpy()
-                classes = detections.boxes.cls.cpu().numpy()
-                
-                top_indices = np.argsort(confidences)[-5:]
-                
-                for idx in top_indices:
-                    box = boxes[idx] / [image.shape[1], image.shape[0], image.shape[1], image.shape[0]]
-                    detection_features.extend([
-                        box[0], box[1], box[2], box[3],
-                        confidences[idx],
-                        classes[idx],
-                        (box[2] - box[0]) * (box[3] - box[1]),
-                        (box[0] + box[2]) / 2,
-                        (box[1] + box[3]) / 2,
-                        (box[2] - box[0]) / (box[3] - box[1]) if (box[3] - box[1]) > 0 else 0
-                    ])
-                
-                while len(detection_features) < 50:
-                    detection_features.append(0.0)
-            
-            stat_features = self._extract_enhanced_statistical_features(image)
-            combined_features = np.concatenate([detection_features[:50], stat_features])
-            
-            return combined_features
-                
-        except Exception as e:
-            logger.warning(f"YOLO feature extraction failed: {e}")
-            return self._extract_enhanced_statistical_features(image)
+        boxes, confidences, classes = detections
+        
+        return self._box_features(boxes, confidences, classes, image.shape)
     
-    def _extract_enhanced_statistical_features(self, image: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    def _box_features(self, boxes: np.ndarray, confidences: np.ndarray, classes: np.ndarray, image_shape: Tuple[int, ...]) -> List[float]:
+        detection_features = []
+        
+        top_indices = np.argsort(confidences)[-5:]
+        
+        for idx in top_indices:
+            box = boxes[idx] / [image_shape[1], image_shape[0], image_shape[1], image_shape[0]]
+            detection_features.extend([
+                box[0], box[1], box[2], box[3],
+                confidences[idx],
+                classes[idx],
+                (box[2] - box[0]) * (box[3] - box[1]),
+                (box[0] + box[2]) / 2,
+                (box[1] + box[3]) / 2,
+                (box[2] - box[0]) / (box[3] - box[1]) if (box[3] - box[1]) > 0 else 0
+            ])
+        
+        while len(detection_features) < 50:
+            detection_features.append(0.0)
+        
+        return detection_features[:50]
+    
+    def combine_features(self, detection_features: Optional[List[float]], stat_features: np.ndarray) -> np.ndarray:
+        if detection_features is None:
+            logger.debug("No objects detected, using statistical features")
+            return stat_features
+        
+        return np.concatenate([detection_features, stat_features])
+    
+    def _extract_enhanced_statistical_features(self, image: np.ndarray, context: Optional[ImageContext] = None) -> np.ndarray:
+        context = context or ImageContext(image)
+        gray = context.gray
         
         features = []
         features.extend([
@@ -84,10 +121,10 @@ class DuplicateDetector:
             hist = cv2.calcHist([image], [i], None, [16], [0, 256])
             features.extend(hist.flatten().tolist())
         
-        edges = cv2.Canny(gray, 50, 150)
+        edges = context.canny(50, 150)
         features.extend([
             np.sum(edges), np.mean(edges), np.std(edges),
-            cv2.Laplacian(gray, cv2.CV_64F).var()
+            context.laplacian_variance
         ])
         
         h, w = gray.shape
@@ -99,10 +136,10 @@ class DuplicateDetector:
         
         return np.array(features)
     
-    def _extract_statistical_features(self, image: np.ndarray) -> np.ndarray:
-        return self._extract_enhanced_statistical_features(image)
+    def _extract_statistical_features(self, image: np.ndarray, context: Optional[ImageContext] = None) -> np.ndarray:
+        return self._extract_enhanced_statistical_features(image, context)
     
-    def calculate_perceptual_hash(self, image: np.ndarray) -> str:
+    def calculate_perceptual_hash(self, image: np.ndarray) -> Tuple[int, ...]:
         try:
             rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             pil_image = Image.fromarray(rgb_image)
@@ -111,35 +148,102 @@ class DuplicateDetector:
             phash = imagehash.phash(pil_image)
             ahash = imagehash.average_hash(pil_image)
             
-            combined_hash = str(dhash) + str(phash) + str(ahash)
-            return combined_hash
+            return tuple(int(str(h), 16) for h in (dhash, phash, ahash))
             
         except Exception as e:
             logger.warning(f"Hash calculation failed: {e}")
-            return ""
+            return ()
     
-    def hash_distance(self, hash1: str, hash2: str) -> int:
+    def hash_distance(self, hash1: Tuple[int, ...], hash2: Tuple[int, ...]) -> int:
         if len(hash1) != len(hash2):
             return float('inf')
         
-        return sum(c1 != c2 for c1, c2 in zip(hash1, hash2))
+        return int(nibble_distance(pack_hashes([hash1]), pack_hashes([hash2])[0])[0])
+    
+    def measure(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> Dict:
+        return {
+            "features": self.extract_yolo_features(image, context),
+            "hash": self.calculate_perceptual_hash(image)
+        }
+    
+    def measure_statistics(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None,
+                           timings: Optional[Dict[str, float]] = None) -> Dict:
+        """Per-image half of `measure`; detection features are attached later from a batched detector pass."""
+        with timed(timings, "statistical_features"):
+            statistics = self._extract_enhanced_statistical_features(image, context)
+        with timed(timings, "hashing"):
+            image_hash = self.calculate_perceptual_hash(image)
+        return {
+            "statistics": statistics,
+            "hash": image_hash
+        }
+    
+    def restore_measurement(self, measurement: Dict) -> Dict:
+        return {
+            "features": np.asarray(measurement["features"], dtype=np.float64),
+            "hash": tuple(measurement["hash"])
+        }
     
-    def process_image(self, image: np.ndarray, filename: str) -> None:
+    def cache_config(self) -> Dict:
+        keys = ("detector_backend", "detector_weights", "onnx_model_path", "detector_conf", "detector_iou")
+        return {key: self.config.get(key) for key in keys}
+    
+    def attach_detections(self, measurement: Dict, detection_features: Optional[List[float]]) -> Dict:
+        return {
+            "features": self.combine_features(detection_features, measurement["statistics"]),
+            "hash": measurement["hash"]
+        }
+    
+    def add_measurement(self, filename: str, measurement: Dict) -> None:
+        self.image_features[filename] = measurement["features"]
+        self.image_hashes[filename] = measurement["hash"]
+        self.processed_images.add(filename)
+        self.windows = None
+        self.summary = None
+    
+    def process_image(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> None:
         if filename in self.processed_images:
             return
             
         try:
-            features = self.extract_yolo_features(image)
-            self.image_features[filename] = features
-            
-            img_hash = self.calculate_perceptual_hash(image)
-            self.image_hashes[filename] = img_hash
-            
-            self.processed_images.add(filename)
+            self.add_measurement(filename, self.measure(image, filename, context))
             
         except Exception as e:
             logger.error(f"Error processing image {filename}: {e}")
     
+    def set_capture_times(self, capture_times: Dict[str, Optional[float]]) -> None:
+        """EXIF capture times (seconds) by filename, used to split the upload into bursts before comparing."""
+        self.capture_times.update(capture_times)
+        self.windows = None
+        self.summary = None
+    
+    def split_into_bursts(self) -> None:
+        """Split every processed image into bursts once, and derive the comparison windows both searches share."""
+        filenames = list(self.image_features.keys())
+        if not self.config.get("enable_time_windows", True):
+            self.bursts = []
+            self.windows = [filenames]
+            return
+        
+        bursts = find_bursts(filenames, self.capture_times, self.config)
+        self.bursts = [{**burst, "images": [filenames[i] for i in burst["indices"]]} for burst in bursts]
+        self.windows = [
+            [filenames[i] for i in window]
+            for window in comparison_windows(bursts, self.config["max_window_size"])
+        ]
+    
+    def _local_windows(self, filenames: List[str]) -> List[List[int]]:
+        """The shared comparison windows as sorted indices into one search's `filenames`."""
+        if self.windows is None:
+            self.split_into_bursts()
+        index_of = {filename: i for i, filename in enumerate(filenames)}
+        windows = []
+        for window in self.windows:
+            indices = sorted(index_of[filename] for filename in window if filename in index_of)
+            if len(indices) > 1:
+                windows.append(indices)
+        return windows
+    
     def find_duplicates_by_hash(self) -> List[List[str]]:
         if not self.config["enable_hash_comparison"]:
             return []
@@ -147,23 +251,25 @@ class DuplicateDetector:
         duplicate_groups = []
         processed = set()
         
-        filenames = list(self.image_hashes.keys())
+        filenames = [filename for filename, img_hash in self.image_hashes.items() if img_hash]
+        if len(filenames) < 2:
+            return []
+        
+        codes = pack_hashes([self.image_hashes[filename] for filename in filenames])
+        neighbors = windowed_neighbors(
+            self._local_windows(filenames),
+            lambda window: MultiIndexHashTable(codes[window], self.config["hash_threshold"]).neighbors()
+        )
         
         for i, filename1 in enumerate(filenames):
             if filename1 in processed:
                 continue
                 
             group = [filename1]
-            hash1 = self.image_hashes[filename1]
             
-            for filename2 in filenames[i+1:]:
-                if filename2 in processed:
-                    continue
-                    
-                hash2 = self.image_hashes[filename2]
-                distance = self.hash_distance(hash1, hash2)
-                
-                if distance <= self.config["hash_threshold"]:
+            for j in neighbors.get(i, []):
+                filename2 = filenames[j]
+                if filename2 not in processed:
                     group.append(filename2)
                     processed.add(filename2)
             
@@ -182,66 +288,62 @@ class DuplicateDetector:
             return []
         
         filenames = list(self.image_features.keys())
-        features_matrix = np.array([self.image_features[f] for f in filenames])
+        features_matrix = feature_matrix([self.image_features[f] for f in filenames])
         
-        similarity_matrix = cosine_similarity(features_matrix)
+        similarity_index = FeatureSimilarityIndex(
+            features_matrix,
+            block_bytes=self.config.get("feature_block_mb", 64) * 1024 * 1024
+        )
+        threshold = self.config.get("min_duplicate_similarity", 0.99)
+        neighbors = windowed_neighbors(
+            self._local_windows(filenames),
+            lambda window: similarity_index.neighbors(threshold, window)
+        )
         
         duplicate_groups = []
         processed = set()
         
-        logger.info(f"Feature similarity analysis for {len(filenames)} images:")
+        logger.info(f"Feature similarity analysis for {len(filenames)} images")
         
         for i, filename1 in enumerate(filenames):
             if filename1 in processed:
                 continue
                 
-            potential_group = [filename1]
-            
-            for j, filename2 in enumerate(filenames[i+1:], i+1):
-                if filename2 in processed:
-                    continue
-                    
-                similarity = similarity_matrix[i][j]
-                
-                logger.info(f"Similarity between {filename1} and {filename2}: {similarity:.3f}")
-                
-                threshold = self.config.get("min_duplicate_similarity", 0.99)
-                if similarity >= threshold:
-                    potential_group.append(filename2)
+            potential_indices = [i] + [j for j in neighbors.get(i, []) if filenames[j] not in processed]
             
-            if len(potential_group) > 1:
-                valid_group = self._comprehensive_duplicate_validation(potential_group)
+            if len(potential_indices) > 1:
+                potential_group = [filenames[j] for j in potential_indices]
+                valid_group = self._comprehensive_duplicate_validation(
+                    potential_group,
+                    similarity_index.pairwise(potential_indices)
+                )
                 if valid_group and len(valid_group) > 1:
                     duplicate_groups.append(valid_group)
                     for filename in valid_group:
                         processed.add(filename)
                     logger.info(f"Confirmed duplicate group: {valid_group}")
                 else:
-                    logger.info(f"Rejected potential duplicate group: {potential_group}")
+                    logger.debug(f"Rejected potential duplicate group: {potential_group}")
         
         logger.info(f"Found {len(duplicate_groups)} feature-based duplicate groups")
         return duplicate_groups
     
-    def _comprehensive_duplicate_validation(self, group: List[str]) -> List[str]:
+    def _comprehensive_duplicate_validation(self, group: List[str], similarities: Optional[List[float]] = None) -> List[str]:
         if len(group) < 2:
             return group
         
-        group_features = [self.image_features[filename] for filename in group]
-        
-        similarities = []
-        for i in range(len(group_features)):
-            for j in range(i + 1, len(group_features)):
-                sim = cosine_similarity([group_features[i]], [group_features[j]])[0][0]
-                similarities.append(sim)
+        if similarities is None:
+            group_features = feature_matrix([self.image_features[filename] for filename in group])
+            similarities = FeatureSimilarityIndex(group_features).pairwise(range(len(group)))
         
         min_similarity = min(similarities) if similarities else 0
         avg_similarity = np.mean(similarities) if similarities else 0
         
         if min_similarity < 0.99 or avg_similarity < 0.995:
-            logger.info(f"Rejecting group - min_sim: {min_similarity:.3f}, avg_sim: {avg_similarity:.3f}")
+            logger.debug(f"Rejecting group - min_sim: {min_similarity:.3f}, avg_sim: {avg_similarity:.3f}")
             return []
         
-        group_hashes = [self.image_hashes.get(filename, "") for filename in group]
+        group_hashes = [self.image_hashes.get(filename, ()) for filename in group]
         if all(group_hashes):
             hash_distances = []
             for i in range(len(group_hashes)):
@@ -252,11 +354,11 @@ class DuplicateDetector:
             if hash_distances:
                 max_hash_distance = max(hash_distances)
                 if max_hash_distance > 5:
-                    logger.info(f"Rejecting group - max hash distance: {max_hash_distance}")
+                    logger.debug(f"Rejecting group - max hash distance: {max_hash_distance}")
                     return []
         
         if len(group) > 4:
-            logger.info(f"Rejecting group - too large: {len(group)} images")
+            logger.debug(f"Rejecting group - too large: {len(group)} images")
             return []
         
         return group
@@ -266,8 +368,9 @@ class DuplicateDetector:
             return []
         
         filenames = list(self.image_features.keys())
-        features_matrix = np.array([self.image_features[f] for f in filenames])
+        features_matrix = feature_matrix([self.image_features[f] for f in filenames])
         
+        from sklearn.cluster import DBSCAN
         from sklearn.preprocessing import StandardScaler
         scaler = StandardScaler()
         normalized_features = scaler.fit_transform(features_matrix)
@@ -290,6 +393,9 @@ class DuplicateDetector:
         return [group for group in clusters.values() if len(group) > 1]
     
     def analyze_all_images(self) -> Dict:
+        if self.windows is None:
+            self.split_into_bursts()
+        
         hash_groups = self.find_duplicates_by_hash()
         feature_groups = self.find_duplicates_by_features()
         cluster_groups = self.find_duplicates_by_clustering()
@@ -300,37 +406,53 @@ class DuplicateDetector:
         
         self.duplicate_groups = merged_groups
         
-        return {
+        self.summary = {
             "duplicate_groups": merged_groups,
             "hash_groups": len(hash_groups),
             "feature_groups": len(feature_groups),
             "cluster_groups": len(cluster_groups),
             "total_duplicates": sum(len(group) for group in merged_groups),
-            "unique_images": len(self.processed_images) - sum(len(group) - 1 for group in merged_groups)
+            "unique_images": len(self.processed_images) - sum(len(group) - 1 for group in merged_groups),
+            "bursts": sum(1 for burst in self.bursts if len(burst["images"]) > 1)
         }
+        return self.summary
     
     def _merge_overlapping_groups(self, groups: List[List[str]]) -> List[List[str]]:
         if not groups:
             return []
         
         merged = []
-        used_images = set()
+        # Index of the merged group holding each image; every image is in exactly one group.
+        group_of = {}
         
         for group in groups:
-            if any(img in used_images for img in group):
-                for i, existing_group in enumerate(merged):
-                    if any(img in existing_group for img in group):
-                        merged[i] = list(set(existing_group + group))
-                        break
+            overlapping = sorted({group_of[img] for img in group if img in group_of})
+            if not overlapping:
+                target = len(merged)
+                merged.append([])
             else:
-                merged.append(group)
-                used_images.update(group)
+                # Fold every other overlapping group into the earliest one, keeping first-seen order:
+                # the first image of a group is its recommended keep.
+                target = overlapping[0]
+                for other in overlapping[1:]:
+                    for img in merged[other]:
+                        group_of[img] = target
+                    merged[target].extend(merged[other])
+                    merged[other] = None
+            
+            for img in group:
+                if img not in group_of:
+                    group_of[img] = target
+                    merged[target].append(img)
         
-        return merged
+        return [group for group in merged if group]
     
-    def score_image(self, image: np.ndarray, filename: str) -> ScoringResult:
-        self.process_image(image, filename)
+    def score_image(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> ScoringResult:
+        self.process_image(image, filename, context)
         
+        return self.score_from_groups(filename)
+    
+    def score_from_groups(self, filename: str) -> ScoringResult:
         is_duplicate = False
         duplicate_score = 1.0
         tags = []
@@ -354,11 +476,13 @@ class DuplicateDetector:
         return ScoringResult(score=duplicate_score, tags=tags)
     
     def get_duplicate_report(self) -> Dict:
-        analysis = self.analyze_all_images()
+        """Report on the groups found by the last analyze_all_images(), which runs only if nothing changed since."""
+        summary = self.summary if self.summary is not None else self.analyze_all_images()
         
         report = {
-            "summary": analysis,
+            "summary": summary,
             "groups": [],
+            "bursts": [],
             "recommendations": []
         }
         
@@ -371,6 +495,18 @@ class DuplicateDetector:
             }
             report["groups"].append(group_info)
         
+        for burst in self.bursts:
+            if len(burst["images"]) < 2:
+                continue
+            report["bursts"].append({
+                "burst_id": len(report["bursts"]),
+                "images": burst["images"],
+                "count": len(burst["images"]),
+                "source": burst["source"],
+                "start": burst["start"],
+                "end": burst["end"]
+            })
+        
         total_images = len(self.processed_images)
         duplicate_images = sum(len(group) - 1 for group in self.duplicate_groups)
         
@@ -386,5 +522,5 @@ class DuplicateDetector:
         
         return report
 
-    def score(self, image: np.ndarray, filename: str) -> ScoringResult:
-        return self.score_image(image, filename)
\ No newline at end of file
+    def score(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> ScoringResult:
+        return self.score_image(image, filename, context)
\ No newline at end of file
@@ -1,24 +1,24 @@
 import cv2
 import numpy as np
+from typing import Optional
 from core.models import ScoringResult
+from pipeline.context import ImageContext, cascade_available, FRONTAL_FACE_CASCADE
 
 class EmotionScorer:
+    VERSION = 1
+    
     def __init__(self):
         self.emotion_threshold = 0.6
-        
-        try:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.face_detection_enabled = True
-        except:
-            self.face_detection_enabled = False
+        self.face_detection_enabled = cascade_available(FRONTAL_FACE_CASCADE)
     
-    def detect_faces_and_expressions(self, image: np.ndarray) -> float:
+    def detect_faces_and_expressions(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
         if not self.face_detection_enabled:
             return 0.0
             
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        context = context or ImageContext(image)
+        gray = context.gray
         
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        faces = context.detect(FRONTAL_FACE_CASCADE, 1.1, 5, (30, 30))
         
         if len(faces) == 0:
             return 0.0
@@ -56,19 +56,20 @@ class EmotionScorer:
         
         return emotion_score
     
-    def detect_crowd_energy(self, image: np.ndarray) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def detect_crowd_energy(self, image: np.ndarray, context: Optional[ImageContext] = None) -> float:
+        context = context or ImageContext(image)
+        gray = context.gray
         h, w = gray.shape
         
         if self.face_detection_enabled:
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=3, minSize=(20, 20))
+            faces = context.detect(FRONTAL_FACE_CASCADE, 1.2, 3, (20, 20))
             face_density = len(faces) / ((w * h) / 10000)
         else:
             face_density = 0.0
         
         texture_energy = np.var(gray) / 5000.0
         
-        edges = cv2.Canny(gray, 30, 100)
+        edges = context.canny(30, 100)
         edge_complexity = np.sum(edges > 0) / edges.size
         
         color_energy = 0.0
@@ -81,10 +82,12 @@ class EmotionScorer:
         
         return crowd_score
     
-    def score(self, image: np.ndarray, filename: str) -> ScoringResult:
-        face_emotion_score = self.detect_faces_and_expressions(image)
+    def score(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> ScoringResult:
+        context = context or ImageContext(image, filename)
+        
+        face_emotion_score = self.detect_faces_and_expressions(image, context)
         
-        crowd_energy_score = self.detect_crowd_energy(image)
+        crowd_energy_score = self.detect_crowd_energy(image, context)
         
         if face_emotion_score > 0:
             emotion_score = face_emotion_score * 0.8 + crowd_energy_score * 0.2
@@ -0,0 +1,69 @@
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+NIBBLES_PER_WORD = 16
+_LOW_NIBBLE_BITS = np.uint64(0x1111111111111111)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+def nibble_distance(codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Number of differing hex digits between each row of `codes` and `query`.
+
+    Matches the character-wise comparison of the concatenated hex hash strings:
+    every non-zero nibble of the XOR is folded onto its lowest bit and counted.
+    """
+    diff = np.bitwise_xor(codes, query)
+    diff = diff | (diff >> np.uint64(1))
+    diff = diff | (diff >> np.uint64(2))
+    return popcount64(diff & _LOW_NIBBLE_BITS).sum(axis=-1)
+
+def pack_hashes(hashes: Sequence[Tuple[int, ...]]) -> np.ndarray:
+    return np.array(hashes, dtype=np.uint64).reshape(len(hashes), -1)
+
+class MultiIndexHashTable:
+    """Multi-index hashing over packed perceptual hashes.
+
+    Each code is split into `threshold + 1` disjoint nibble substrings. Two codes
+    within `threshold` differing nibbles must agree exactly on at least one
+    substring, so only codes sharing a bucket are compared.
+    """
+
+    def __init__(self, codes: np.ndarray, threshold: int):
+        self.codes = codes
+        self.threshold = threshold
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+        words = codes.shape[1] if codes.ndim == 2 else 0
+        total_nibbles = words * NIBBLES_PER_WORD
+        num_blocks = max(1, min(threshold + 1, total_nibbles))
+        bounds = np.linspace(0, total_nibbles, num_blocks + 1).astype(int)
+        self.blocks = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+        for index, row in enumerate(codes):
+            code = 0
+            for word in row:
+                code = (code << 64) | int(word)
+            for block, (start, end) in enumerate(self.blocks):
+                value = (code >> (4 * start)) & ((1 << (4 * (end - start))) - 1)
+                self.buckets[(block, value)].append(index)
+
+    def neighbors(self) -> Dict[int, List[int]]:
+        """Map each index to the sorted later indices within the threshold."""
+        candidates: Dict[int, set] = defaultdict(set)
+        for members in self.buckets.values():
+            for position, i in enumerate(members[:-1]):
+                candidates[i].update(members[position + 1:])
+
+        neighbors = {}
+        for i, others in candidates.items():
+            others = np.array(sorted(others), dtype=np.int64)
+            distances = nibble_distance(self.codes[others], self.codes[i])
+            neighbors[i] = others[distances <= self.threshold].tolist()
+
+        return neighbors
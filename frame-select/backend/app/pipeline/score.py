@@ -1,12 +1,47 @@
+import json
+import time
+import hashlib
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from core.models import ScoringResult
 from core.config import settings
+from core.metrics import timed
+from pipeline.context import ImageContext, load_cascade, FRONTAL_FACE_CASCADE, PROFILE_FACE_CASCADE
 from pipeline.sharpness import SharpnessScorer
 from pipeline.composition import CompositionScorer
 from pipeline.emotion import EmotionScorer
 from pipeline.action import ActionScorer
 from pipeline.duplicate import DuplicateDetector
+from pipeline.triage import TriageGate
+
+def resolve_weights(weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Overlay caller-supplied weights on the configured SCORING_WEIGHTS."""
+    resolved = dict(settings.SCORING_WEIGHTS)
+    if not weights:
+        return resolved
+    
+    unknown = set(weights) - set(resolved)
+    if unknown:
+        raise ValueError(f"Unknown score types: {', '.join(sorted(unknown))}")
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("Weights must be non-negative")
+    
+    resolved.update(weights)
+    return resolved
+
+def weighted_score(scores: Dict[str, float], weights: Dict[str, float]) -> float:
+    return sum(
+        scores[score_type] * weights[score_type]
+        for score_type in scores
+    )
+
+# Duplicate part of a frame rejected by triage: statistics only, since the detector was skipped.
+# Cached apart from the full "duplicate" part so that frames measured with triage on are
+# detected in full once it is turned off.
+REJECTED_DUPLICATE_PART = "rejected_duplicate"
+
+def _rejected(measurement: Dict) -> bool:
+    return bool(measurement.get("triage", {}).get("rejected"))
 
 class ScoreCalculator:
     def __init__(self):
@@ -17,35 +52,43 @@ class ScoreCalculator:
             "action": ActionScorer(),
             "duplicate": DuplicateDetector()
         }
+        self.triage = TriageGate()
         self.weights = settings.SCORING_WEIGHTS
     
+    def warm_up(self):
+        """Load the shared cascades and the duplicate detector ahead of the first image."""
+        load_cascade(FRONTAL_FACE_CASCADE)
+        load_cascade(PROFILE_FACE_CASCADE)
+        self.scorers["duplicate"].detector
+    
     def reset_for_upload(self):
         self.scorers["sharpness"].reset_for_upload()
         self.scorers["duplicate"].reset_for_upload()
     
-    def collect_sharpness_variance(self, image: np.ndarray, filename: str) -> float:
-        return self.scorers["sharpness"].collect_variance(image, filename)
+    def build_context(self, image: np.ndarray, filename: Optional[str] = None) -> ImageContext:
+        return ImageContext(image, filename)
+    
+    def collect_sharpness_variance(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> float:
+        return self.scorers["sharpness"].collect_variance(image, filename, context)
     
-    def score_image_with_context(self, image: np.ndarray, filename: str, variance: float) -> Dict:
+    def score_image_with_context(self, image: np.ndarray, filename: str, variance: float, context: Optional[ImageContext] = None) -> Dict:
+        context = context or self.build_context(image, filename)
         scores = {}
         all_tags = []
         debug_info = {}
         
-        sharpness_result = self.scorers["sharpness"].score(image, filename, variance)
+        sharpness_result = self.scorers["sharpness"].score(image, filename, variance, context)
         scores["sharpness"] = sharpness_result.score
         all_tags.extend(sharpness_result.tags)
-        debug_info["sharpness"] = self.scorers["sharpness"].get_debug_info(variance, image)
+        debug_info["sharpness"] = self.scorers["sharpness"].get_debug_info(variance, image, filename, context)
         
         for score_type, scorer in self.scorers.items():
             if score_type != "sharpness":
-                result = scorer.score(image, filename)
+                result = scorer.score(image, filename, context)
                 scores[score_type] = result.score
                 all_tags.extend(result.tags)
         
-        final_score = sum(
-            scores[score_type] * self.weights[score_type]
-            for score_type in scores
-        )
+        final_score = weighted_score(scores, self.weights)
         
         unique_tags = list(set(all_tags))
         
@@ -57,18 +100,16 @@ class ScoreCalculator:
         }
     
     def score_image(self, image: np.ndarray, filename: str) -> Dict:
+        context = self.build_context(image, filename)
         scores = {}
         all_tags = []
         
         for score_type, scorer in self.scorers.items():
-            result = scorer.score(image, filename)
+            result = scorer.score(image, filename, context=context)
             scores[score_type] = result.score
             all_tags.extend(result.tags)
         
-        final_score = sum(
-            scores[score_type] * self.weights[score_type]
-            for score_type in scores
-        )
+        final_score = weighted_score(scores, self.weights)
         
         unique_tags = list(set(all_tags))
         
@@ -78,9 +119,253 @@ class ScoreCalculator:
             "tags": unique_tags
         }
     
-    def finalize_duplicate_analysis(self) -> Dict:
+    def measure_image(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> Dict:
+        """Compute everything about one image that does not depend on the rest of the upload."""
+        context = context or self.build_context(image, filename)
+        measurement = self._measure_per_image(image, filename, context)
+        detection_features = self.scorers["duplicate"].detect_batch([context.level(self.working_size("duplicate")).image])[0]
+        measurement["duplicate"] = self.scorers["duplicate"].attach_detections(measurement["duplicate"], detection_features)
+        return measurement
+    
+    def measure_images(self, frames: List[Tuple[str, np.ndarray]], cached_parts: Optional[Dict[str, Dict]] = None) -> List[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        """Measure a batch of (filename, image) frames, running the detector once for the whole batch.
+        
+        `cached_parts` maps filenames to already-known measurement parts, which are reused instead of recomputed.
+        """
+        cached_parts = cached_parts or {}
+        outcomes = []
+        pending = []
+        
+        for filename, image in frames:
+            try:
+                cached = cached_parts.get(filename, {})
+                context = self.build_context(image, filename)
+                measurement = self._measure_per_image(image, filename, context, cached=cached)
+                needs_detection = "duplicate" not in cached and not _rejected(measurement)
+                # Keep only the detector's pyramid level, not the whole context, until the batch pass.
+                detection_image = context.level(self.working_size("duplicate")).image
+                pending.append((filename, detection_image, measurement, needs_detection))
+            except Exception as e:
+                outcomes.append((filename, None, e))
+        
+        to_detect = [(measurement, image) for _, image, measurement, needs_detection in pending if needs_detection]
+        started = time.perf_counter()
+        detections = self.scorers["duplicate"].detect_batch([image for _, image in to_detect])
+        # The detector runs once per batch, so its time is shared evenly between the batch's images.
+        detection_seconds = (time.perf_counter() - started) / max(1, len(to_detect))
+        
+        for (measurement, _), detection_features in zip(to_detect, detections):
+            measurement["duplicate"] = self.scorers["duplicate"].attach_detections(measurement["duplicate"], detection_features)
+            measurement["timings"]["detection"] = detection_seconds
+        
+        outcomes.extend((filename, measurement, None) for filename, _, measurement, _ in pending)
+        
+        return outcomes
+    
+    def working_size(self, score_type: str) -> Optional[int]:
+        return settings.SCORER_MAX_SIZE.get(score_type)
+    
+    def _measure_per_image(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None, cached: Optional[Dict] = None) -> Dict:
+        context = context or self.build_context(image, filename)
+        cached = cached or {}
+        results = {}
+        timings = {}
+        
+        if self.triage.enabled:
+            if "triage" in cached:
+                triage = cached["triage"]
+            else:
+                with timed(timings, "triage"):
+                    triage = self.triage.check(image, context)
+            if triage["rejected"]:
+                return self._rejected_measurement(image, filename, context, cached, triage, timings)
+        
+        for score_type, scorer in self.scorers.items():
+            if score_type in ("sharpness", "duplicate"):
+                continue
+            if score_type in cached:
+                results[score_type] = cached[score_type]
+                continue
+            with timed(timings, score_type):
+                level = context.level(self.working_size(score_type))
+                result = scorer.score(level.image, filename, level)
+            results[score_type] = {"score": result.score, "tags": result.tags}
+        
+        if "sharpness" in cached:
+            sharpness = cached["sharpness"]
+        else:
+            with timed(timings, "sharpness"):
+                level = context.level(self.working_size("sharpness"))
+                sharpness = self.scorers["sharpness"].measure(level.image, filename, level)
+        
+        if "duplicate" in cached:
+            duplicate = self.scorers["duplicate"].restore_measurement(cached["duplicate"])
+        else:
+            level = context.level(self.working_size("duplicate"))
+            duplicate = self.scorers["duplicate"].measure_statistics(level.image, filename, level, timings)
+        
+        measurement = {
+            "filename": filename,
+            "sharpness": sharpness,
+            "duplicate": duplicate,
+            "results": results,
+            "timings": timings
+        }
+        if self.triage.enabled:
+            measurement["triage"] = triage
+        return measurement
+    
+    def _rejected_measurement(self, image: np.ndarray, filename: str, context: ImageContext, cached: Dict,
+                              triage: Dict, timings: Dict) -> Dict:
+        """Measurement of a frame the triage gate rejected: only duplicate hashing and statistics, no detector pass."""
+        if "duplicate" in cached:
+            duplicate = self.scorers["duplicate"].restore_measurement(cached["duplicate"])
+        elif REJECTED_DUPLICATE_PART in cached:
+            duplicate = self.scorers["duplicate"].restore_measurement(cached[REJECTED_DUPLICATE_PART])
+        else:
+            level = context.level(self.working_size("duplicate"))
+            statistics = self.scorers["duplicate"].measure_statistics(level.image, filename, level, timings)
+            duplicate = self.scorers["duplicate"].attach_detections(statistics, None)
+        
+        return {
+            "filename": filename,
+            "triage": triage,
+            "sharpness": None,
+            "duplicate": duplicate,
+            "results": {},
+            "timings": timings
+        }
+    
+    def part_fingerprints(self) -> Dict[str, str]:
+        """Fingerprint of each scorer's version and relevant settings, used to key cached measurement parts."""
+        fingerprints = {}
+        for score_type, scorer in {**self.scorers, "triage": self.triage}.items():
+            config = {
+                "version": scorer.VERSION,
+                "analysis_max_size": settings.ANALYSIS_MAX_SIZE,
+                "fast_jpeg_decode": settings.FAST_JPEG_DECODE
+            }
+            if self.working_size(score_type) is not None:
+                config["working_size"] = self.working_size(score_type)
+            if hasattr(scorer, "cache_config"):
+                config.update(scorer.cache_config())
+            fingerprints[score_type] = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+        fingerprints[REJECTED_DUPLICATE_PART] = fingerprints["duplicate"]
+        return fingerprints
+    
+    def measurement_parts(self, measurement: Dict) -> Dict:
+        # Rejected frames only keep their triage verdict and undetected duplicate part,
+        # so turning triage off later measures them in full.
+        if _rejected(measurement):
+            return {"triage": measurement["triage"], REJECTED_DUPLICATE_PART: measurement["duplicate"]}
+        
+        parts = {
+            "sharpness": measurement["sharpness"],
+            "duplicate": measurement["duplicate"],
+            **measurement["results"]
+        }
+        if "triage" in measurement:
+            parts["triage"] = measurement["triage"]
+        return parts
+    
+    def assemble_measurement(self, filename: str, parts: Dict) -> Optional[Dict]:
+        """Rebuild a full measurement from cached parts, or None if any scorer's part is missing."""
+        triage = None
+        if self.triage.enabled:
+            if "triage" not in parts:
+                return None
+            triage = parts["triage"]
+        
+        if triage is not None and triage["rejected"]:
+            duplicate = parts.get("duplicate", parts.get(REJECTED_DUPLICATE_PART))
+            if duplicate is None:
+                return None
+            return {
+                "filename": filename,
+                "timings": {},
+                "triage": triage,
+                "sharpness": None,
+                "duplicate": self.scorers["duplicate"].restore_measurement(duplicate),
+                "results": {}
+            }
+        
+        if any(score_type not in parts for score_type in self.scorers):
+            return None
+        
+        measurement = {
+            "filename": filename,
+            "timings": {},
+            "sharpness": parts["sharpness"],
+            "duplicate": self.scorers["duplicate"].restore_measurement(parts["duplicate"]),
+            "results": {
+                score_type: parts[score_type]
+                for score_type in self.scorers
+                if score_type not in ("sharpness", "duplicate")
+            }
+        }
+        if triage is not None:
+            measurement["triage"] = triage
+        return measurement
+    
+    def add_measurement(self, measurement: Dict) -> Optional[float]:
+        """Register a per-image measurement in the upload-level context and return its sharpness variance.
+        
+        Frames rejected by triage are only registered for duplicate detection, so they do not
+        shift the upload's sharpness distribution; their variance is None.
+        """
+        filename = measurement["filename"]
+        self.scorers["duplicate"].add_measurement(filename, measurement["duplicate"])
+        if _rejected(measurement):
+            return None
+        return self.scorers["sharpness"].add_measurement(filename, measurement["sharpness"])
+    
+    def score_measurement(self, measurement: Dict, variance: Optional[float]) -> Dict:
+        """Score a registered measurement against the upload-level context."""
+        filename = measurement["filename"]
+        scores = {}
+        all_tags = []
+        debug_info = {}
+        
+        if _rejected(measurement):
+            duplicate_result = self.scorers["duplicate"].score_from_groups(filename)
+            scores = {score_type: 0.0 for score_type in self.scorers}
+            scores["duplicate"] = duplicate_result.score
+            return {
+                "final_score": weighted_score(scores, self.weights),
+                "scores": scores,
+                "tags": list(set(["rejected_early", *duplicate_result.tags])),
+                "debug_info": {"triage": measurement["triage"]}
+            }
+        
+        for score_type in self.scorers:
+            if score_type == "sharpness":
+                result = self.scorers["sharpness"].score_measurement(measurement["sharpness"], variance)
+                debug_info["sharpness"] = self.scorers["sharpness"].get_debug_info(variance, measurement=measurement["sharpness"])
+            elif score_type == "duplicate":
+                result = self.scorers["duplicate"].score_from_groups(filename)
+            else:
+                result = ScoringResult(**measurement["results"][score_type])
+            scores[score_type] = result.score
+            all_tags.extend(result.tags)
+        
+        final_score = weighted_score(scores, self.weights)
+        
+        unique_tags = list(set(all_tags))
+        
+        return {
+            "final_score": final_score,
+            "scores": scores,
+            "tags": unique_tags,
+            "debug_info": debug_info
+        }
+    
+    def finalize_duplicate_analysis(self, capture_times: Optional[Dict[str, Optional[float]]] = None) -> Dict:
         """Finalize duplicate detection after all images are processed."""
-        return self.scorers["duplicate"].analyze_all_images()
+        duplicate = self.scorers["duplicate"]
+        if capture_times:
+            duplicate.set_capture_times(capture_times)
+        duplicate.split_into_bursts()
+        return duplicate.analyze_all_images()
     
     def get_duplicate_report(self) -> Dict:
         """Get comprehensive duplicate detection report."""
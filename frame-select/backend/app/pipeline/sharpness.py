@@ -1,35 +1,42 @@
 import cv2
+import logging
 import numpy as np
 from typing import List, Tuple, Optional
 from core.models import ScoringResult
+from pipeline.context import ImageContext, cascade_available, FRONTAL_FACE_CASCADE, PROFILE_FACE_CASCADE
+from pipeline.distribution import SortedDistribution
+
+logger = logging.getLogger(__name__)
 
 class SharpnessScorer:
+    VERSION = 1
+    
     def __init__(self):
         self.min_variance = 100
         self.max_variance = 2000
         self.upload_variances = []
         self.subject_variances = []
+        self.subject_distribution = SortedDistribution()
+        self.measurements = {}
         
-        try:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
-            self.face_detection_enabled = True
-        except:
-            self.face_detection_enabled = False
-            print("Face detection not available, using center-weighted analysis")
+        self.face_detection_enabled = cascade_available(FRONTAL_FACE_CASCADE) and cascade_available(PROFILE_FACE_CASCADE)
+        if not self.face_detection_enabled:
+            logger.warning("Face detection not available, using center-weighted analysis")
 
     def reset_for_upload(self):
         self.upload_variances = []
         self.subject_variances = []
+        self.subject_distribution = SortedDistribution()
+        self.measurements = {}
 
-    def detect_subject_regions(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def detect_subject_regions(self, image: np.ndarray, context: Optional[ImageContext] = None) -> List[Tuple[int, int, int, int]]:
+        context = context or ImageContext(image)
         subjects = []
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        h, w = gray.shape
+        h, w = context.gray.shape
         
         if self.face_detection_enabled:
             try:
-                faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
+                faces = context.detect(FRONTAL_FACE_CASCADE, 1.1, 4, (30, 30))
                 for (x, y, fw, fh) in faces:
                     expanded_w = int(fw * 2.5)
                     expanded_h = int(fh * 3.0)
@@ -40,7 +47,7 @@ class SharpnessScorer:
                     subjects.append((expanded_x, expanded_y, expanded_x2 - expanded_x, expanded_y2 - expanded_y))
                 
                 if not subjects:
-                    profiles = self.profile_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
+                    profiles = context.detect(PROFILE_FACE_CASCADE, 1.1, 4, (30, 30))
                     for (x, y, pw, ph) in profiles:
                         expanded_w = int(pw * 2.5)
                         expanded_h = int(ph * 3.0)
@@ -61,8 +68,9 @@ class SharpnessScorer:
         
         return subjects
 
-    def calculate_subject_background_sharpness(self, image: np.ndarray, subject_boxes: List[Tuple[int, int, int, int]]) -> Tuple[float, float, dict]:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def calculate_subject_background_sharpness(self, image: np.ndarray, subject_boxes: List[Tuple[int, int, int, int]], context: Optional[ImageContext] = None) -> Tuple[float, float, dict]:
+        context = context or ImageContext(image)
+        gray = context.gray
         h, w = gray.shape
         
         subject_mask = np.zeros((h, w), dtype=np.uint8)
@@ -74,7 +82,7 @@ class SharpnessScorer:
         
         background_mask = cv2.bitwise_not(subject_mask)
         
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+        laplacian = context.laplacian
         
         subject_pixels = gray[subject_mask > 0]
         subject_laplacian_pixels = laplacian[subject_mask > 0]
@@ -84,7 +92,7 @@ class SharpnessScorer:
         background_laplacian_pixels = laplacian[background_mask > 0]
         background_variance = background_laplacian_pixels.var() if len(background_laplacian_pixels) > 0 else 0
         
-        overall_variance = laplacian.var()
+        overall_variance = context.laplacian_variance
         
         debug_info = {
             "subject_regions": len(subject_boxes),
@@ -94,29 +102,53 @@ class SharpnessScorer:
         
         return subject_variance, background_variance, debug_info
 
-    def collect_variance(self, image: np.ndarray, filename: str) -> float:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    def measure(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> dict:
+        context = context or ImageContext(image, filename)
         
-        subject_boxes = self.detect_subject_regions(image)
+        subject_boxes = self.detect_subject_regions(image, context)
         
-        subject_variance, background_variance, _ = self.calculate_subject_background_sharpness(image, subject_boxes)
+        subject_variance, background_variance, detection_debug = self.calculate_subject_background_sharpness(image, subject_boxes, context)
         
-        overall_laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        overall_variance = overall_laplacian.var()
+        return {
+            "subject_variance": float(subject_variance),
+            "background_variance": float(background_variance),
+            "overall_variance": float(context.laplacian_variance),
+            "detection_debug": detection_debug
+        }
+
+    def get_measurement(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> dict:
+        if filename not in self.measurements:
+            self.measurements[filename] = self.measure(image, filename, context)
+        return self.measurements[filename]
+
+    def add_measurement(self, filename: str, measurement: dict) -> float:
+        self.measurements[filename] = measurement
+        subject_variance = measurement["subject_variance"]
+        overall_variance = measurement["overall_variance"]
         
         self.upload_variances.append(overall_variance)
         self.subject_variances.append(subject_variance)
+        if subject_variance > 0:
+            self.subject_distribution.add(subject_variance)
         
         return subject_variance if subject_variance > 0 else overall_variance
 
-    def score(self, image: np.ndarray, filename: str, variance: float = None) -> ScoringResult:
-        subject_boxes = self.detect_subject_regions(image)
+    def collect_variance(self, image: np.ndarray, filename: str, context: Optional[ImageContext] = None) -> float:
+        return self.add_measurement(filename, self.get_measurement(image, filename, context))
+
+    def score(self, image: np.ndarray, filename: str, variance: float = None, context: Optional[ImageContext] = None) -> ScoringResult:
+        measurement = self.get_measurement(image, filename, context)
+        
+        if measurement["subject_variance"] <= 0 and variance is None:
+            variance = self.collect_variance(image, filename, context)
         
-        subject_variance, background_variance, detection_debug = self.calculate_subject_background_sharpness(image, subject_boxes)
+        return self.score_measurement(measurement, variance)
+
+    def score_measurement(self, measurement: dict, variance: float = None) -> ScoringResult:
+        subject_variance = measurement["subject_variance"]
+        background_variance = measurement["background_variance"]
         
         primary_variance = subject_variance if subject_variance > 0 else variance
-        if primary_variance is None:
-            primary_variance = self.collect_variance(image, filename)
         
         absolute_score = max(0.0, min(1.0, (primary_variance - self.min_variance) / (self.max_variance - self.min_variance)))
         
@@ -124,12 +156,12 @@ class SharpnessScorer:
         tags = []
         
         if len(self.subject_variances) > 1:
-            variances_to_use = [v for v in self.subject_variances if v > 0]
-            if len(variances_to_use) > 1:
-                percentile = np.percentile(variances_to_use, [15, 50, 85])
+            distribution = self.subject_distribution
+            if len(distribution) > 1:
+                top_percentile = distribution.percentile(85)
                 
-                if primary_variance >= percentile[2]:
-                    relative_score = 0.85 + (primary_variance - percentile[2]) / (max(variances_to_use) - percentile[2]) * 0.15
+                if primary_variance >= top_percentile:
+                    relative_score = 0.85 + (primary_variance - top_percentile) / (distribution.max - top_percentile) * 0.15
                     tags.append("sharp")
         
         if subject_variance > 0 and background_variance > 0:
@@ -141,7 +173,7 @@ class SharpnessScorer:
         
         return ScoringResult(score=relative_score, tags=tags)
 
-    def get_debug_info(self, variance: float, image: np.ndarray = None) -> dict:
+    def get_debug_info(self, variance: float, image: np.ndarray = None, filename: Optional[str] = None, context: Optional[ImageContext] = None, measurement: Optional[dict] = None) -> dict:
         absolute_score = max(0.0, min(1.0, (variance - self.min_variance) / (self.max_variance - self.min_variance)))
         
         debug_info = {
@@ -151,20 +183,26 @@ class SharpnessScorer:
         }
         
         if len(self.subject_variances) > 1:
-            valid_variances = [v for v in self.subject_variances if v > 0]
-            if valid_variances:
-                percentile_rank = (np.sum(np.array(valid_variances) <= variance) / len(valid_variances)) * 100
+            distribution = self.subject_distribution
+            if len(distribution):
+                percentile_rank = (distribution.rank(variance) / len(distribution)) * 100
                 debug_info["subject_percentile_rank"] = f"{round(percentile_rank, 1)}%"
         
-        if image is not None:
-            subject_boxes = self.detect_subject_regions(image)
-            subject_var, bg_var, detection_debug = self.calculate_subject_background_sharpness(image, subject_boxes)
+        if measurement is None and image is not None:
+            if filename is not None:
+                measurement = self.get_measurement(image, filename, context)
+            else:
+                measurement = self.measure(image, filename, context)
+        
+        if measurement is not None:
+            subject_var = measurement["subject_variance"]
+            bg_var = measurement["background_variance"]
             
             debug_info.update({
                 "subject_variance": round(subject_var, 2),
                 "background_variance": round(bg_var, 2),
                 "sharpness_ratio": round(subject_var / bg_var, 2) if bg_var > 0 else "N/A",
-                **detection_debug
+                **measurement["detection_debug"]
             })
         
-        return debug_info
\ No newline at end of file
+        return debug_info
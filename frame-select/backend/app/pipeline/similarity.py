@@ -0,0 +1,52 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+def feature_matrix(features: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack feature vectors, left-padding shorter ones with zeros so trailing statistical features line up."""
+    width = max(len(f) for f in features)
+    matrix = np.zeros((len(features), width), dtype=np.float64)
+    for row, f in enumerate(features):
+        if len(f):
+            matrix[row, width - len(f):] = f
+    return matrix
+
+class FeatureSimilarityIndex:
+    """Cosine-similarity neighbour search with bounded memory.
+
+    Rows are L2-normalized once; neighbours are found with blocked matrix
+    products so at most `block_bytes` of similarities are materialized at a time
+    instead of the full n x n matrix.
+    """
+
+    def __init__(self, features: np.ndarray, block_bytes: int = 64 * 1024 * 1024):
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.normalized = features / norms
+        self.block_rows = max(1, block_bytes // (8 * max(1, len(features))))
+
+    def neighbors(self, threshold: float, indices: Optional[Sequence[int]] = None) -> Dict[int, List[int]]:
+        """Map each row to the later rows whose cosine similarity is at least `threshold`.
+
+        With `indices`, only those rows are searched and the map is over positions in `indices`.
+        """
+        vectors = self.normalized if indices is None else self.normalized[list(indices)]
+        n = len(vectors)
+        neighbors = {}
+
+        for start in range(0, n, self.block_rows):
+            stop = min(n, start + self.block_rows)
+            block = vectors[start:stop] @ vectors[start:].T
+            rows, cols = np.nonzero(block >= threshold)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                i, j = start + row, start + col
+                if j > i:
+                    neighbors.setdefault(i, []).append(j)
+
+        return neighbors
+
+    def pairwise(self, indices: Sequence[int]) -> List[float]:
+        """Similarities of every unordered pair among `indices`, in (i, j) order with i < j."""
+        rows = self.normalized[list(indices)]
+        similarities = rows @ rows.T
+        upper = np.triu_indices(len(indices), k=1)
+        return similarities[upper].tolist()
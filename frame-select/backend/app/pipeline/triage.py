@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional
+from core.config import settings
+from pipeline.context import ImageContext
+
+class TriageGate:
+    """Cheap check that rejects obviously unusable frames before the expensive scorers.
+
+    Works on a small pyramid level of the analysis image: a frame is rejected
+    when it is nearly black or blown out, or when its Laplacian variance shows
+    almost no detail at all. Rejected frames skip the face, emotion, action,
+    composition and detection work and are scored with a minimal record, but
+    are still hashed so bursts of throwaways group as duplicates.
+    """
+
+    VERSION = 1
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or settings.TRIAGE
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config["enabled"])
+
+    def cache_config(self) -> Dict:
+        return {key: value for key, value in self.config.items() if key != "enabled"}
+
+    def check(self, image: np.ndarray, context: Optional[ImageContext] = None) -> Dict:
+        context = context or ImageContext(image)
+        small = context.level(self.config["size"]).gray
+
+        brightness = float(small.mean())
+        laplacian_variance = float(cv2.Laplacian(small, cv2.CV_64F).var())
+
+        reasons = []
+        if brightness < self.config["min_brightness"]:
+            reasons.append("too_dark")
+        elif brightness > self.config["max_brightness"]:
+            reasons.append("too_bright")
+        if laplacian_variance < self.config["min_laplacian_variance"]:
+            reasons.append("no_detail")
+
+        return {
+            "rejected": bool(reasons),
+            "reasons": reasons,
+            "brightness": round(brightness, 2),
+            "laplacian_variance": round(laplacian_variance, 2)
+        }
@@ -1,78 +1,200 @@
-import os
-import json
-import cv2
+import logging
+import threading
 import numpy as np
-from typing import Callable, Optional
-from PIL import Image
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from core.config import settings
-from core.models import ResultsResponse, ImageScore, DuplicateReport, DuplicateGroup
-from pipeline.score import ScoreCalculator
+from core.metrics import IMAGES_TOTAL, record_stages, timed
+from core.models import ResultsResponse, ResultsPage, ImageScore, DuplicateReport, DuplicateGroup, DuplicateBurst
+from pipeline.score import ScoreCalculator, resolve_weights, weighted_score
 from services.storage import StorageService
+from services.imaging import load_analysis_image, frames_within_budget, read_capture_time
+from services.parallel import AnalysisPool, measure_files
+from services.results_store import ResultsStore
+from services.results_index import DEFAULT_FIELDS, parse_score_bounds
+from services.score_cache import MeasurementCache, create_measurement_cache
+from services.weight_profiles import WeightProfileStore
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCancelled(Exception):
+    pass
 
 class AnalysisService:
-    def __init__(self, storage_service: StorageService):
+    def __init__(self, storage_service: StorageService, use_pool: bool = True):
         self.storage = storage_service
-        self.score_calculator = ScoreCalculator()
+        self.results_store = ResultsStore(storage_service)
+        self.weight_profiles = WeightProfileStore()
+        self._score_calculator = None
+        self._measurement_cache = None
+        self._calculator_lock = threading.Lock()
+        self.ready = False
+        
+        frame_budget = frames_within_budget(settings.ANALYSIS_MEMORY_LIMIT_MB)
+        workers = min(settings.MAX_WORKERS, frame_budget)
+        self.pool = AnalysisPool(workers) if use_pool and workers > 1 else None
+        self.batch_size = max(1, min(settings.DUPLICATE_DETECTION["batch_size"], frame_budget // max(1, workers)))
+    
+    @property
+    def score_calculator(self) -> ScoreCalculator:
+        if self._score_calculator is None:
+            with self._calculator_lock:
+                if self._score_calculator is None:
+                    self._score_calculator = ScoreCalculator()
+                    self._measurement_cache = create_measurement_cache(self._score_calculator.part_fingerprints())
+        return self._score_calculator
     
-    def analyze_upload(self, upload_id: str, progress_callback: Optional[Callable[[float], None]] = None):
+    @property
+    def measurement_cache(self) -> Optional[MeasurementCache]:
+        # Created alongside the shared calculator, whose scorers provide the fingerprints.
+        self.score_calculator
+        return self._measurement_cache
+    
+    def warm_up(self):
+        """Load models where images are measured, so the first analysis does not pay for it.
+        
+        With a pool that is only its workers: the shared calculator then just provides
+        cache fingerprints, which need no models.
+        """
+        if self.pool is not None:
+            self.pool.warm_up()
+        else:
+            self.score_calculator.warm_up()
+        self.ready = True
+    
+    def analyze_upload(self, upload_id: str, progress_callback: Optional[Callable[[float], None]] = None,
+                       calculator: Optional[ScoreCalculator] = None, should_cancel: Optional[Callable[[], bool]] = None,
+                       timings: Optional[Dict[str, float]] = None):
+        """Analyze an upload end to end.
+        
+        Concurrent analyses must each pass their own `calculator`, since it holds the
+        upload-level sharpness and duplicate state. `should_cancel` is polled once per
+        image; when it returns True the analysis stops with AnalysisCancelled. Seconds
+        spent per stage are added to `timings` when given.
+        """
         image_files = self.storage.get_image_files(upload_id)
         if not image_files:
             raise ValueError("No images found for upload")
         
-        self.score_calculator.reset_for_upload()
+        calculator = calculator or self.score_calculator
+        measurements = {}
         
-        variances = []
-        images_data = []
+        for i, (filename, measurement, error) in enumerate(self._measure_images(upload_id, image_files, calculator, timings)):
+            if should_cancel and should_cancel():
+                raise AnalysisCancelled(f"Analysis of upload {upload_id} was cancelled")
+            
+            if error is None:
+                measurements[filename] = measurement
+            
+            progress = (i + 1) / len(image_files) * 0.9
+            if progress_callback:
+                progress_callback(progress)
         
-        for i, filename in enumerate(image_files):
-            try:
-                image_path = self.storage.get_image_path(upload_id, filename)
-                image = self._load_and_resize_image(image_path)
-                
-                variance = self.score_calculator.collect_sharpness_variance(image, filename)
-                variances.append(variance)
-                images_data.append((filename, image, variance))
-                
-                progress = (i + 1) / len(image_files) * 0.3
-                if progress_callback:
-                    progress_callback(progress)
-                    
-            except Exception as e:
-                print(f"Failed to load {filename}: {e}")
+        return self.reduce_upload(upload_id, image_files, measurements, calculator, progress_callback, should_cancel, timings)
+    
+    def measure_chunk(self, upload_id: str, job_id: str, chunk_index: int, filenames: List[str],
+                      calculator: Optional[ScoreCalculator] = None, should_cancel: Optional[Callable[[], bool]] = None,
+                      timings: Optional[Dict[str, float]] = None, use_pool: bool = True):
+        """Map step of a queued job: measure one chunk of an upload and persist it for the reduce step.
+        
+        With `use_pool=False` the chunk is measured on the calling thread, e.g. so a profiler sampling it sees the scorers.
+        A chunk already persisted by an earlier attempt (a worker that died before marking the task done) is reused
+        as is; a chunk interrupted mid-way is measured again, from the measurement cache when it is enabled.
+        """
+        if self.results_store.has_chunk(upload_id, job_id, chunk_index):
+            logger.info(f"Reusing persisted chunk {chunk_index} of job {job_id}")
+            return
+        
+        calculator = calculator or self.score_calculator
+        records = []
+        
+        for filename, measurement, error in self._measure_images(upload_id, filenames, calculator, timings, use_pool):
+            if should_cancel and should_cancel():
+                raise AnalysisCancelled(f"Analysis of upload {upload_id} was cancelled")
+            
+            records.append({
+                "filename": filename,
+                "parts": calculator.measurement_parts(measurement) if measurement is not None else None
+            })
+        
+        with timed(timings, "persistence"):
+            self.results_store.write_chunk(upload_id, job_id, chunk_index, records)
+    
+    def reduce_job(self, upload_id: str, job_id: str, calculator: Optional[ScoreCalculator] = None,
+                   progress_callback: Optional[Callable[[float], None]] = None,
+                   should_cancel: Optional[Callable[[], bool]] = None,
+                   timings: Optional[Dict[str, float]] = None) -> ResultsResponse:
+        """Reduce step of a queued job: merge every chunk's measurements into the upload-level context and score."""
+        image_files = self.storage.get_image_files(upload_id)
+        if not image_files:
+            raise ValueError("No images found for upload")
+        
+        calculator = calculator or self.score_calculator
+        measurements = {}
+        
+        for record in self.results_store.read_chunks(upload_id, job_id):
+            if record["parts"] is None:
                 continue
+            measurement = calculator.assemble_measurement(record["filename"], record["parts"])
+            if measurement is not None:
+                measurements[record["filename"]] = measurement
         
-        duplicate_analysis = self.score_calculator.finalize_duplicate_analysis()
+        results = self.reduce_upload(upload_id, image_files, measurements, calculator, progress_callback, should_cancel, timings)
+        self.results_store.clear_chunks(upload_id, job_id)
+        return results
+    
+    def reduce_upload(self, upload_id: str, image_files: List[str], measurements: Dict[str, dict], calculator: ScoreCalculator,
+                      progress_callback: Optional[Callable[[float], None]] = None,
+                      should_cancel: Optional[Callable[[], bool]] = None,
+                      timings: Optional[Dict[str, float]] = None) -> ResultsResponse:
+        """Build the upload-level sharpness and duplicate context from the measurements, then score and rank."""
+        stage_timings = {}
+        calculator.reset_for_upload()
+        
+        with timed(stage_timings, "capture_times"):
+            # Only EXIF headers are read; bursts fall back to filename order without them.
+            capture_times = {
+                filename: read_capture_time(self.storage.get_image_path(upload_id, filename))
+                for filename in image_files if filename in measurements
+            }
+        
+        with timed(stage_timings, "duplicate_grouping"):
+            variances = {}
+            for filename in image_files:
+                if filename in measurements:
+                    variances[filename] = calculator.add_measurement(measurements[filename])
+            
+            duplicate_analysis = calculator.finalize_duplicate_analysis(capture_times)
         
         results = []
         
-        for i, (filename, image, variance) in enumerate(images_data):
-            try:
-                score_data = self.score_calculator.score_image_with_context(image, filename, variance)
+        with self.results_store.open_writer(upload_id) as writer:
+            for i, (filename, variance) in enumerate(variances.items()):
+                if should_cancel and should_cancel():
+                    raise AnalysisCancelled(f"Analysis of upload {upload_id} was cancelled")
                 
-                rank = i + 1
-                
-                image_result = ImageScore(
-                    image_id=filename,
-                    final_score=score_data["final_score"],
-                    tags=score_data["tags"],
-                    scores=score_data["scores"],
-                    rank=rank,
-                    debug_info=score_data.get("debug_info", {})
-                )
-                
-                results.append(image_result)
-                
-                progress = 0.3 + (i + 1) / len(images_data) * 0.6
-                if progress_callback:
-                    progress_callback(progress)
-                
-                self._save_partial_results(upload_id, results)
-                
-            except Exception as e:
-                print(f"Failed to analyze {filename}: {e}")
-                continue
+                try:
+                    with timed(stage_timings, "scoring"):
+                        score_data = calculator.score_measurement(measurements[filename], variance)
+                    
+                    image_result = ImageScore(
+                        image_id=filename,
+                        final_score=score_data["final_score"],
+                        tags=score_data["tags"],
+                        scores=score_data["scores"],
+                        rank=i + 1,
+                        debug_info=score_data.get("debug_info", {})
+                    )
+                    
+                    results.append(image_result)
+                    
+                    with timed(stage_timings, "persistence"):
+                        writer.append(image_result)
+                    
+                except Exception as e:
+                    logger.warning(f"Failed to score {filename}: {e}")
+                    continue
         
-        duplicate_report_data = self.score_calculator.get_duplicate_report()
+        duplicate_report_data = calculator.get_duplicate_report()
         duplicate_report = self._create_duplicate_report(duplicate_report_data)
         
         results.sort(key=lambda x: x.final_score, reverse=True)
@@ -92,13 +214,47 @@ class AnalysisService:
             metadata=upload_metadata,
             duplicate_report=duplicate_report
         )
-        self._save_results(upload_id, final_results)
+        with timed(stage_timings, "persistence"):
+            self.results_store.compact(upload_id, final_results)
+        record_stages(stage_timings, timings)
         
         if progress_callback:
             progress_callback(1.0)
         
         return final_results
     
+    def _measure_images(self, upload_id: str, image_files: List[str], calculator: ScoreCalculator,
+                        timings: Optional[Dict[str, float]] = None, use_pool: bool = True) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+        """Decode and measure each image once, yielding compact measurements; only the current batch of decoded frames is held.
+        
+        Per-image stage timings come back with each measurement, including from pool workers,
+        and are recorded here.
+        """
+        for filename, measurement, error in self._measure_outcomes(upload_id, image_files, calculator, use_pool):
+            if error is not None:
+                logger.warning(f"Failed to analyze {filename}: {error}")
+                IMAGES_TOTAL.inc(outcome="failed")
+            else:
+                stage_timings = measurement.pop("timings", {})
+                IMAGES_TOTAL.inc(outcome="cached" if "cache_lookup" in stage_timings else "measured")
+                record_stages(stage_timings, timings)
+            yield filename, measurement, error
+    
+    def _measure_outcomes(self, upload_id: str, image_files: List[str], calculator: ScoreCalculator,
+                          use_pool: bool) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+        items = [(self.storage.get_image_path(upload_id, filename), filename) for filename in image_files]
+        
+        if self.pool is not None and use_pool:
+            yield from self.pool.measure(items, self.batch_size)
+            return
+        
+        for start in range(0, len(items), self.batch_size):
+            yield from measure_files(calculator, items[start:start + self.batch_size], self.measurement_cache)
+    
+    def shutdown(self, wait: bool = False):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
+    
     def _create_duplicate_report(self, duplicate_data: dict) -> DuplicateReport:
         groups = []
         for group_data in duplicate_data.get("groups", []):
@@ -113,46 +269,67 @@ class AnalysisService:
         return DuplicateReport(
             summary=duplicate_data.get("summary", {}),
             groups=groups,
+            bursts=[DuplicateBurst(**burst_data) for burst_data in duplicate_data.get("bursts", [])],
             recommendations=duplicate_data.get("recommendations", [])
         )
     
-    def load_results(self, upload_id: str) -> ResultsResponse:
-        results_path = self.storage.get_results_path(upload_id)
+    def rerank_results(self, upload_id: str, weights: Optional[Dict[str, float]] = None,
+                       profile: Optional[str] = None, save_as: Optional[str] = None) -> ResultsResponse:
+        """Recompute final scores and ranks from the stored per-scorer scores, without re-running the pipeline.
+        
+        Weights are layered: SCORING_WEIGHTS, then the named profile, then `weights`.
+        The resolved weights can be saved as a new profile with `save_as`.
+        """
+        overrides = dict(self.weight_profiles.get(profile)) if profile else {}
+        overrides.update(weights or {})
+        resolved = resolve_weights(overrides)
         
-        if not os.path.exists(results_path):
-            raise FileNotFoundError(f"Results not found for upload {upload_id}")
+        stored = self.results_store.load(upload_id)
+        images = [
+            image.model_copy(update={"final_score": weighted_score(image.scores, resolved)})
+            for image in stored.images
+        ]
         
-        with open(results_path, 'r') as f:
-            data = json.load(f)
+        images.sort(key=lambda x: x.final_score, reverse=True)
+        for i, image in enumerate(images):
+            image.rank = i + 1
         
-        return ResultsResponse(**data)
+        if save_as:
+            self.weight_profiles.save(save_as, resolved)
+        
+        return stored.model_copy(update={
+            "images": images,
+            "metadata": {
+                **(stored.metadata or {}),
+                "weights": resolved,
+                "weight_profile": save_as or profile
+            }
+        })
     
-    def _load_and_resize_image(self, image_path: str) -> np.ndarray:
-        with Image.open(image_path) as pil_img:
-            if pil_img.mode != 'RGB':
-                pil_img = pil_img.convert('RGB')
-            
-            max_size = settings.ANALYSIS_MAX_SIZE
-            if max(pil_img.size) > max_size:
-                pil_img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            
-            img_array = np.array(pil_img)
-            
-            img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            
-            return img_bgr
+    def load_results(self, upload_id: str) -> ResultsResponse:
+        return self.results_store.load(upload_id)
     
-    def _save_partial_results(self, upload_id: str, results: list):
-        results_data = {
-            "upload_id": upload_id,
-            "images": [result.dict() for result in results]
-        }
+    def query_results(self, upload_id: str, offset: int = 0, limit: int = 50, sort: str = "rank",
+                      order: str = "asc", tags: Optional[List[str]] = None, exclude_tags: Optional[List[str]] = None,
+                      min_score: Optional[List[str]] = None, max_score: Optional[List[str]] = None,
+                      fields: Optional[List[str]] = None) -> ResultsPage:
+        """One page of an upload's images, filtered, sorted and projected through the cached results index."""
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
         
-        results_path = self.storage.get_results_path(upload_id)
-        with open(results_path, 'w') as f:
-            json.dump(results_data, f, indent=2)
+        index = self.results_store.index(upload_id)
+        page = index.query(
+            offset=offset,
+            limit=limit,
+            sort=sort,
+            descending=order == "desc",
+            tags=tags or (),
+            exclude_tags=exclude_tags or (),
+            min_scores=parse_score_bounds(min_score),
+            max_scores=parse_score_bounds(max_score),
+            fields=fields or DEFAULT_FIELDS
+        )
+        return ResultsPage(upload_id=upload_id, partial=index.partial, **page)
     
-    def _save_results(self, upload_id: str, results: ResultsResponse):
-        results_path = self.storage.get_results_path(upload_id)
-        with open(results_path, 'w') as f:
-            json.dump(results.dict(), f, indent=2)
\ No newline at end of file
+    def _load_and_resize_image(self, image_path: str) -> np.ndarray:
+        return load_analysis_image(image_path)
@@ -0,0 +1,48 @@
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+from core.config import settings
+
+class _ZipStream:
+    """Write-only, non-seekable sink for ZipFile.
+
+    ZipFile notices it cannot seek and writes data descriptors after each
+    entry instead of patching local headers, so the archive can be handed to
+    the client piece by piece.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_zip(files: Iterable[Tuple[str, str]], chunk_size: int = settings.EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive of `(path, arcname)` pairs as it is built.
+
+    Entries are stored uncompressed: the images are already compressed, so
+    deflating them again only costs CPU. This is a plain generator that reads
+    files synchronously; StreamingResponse runs it in the threadpool.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as zip_file:
+        for path, arcname in files:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, 'rb') as source, zip_file.open(info, 'w') as entry:
+                while True:
+                    data = source.read(chunk_size)
+                    if not data:
+                        break
+                    entry.write(data)
+                    yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
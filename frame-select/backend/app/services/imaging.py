@@ -0,0 +1,147 @@
+import io
+import cv2
+import numpy as np
+from datetime import datetime, timezone
+from typing import Optional
+from PIL import Image, ExifTags
+from core.config import settings
+
+_THUMBNAIL_OFFSET_TAG = 0x0201
+_THUMBNAIL_LENGTH_TAG = 0x0202
+
+# Peak bytes per analysis pixel while one frame is being measured: the BGR frame
+# plus its memoized grayscale, float32 grayscale, float64 Laplacian, Sobel
+# gradients and filter temporaries.
+ANALYSIS_BYTES_PER_PIXEL = 48
+
+def frames_within_budget(memory_limit_mb: int, max_size: int = None) -> int:
+    """Number of frames that can be decoded and measured at once within the memory ceiling."""
+    max_size = max_size or settings.ANALYSIS_MAX_SIZE
+    frame_bytes = max_size * max_size * ANALYSIS_BYTES_PER_PIXEL
+    return max(1, int(memory_limit_mb * 1024 * 1024 // frame_bytes))
+
+def draft_for_size(pil_img: Image.Image, max_size: int):
+    """Let the JPEG decoder downscale in the DCT domain (1/2, 1/4 or 1/8) while keeping the long side at least `max_size`."""
+    if not settings.FAST_JPEG_DECODE or pil_img.format not in ("JPEG", "MPO"):
+        return
+    
+    width, height = pil_img.size
+    scale = max_size / max(width, height)
+    if scale < 1:
+        pil_img.draft('RGB', (max(1, int(width * scale)), max(1, int(height * scale))))
+
+def _open_exif_thumbnail(pil_img: Image.Image) -> Optional[Image.Image]:
+    raw_exif = pil_img.info.get('exif')
+    if not raw_exif:
+        return None
+    
+    ifd1 = pil_img.getexif().get_ifd(ExifTags.IFD.IFD1)
+    offset, length = ifd1.get(_THUMBNAIL_OFFSET_TAG), ifd1.get(_THUMBNAIL_LENGTH_TAG)
+    if not offset or not length:
+        return None
+    
+    # Offsets are relative to the TIFF header, which follows the "Exif\0\0" marker.
+    start = offset + 6
+    return Image.open(io.BytesIO(raw_exif[start:start + length]))
+
+def embedded_preview(pil_img: Image.Image, min_size: int) -> Optional[Image.Image]:
+    """Smallest camera-embedded preview (EXIF IFD1 thumbnail or MPF preview frame) usable as a `min_size` thumbnail.
+    
+    Previews with a different aspect ratio than the original (letterboxed or cropped) are ignored.
+    Rejected candidates are closed; the caller owns, and should close, the preview returned.
+    """
+    width, height = pil_img.size
+    aspect = width / height
+    
+    def usable(preview: Image.Image) -> bool:
+        preview_width, preview_height = preview.size
+        return (max(preview.size) >= min_size and max(preview.size) < max(width, height)
+                and abs(preview_width / preview_height - aspect) <= 0.01 * aspect)
+    
+    thumbnail = None
+    try:
+        thumbnail = _open_exif_thumbnail(pil_img)
+        if thumbnail is not None and usable(thumbnail):
+            return thumbnail
+    except Exception:
+        pass
+    if thumbnail is not None:
+        thumbnail.close()
+    
+    preview = None
+    frames = getattr(pil_img, 'n_frames', 1)
+    for frame in range(1, frames):
+        try:
+            pil_img.seek(frame)
+            if usable(pil_img) and (preview is None or max(pil_img.size) < max(preview.size)):
+                if preview is not None:
+                    preview.close()
+                preview = pil_img.copy()
+        except Exception:
+            continue
+    if frames > 1:
+        pil_img.seek(0)
+    
+    return preview
+
+def save_thumbnail(image_path: str, thumb_path: str, max_size: int = None):
+    max_size = max_size or settings.THUMBNAIL_MAX_SIZE
+    
+    with Image.open(image_path) as pil_img:
+        preview = embedded_preview(pil_img, max_size) if settings.USE_EMBEDDED_PREVIEWS else None
+        img = preview if preview is not None else pil_img
+        
+        try:
+            draft_for_size(img, max_size)
+            
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            img.save(thumb_path, 'JPEG', quality=85, optimize=True)
+        finally:
+            if preview is not None:
+                preview.close()
+
+def load_analysis_image(image_path: str, max_size: int = None) -> np.ndarray:
+    max_size = max_size or settings.ANALYSIS_MAX_SIZE
+    
+    with Image.open(image_path) as pil_img:
+        draft_for_size(pil_img, max_size)
+        
+        if pil_img.mode != 'RGB':
+            pil_img = pil_img.convert('RGB')
+        
+        if max(pil_img.size) > max_size:
+            pil_img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        
+        img_array = np.array(pil_img)
+        
+        img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        
+        return img_bgr
+
+def read_capture_time(image_path: str) -> Optional[float]:
+    """EXIF capture time (DateTimeOriginal plus SubsecTimeOriginal, else DateTime) in seconds, or None.
+    
+    Only the file header is parsed. Camera clocks carry no time zone, so the value
+    is only meaningful relative to other photos from the same camera.
+    """
+    try:
+        with Image.open(image_path) as pil_img:
+            exif = pil_img.getexif()
+            exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+            value = exif_ifd.get(ExifTags.Base.DateTimeOriginal) or exif.get(ExifTags.Base.DateTime)
+            subsec = exif_ifd.get(ExifTags.Base.SubsecTimeOriginal) if exif_ifd.get(ExifTags.Base.DateTimeOriginal) else None
+        
+        if not value:
+            return None
+        
+        captured = datetime.strptime(str(value).strip("\x00 "), "%Y:%m:%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        seconds = captured.timestamp()
+        digits = "".join(c for c in str(subsec or "") if c.isdigit())
+        if digits:
+            seconds += float(f"0.{digits}")
+        return seconds
+    except Exception:
+        return None
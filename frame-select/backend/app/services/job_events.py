@@ -0,0 +1,105 @@
+import os
+import json
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from core.models import ImageScore
+from services.job_queue import JobQueue
+from services.results_store import ResultsStore
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+def format_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _progress_data(job: Dict) -> Dict:
+    return {
+        "status": job["status"],
+        "progress": job["progress"],
+        "phase": job["phase"],
+        "done_tasks": job["done_tasks"],
+        "total_tasks": job["total_tasks"],
+        "timings": job["timings"],
+        "error": job["error"],
+    }
+
+class JobEventStream:
+    """Server-Sent Events for one job.
+
+    Emits `progress` whenever the job row changes, an `image` event for every
+    ImageScore appended to the upload's partial results log while the job is
+    scoring, and a final `done` event. Images compacted into the final results
+    before the stream saw them are sent from there, so a client always receives
+    every image exactly once; `done` carries the final rank of every image.
+    """
+
+    def __init__(self, job_id: str, queue: JobQueue, results_store: ResultsStore):
+        self.job_id = job_id
+        self.queue = queue
+        self.results_store = results_store
+        self._sent: Set[str] = set()
+        self._offset = 0
+
+    def _new_images(self, upload_id: str) -> List[ImageScore]:
+        partial_path = self.results_store.storage.get_partial_results_path(upload_id)
+        try:
+            if os.path.getsize(partial_path) < self._offset:
+                # The log was restarted by a new reduce attempt.
+                self._offset = 0
+            images, self._offset = self.results_store.tail_partial(upload_id, self._offset)
+        except FileNotFoundError:
+            return []
+        return self._unsent(images)
+
+    def _final_images(self, upload_id: str) -> Tuple[List[ImageScore], Dict[str, int]]:
+        try:
+            images = self.results_store.load(upload_id).images
+        except FileNotFoundError:
+            return [], {}
+        return self._unsent(images), {image.image_id: image.rank for image in images}
+
+    def _unsent(self, images: List[ImageScore]) -> List[ImageScore]:
+        unsent = [image for image in images if image.image_id not in self._sent]
+        self._sent.update(image.image_id for image in unsent)
+        return unsent
+
+    async def events(self, is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> AsyncIterator[str]:
+        last_progress = None
+        last_sent_at = time.monotonic()
+
+        while True:
+            if is_disconnected and await is_disconnected():
+                return
+
+            job = await run_in_threadpool(self.queue.get, self.job_id)
+            if job is None:
+                yield format_event("error", {"detail": "Job not found"})
+                return
+
+            progress = _progress_data(job)
+            if progress != last_progress:
+                yield format_event("progress", progress)
+                last_progress = progress
+                last_sent_at = time.monotonic()
+
+            if job["phase"] == "reduce" and job["status"] == "running":
+                for image in await run_in_threadpool(self._new_images, job["upload_id"]):
+                    yield format_event("image", image.model_dump())
+                    last_sent_at = time.monotonic()
+
+            if job["status"] in TERMINAL_STATUSES:
+                done = dict(progress)
+                if job["status"] == "completed":
+                    remaining, done["ranks"] = await run_in_threadpool(self._final_images, job["upload_id"])
+                    for image in remaining:
+                        yield format_event("image", image.model_dump())
+                yield format_event("done", done)
+                return
+
+            if time.monotonic() - last_sent_at >= settings.JOB_EVENTS_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent_at = time.monotonic()
+
+            await asyncio.sleep(settings.JOB_EVENTS_POLL_SECONDS)
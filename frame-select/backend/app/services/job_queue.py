@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from core.config import settings
+from core.utils import ensure_dir
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    upload_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    phase TEXT NOT NULL DEFAULT 'map',
+    total_tasks INTEGER NOT NULL DEFAULT 0,
+    done_tasks INTEGER NOT NULL DEFAULT 0,
+    timings TEXT NOT NULL DEFAULT '{}',
+    profile INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    filenames TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker_id TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_upload ON jobs (upload_id, status);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id, status);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+"""
+
+def _job_dict(row: sqlite3.Row) -> Dict:
+    job = dict(row)
+    job["timings"] = json.loads(job.get("timings") or "{}")
+    job["profile"] = bool(job.get("profile"))
+    return job
+
+class JobQueue:
+    """Durable analysis job queue backed by SQLite in the shared storage directory.
+
+    Each job is split at enqueue time into map tasks of JOB_CHUNK_SIZE images.
+    Workers (API threads or standalone `app/worker.py` processes, on any host
+    sharing the storage directory) claim map tasks, highest job priority first;
+    once every chunk is measured one worker claims the job's reduce step, which
+    merges the upload-level sharpness and duplicate context and scores it.
+
+    Claimed work is heartbeated; tasks or reduces whose heartbeat goes stale
+    (worker died, host restarted) are put back in the queue. SQLite locking is
+    only reliable on a local or properly locking filesystem, so this is a
+    stand-in for a networked queue when workers run on several hosts.
+    """
+
+    def __init__(self, db_path: str = settings.JOBS_DB_PATH, stale_after: float = settings.JOB_STALE_SECONDS):
+        self.db_path = db_path
+        self.stale_after = stale_after
+        ensure_dir(os.path.dirname(db_path))
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, upload_id: str, filenames: List[str], priority: int = 0,
+                chunk_size: int = settings.JOB_CHUNK_SIZE, profile: bool = False) -> Dict:
+        """Queue an analysis of `upload_id`, or return the job already queued or running for it.
+
+        With `profile`, every map task and the reduce step run under the sampling profiler.
+        """
+        chunks = [filenames[start:start + chunk_size] for start in range(0, len(filenames), chunk_size)]
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            active = conn.execute(
+                f"SELECT * FROM jobs WHERE upload_id = ? AND status IN {ACTIVE_STATUSES} ORDER BY created_at LIMIT 1",
+                (upload_id,)
+            ).fetchone()
+            if active is not None:
+                conn.execute("COMMIT")
+                return _job_dict(active)
+
+            job_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO jobs (job_id, upload_id, status, priority, created_at, phase, total_tasks, profile) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, upload_id, priority, time.time(), "map" if chunks else "reduce", len(chunks), int(profile))
+            )
+            conn.executemany(
+                "INSERT INTO tasks (job_id, chunk_index, filenames, status) VALUES (?, ?, ?, 'queued')",
+                [(job_id, index, json.dumps(chunk)) for index, chunk in enumerate(chunks)]
+            )
+            conn.execute("COMMIT")
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job_dict(row) if row is not None else None
+
+    def _settle_cancelled(self, conn: sqlite3.Connection, now: float):
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+            f"WHERE cancel_requested = 1 AND status IN {ACTIVE_STATUSES} AND worker_id IS NULL "
+            "AND NOT EXISTS (SELECT 1 FROM tasks WHERE tasks.job_id = jobs.job_id AND tasks.status = 'running')",
+            (now,)
+        )
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically take the next unit of work.
+
+        Returns {"kind": "reduce", "job": ...} for a job whose chunks are all measured,
+        {"kind": "map", "job": ..., "task": ...} for a chunk to measure, or None.
+        """
+        now = time.time()
+        cutoff = now - self.stale_after
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET status = 'queued', worker_id = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            )
+            conn.execute(
+                "UPDATE jobs SET worker_id = NULL "
+                "WHERE status = 'running' AND phase = 'reduce' AND worker_id IS NOT NULL AND heartbeat_at < ?",
+                (cutoff,)
+            )
+            conn.execute(
+                "UPDATE tasks SET status = 'cancelled' WHERE status = 'queued' "
+                "AND job_id IN (SELECT job_id FROM jobs WHERE cancel_requested = 1)"
+            )
+            self._settle_cancelled(conn, now)
+
+            job = conn.execute(
+                f"SELECT job_id FROM jobs WHERE status IN {ACTIVE_STATUSES} AND phase = 'reduce' "
+                "AND worker_id IS NULL AND cancel_requested = 0 ORDER BY priority DESC, created_at LIMIT 1"
+            ).fetchone()
+            if job is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                    (worker_id, now, now, job["job_id"])
+                )
+                conn.execute("COMMIT")
+                return {"kind": "reduce", "job": self.get(job["job_id"])}
+
+            task = conn.execute(
+                "SELECT tasks.* FROM tasks JOIN jobs ON jobs.job_id = tasks.job_id "
+                f"WHERE tasks.status = 'queued' AND jobs.status IN {ACTIVE_STATUSES} AND jobs.cancel_requested = 0 "
+                "ORDER BY jobs.priority DESC, jobs.created_at, tasks.chunk_index LIMIT 1"
+            ).fetchone()
+            if task is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker_id = ?, heartbeat_at = ? WHERE task_id = ?",
+                (worker_id, now, task["task_id"])
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                (now, task["job_id"])
+            )
+            conn.execute("COMMIT")
+
+        task = dict(task)
+        task["filenames"] = json.loads(task["filenames"])
+        return {"kind": "map", "job": self.get(task["job_id"]), "task": task}
+
+    def heartbeat(self, kind: str, item_id, worker_id: str):
+        table, key = ("tasks", "task_id") if kind == "map" else ("jobs", "job_id")
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE {table} SET heartbeat_at = ? WHERE {key} = ? AND worker_id = ? AND status = 'running'",
+                (time.time(), item_id, worker_id)
+            )
+
+    def release(self, kind: str, item_id, worker_id: str):
+        """Give claimed work back to the queue, e.g. when its worker shuts down."""
+        if kind == "map":
+            query = "UPDATE tasks SET status = 'queued', worker_id = NULL WHERE task_id = ? AND worker_id = ? AND status = 'running'"
+        else:
+            query = "UPDATE jobs SET worker_id = NULL WHERE job_id = ? AND worker_id = ? AND status = 'running'"
+        with self._connect() as conn:
+            conn.execute(query, (item_id, worker_id))
+
+    def complete_task(self, task_id: int, worker_id: str):
+        """Mark a chunk measured; the last chunk of a job moves it to the reduce phase."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE tasks SET status = 'done', heartbeat_at = ? WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (time.time(), task_id, worker_id)
+            ).rowcount
+            if updated:
+                job_id = conn.execute("SELECT job_id FROM tasks WHERE task_id = ?", (task_id,)).fetchone()["job_id"]
+                conn.execute(
+                    "UPDATE jobs SET done_tasks = (SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status = 'done') "
+                    "WHERE job_id = ?",
+                    (job_id, job_id)
+                )
+                conn.execute(
+                    "UPDATE jobs SET progress = 0.9 * done_tasks / total_tasks, "
+                    "phase = CASE WHEN done_tasks = total_tasks THEN 'reduce' ELSE phase END WHERE job_id = ?",
+                    (job_id,)
+                )
+                self._settle_cancelled(conn, time.time())
+            conn.execute("COMMIT")
+
+    def cancel_task(self, task_id: int, worker_id: str):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET status = 'cancelled' WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (task_id, worker_id)
+            )
+            self._settle_cancelled(conn, time.time())
+            conn.execute("COMMIT")
+
+    def fail_task(self, task_id: int, worker_id: str, error: str) -> bool:
+        """A chunk that cannot be measured fails its whole job; returns whether this call failed it."""
+        now = time.time()
+        failed = False
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id FROM tasks WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (task_id, worker_id)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE tasks SET status = 'failed' WHERE task_id = ?", (task_id,))
+                conn.execute(
+                    "UPDATE tasks SET status = 'cancelled' WHERE job_id = ? AND status = 'queued'",
+                    (row["job_id"],)
+                )
+                failed = conn.execute(
+                    f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ? AND status IN {ACTIVE_STATUSES}",
+                    (error, now, row["job_id"])
+                ).rowcount > 0
+            conn.execute("COMMIT")
+        return failed
+
+    def add_timings(self, job_id: str, stage_timings: Dict[str, float]):
+        """Accumulate seconds spent per pipeline stage (summed across chunks and workers)."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT timings FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                timings = json.loads(row["timings"] or "{}")
+                for stage, seconds in stage_timings.items():
+                    timings[stage] = round(timings.get(stage, 0.0) + seconds, 3)
+                conn.execute("UPDATE jobs SET timings = ? WHERE job_id = ?", (json.dumps(timings), job_id))
+            conn.execute("COMMIT")
+
+    def update_progress(self, job_id: str, worker_id: str, progress: float):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (progress, time.time(), job_id, worker_id)
+            )
+
+    def finish(self, job_id: str, worker_id: str, status: str, error: Optional[str] = None):
+        """Record the outcome of a job's reduce step, unless it has since been requeued and claimed elsewhere."""
+        progress_update = ", progress = 1.0" if status == "completed" else ""
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker_id = NULL{progress_update} "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (status, error, time.time(), job_id, worker_id)
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a job: queued chunks are dropped at once, running chunks and reduces are asked to stop."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN {ACTIVE_STATUSES}",
+                (job_id,)
+            )
+            conn.execute(
+                "UPDATE tasks SET status = 'cancelled' WHERE job_id = ? AND status = 'queued'",
+                (job_id,)
+            )
+            self._settle_cancelled(conn, time.time())
+            conn.execute("COMMIT")
+
+        return self.get(job_id)
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
@@ -0,0 +1,260 @@
+import os
+import time
+import socket
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from core.config import settings
+from core.metrics import JOBS_FINISHED
+from core.profiling import SamplingProfiler
+from pipeline.score import ScoreCalculator
+from services.analyze import AnalysisService, AnalysisCancelled
+from services.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+class JobRunner:
+    """Dedicated worker threads that pull map and reduce work from the JobQueue.
+
+    Runs inside the API process (JOB_WORKERS threads) and in standalone
+    `app/worker.py` processes alike. Each worker owns its own ScoreCalculator,
+    so concurrent jobs never share upload-level sharpness or duplicate state;
+    it is created on the worker's first reduce or in-process map, and only the
+    latter loads models, since pooled chunks are measured by the pool workers.
+    A separate thread heartbeats the work currently claimed here so other
+    runners can tell it is alive. Work of jobs enqueued with `profile` runs
+    under a SamplingProfiler whose stacks are saved per task in the storage
+    directory.
+    """
+
+    def __init__(self, queue: JobQueue, analysis_service: AnalysisService, workers: int = settings.JOB_WORKERS):
+        self.queue = queue
+        self.analysis_service = analysis_service
+        self.workers = workers
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._claimed: Dict[str, Tuple[str, object]] = {}
+        self._claimed_lock = threading.Lock()
+        self._warmed: Set[str] = set()
+
+    def start(self, warm_up: bool = False):
+        """Start the worker threads; with `warm_up`, load models where this runner measures before the first job.
+
+        That is the AnalysisService's process pool when it has one, otherwise each
+        worker thread's own calculator.
+        """
+        if self.workers == 0:
+            # API-only process: analysis runs in app/worker.py processes, so nothing to warm or heartbeat.
+            return
+        if warm_up and self.analysis_service.pool is not None:
+            threading.Thread(target=self.analysis_service.warm_up, daemon=True).start()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.runner_id}:{index}", warm_up), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    @property
+    def ready(self) -> bool:
+        """Whether everything this runner measures with has its models loaded."""
+        if self.workers == 0:
+            return True
+        if self.analysis_service.pool is not None:
+            return self.analysis_service.ready
+        with self._claimed_lock:
+            return len(self._warmed) == self.workers
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        with self._claimed_lock:
+            claimed = dict(self._claimed)
+        for worker_id, (kind, item_id) in claimed.items():
+            self.queue.release(kind, item_id, worker_id)
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _heartbeat(self):
+        while not self._stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+            with self._claimed_lock:
+                claimed = dict(self._claimed)
+            for worker_id, (kind, item_id) in claimed.items():
+                try:
+                    self.queue.heartbeat(kind, item_id, worker_id)
+                except Exception:
+                    # Retried next interval; the work is only requeued once it misses JOB_STALE_SECONDS.
+                    logger.exception(f"Could not heartbeat {kind} {item_id}")
+
+    def _work(self, worker_id: str, warm_up: bool = False):
+        # Built on first reduce or in-process map: chunks sent to the process pool are measured by
+        # the pool workers' own calculators, so most runner threads never need models loaded here.
+        calculator: Optional[ScoreCalculator] = None
+        warmed_up = False
+        if warm_up and self.analysis_service.pool is None:
+            calculator = ScoreCalculator()
+            warmed_up = self._warm_up(calculator, worker_id)
+
+        while not self._stop.is_set():
+            try:
+                work = self.queue.claim(worker_id)
+            except Exception:
+                # E.g. the queue database stayed locked past its timeout; back off and try again.
+                logger.exception(f"Worker {worker_id} could not claim work")
+                self._stop.wait(settings.JOB_POLL_SECONDS)
+                continue
+            if work is None:
+                self._wake.wait(settings.JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+
+            if work["kind"] == "map":
+                item = ("map", work["task"]["task_id"])
+            else:
+                item = ("reduce", work["job"]["job_id"])
+
+            with self._claimed_lock:
+                self._claimed[worker_id] = item
+            profiler = SamplingProfiler() if work["job"]["profile"] else None
+            try:
+                if profiler is not None:
+                    profiler.start()
+                use_pool = profiler is None and self.analysis_service.pool is not None
+                if work["kind"] == "map" and use_pool:
+                    self._run_map(work["job"], work["task"], worker_id, None, use_pool=True)
+                else:
+                    calculator = calculator or ScoreCalculator()
+                    if work["kind"] == "map":
+                        # Reduce only merges measurements; models are needed to measure in this thread.
+                        if not warmed_up:
+                            warmed_up = self._warm_up(calculator, worker_id)
+                        self._run_map(work["job"], work["task"], worker_id, calculator, use_pool=False)
+                    else:
+                        self._run_reduce(work["job"], worker_id, calculator)
+            except Exception:
+                # The outcome could not be recorded; once its heartbeat stops the work is requeued as stale.
+                logger.exception(f"Worker {worker_id} failed on {item[0]} {item[1]}")
+                self._stop.wait(settings.JOB_POLL_SECONDS)
+            finally:
+                with self._claimed_lock:
+                    self._claimed.pop(worker_id, None)
+                if profiler is not None:
+                    profiler.stop()
+                    self._save_profile(profiler, work["job"]["job_id"], f"{item[0]}-{item[1]}")
+
+    def _warm_up(self, calculator: ScoreCalculator, worker_id: str) -> bool:
+        try:
+            calculator.warm_up()
+            with self._claimed_lock:
+                self._warmed.add(worker_id)
+            return True
+        except Exception as e:
+            logger.warning(f"Worker {worker_id} failed to warm up: {e}")
+            return False
+
+    def _save_profile(self, profiler: SamplingProfiler, job_id: str, name: str):
+        path = os.path.join(self.analysis_service.storage.get_profiles_dir(job_id), f"{name}.folded")
+        try:
+            profiler.write(path)
+        except OSError as e:
+            logger.warning(f"Could not save profile {path}: {e}")
+
+    def _should_cancel(self, job_id: str):
+        """Cancellation check polled once per image; the queue is asked at most every JOB_CANCEL_POLL_SECONDS."""
+        checked_at = None
+        cancelled = False
+
+        def should_cancel() -> bool:
+            nonlocal checked_at, cancelled
+            if self._stop.is_set():
+                return True
+            now = time.monotonic()
+            if not cancelled and (checked_at is None or now - checked_at >= settings.JOB_CANCEL_POLL_SECONDS):
+                cancelled = self.queue.cancel_requested(job_id)
+                checked_at = now
+            return cancelled
+
+        return should_cancel
+
+    def _run_map(self, job: Dict, task: Dict, worker_id: str, calculator: Optional[ScoreCalculator], use_pool: bool = True):
+        started = time.perf_counter()
+        timings = {}
+        try:
+            self.analysis_service.measure_chunk(
+                job["upload_id"],
+                job["job_id"],
+                task["chunk_index"],
+                task["filenames"],
+                calculator=calculator,
+                should_cancel=self._should_cancel(job["job_id"]),
+                timings=timings,
+                use_pool=use_pool
+            )
+            timings["measure"] = time.perf_counter() - started
+            self.queue.add_timings(job["job_id"], timings)
+            self.queue.complete_task(task["task_id"], worker_id)
+        except AnalysisCancelled:
+            if self._stop.is_set():
+                self.queue.release("map", task["task_id"], worker_id)
+            else:
+                self.queue.cancel_task(task["task_id"], worker_id)
+                self._discard_chunks(job)
+        except Exception as e:
+            logger.exception(f"Chunk {task['chunk_index']} of job {job['job_id']} failed")
+            if self.queue.fail_task(task["task_id"], worker_id, str(e)):
+                JOBS_FINISHED.inc(status="failed")
+            self._discard_chunks(job)
+
+    def _run_reduce(self, job: Dict, worker_id: str, calculator: ScoreCalculator):
+        job_id = job["job_id"]
+        last_update = 0.0
+        started = time.perf_counter()
+        timings = {}
+
+        def progress_callback(progress: float):
+            nonlocal last_update
+            now = time.monotonic()
+            if now - last_update >= settings.JOB_PROGRESS_INTERVAL_SECONDS:
+                self.queue.update_progress(job_id, worker_id, progress)
+                last_update = now
+
+        try:
+            self.analysis_service.reduce_job(
+                job["upload_id"],
+                job_id,
+                calculator=calculator,
+                progress_callback=progress_callback,
+                should_cancel=self._should_cancel(job_id),
+                timings=timings
+            )
+            timings["reduce"] = time.perf_counter() - started
+            self.queue.add_timings(job_id, timings)
+            self._finish(job_id, worker_id, "completed")
+        except AnalysisCancelled:
+            if self._stop.is_set():
+                self.queue.release("reduce", job_id, worker_id)
+            else:
+                self._finish(job_id, worker_id, "cancelled")
+                self._discard_chunks(job)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            self._finish(job_id, worker_id, "failed", str(e))
+            self._discard_chunks(job)
+
+    def _discard_chunks(self, job: Dict):
+        """Drop the measured chunks of a job that will not reach a successful reduce."""
+        self.analysis_service.results_store.clear_chunks(job["upload_id"], job["job_id"])
+
+    def _finish(self, job_id: str, worker_id: str, status: str, error: Optional[str] = None):
+        self.queue.finish(job_id, worker_id, status, error)
+        JOBS_FINISHED.inc(status=status)
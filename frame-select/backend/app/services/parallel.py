@@ -0,0 +1,145 @@
+import time
+import logging
+import multiprocessing
+import cv2
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+from pipeline.score import ScoreCalculator
+from services.imaging import load_analysis_image
+from services.score_cache import MeasurementCache, create_measurement_cache
+
+logger = logging.getLogger(__name__)
+
+_worker_calculator: Optional[ScoreCalculator] = None
+_worker_cache: Optional[MeasurementCache] = None
+
+def _init_worker():
+    global _worker_calculator, _worker_cache
+    
+    # Each worker is single-threaded; parallelism comes from the pool itself.
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    
+    _worker_calculator = ScoreCalculator()
+    _worker_calculator.warm_up()
+    _worker_cache = create_measurement_cache(_worker_calculator.part_fingerprints())
+
+def measure_files(calculator: ScoreCalculator, items: List[Tuple[str, str]], cache: Optional[MeasurementCache] = None) -> List[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    """Decode a batch of (image_path, filename) items and measure them with one detector pass.
+    
+    With a cache, images whose measurements are fully cached are not decoded at all,
+    and only the missing parts are computed for the rest.
+    """
+    outcomes = []
+    frames = []
+    cached_parts = {}
+    content_hashes = {}
+    decode_seconds = {}
+    
+    for image_path, filename in items:
+        try:
+            if cache is not None:
+                started = time.perf_counter()
+                content_hash = cache.content_hash(image_path)
+                parts = cache.get(content_hash)
+                measurement = calculator.assemble_measurement(filename, parts)
+                if measurement is not None:
+                    measurement["timings"]["cache_lookup"] = time.perf_counter() - started
+                    outcomes.append((filename, measurement, None))
+                    continue
+                content_hashes[filename] = content_hash
+                cached_parts[filename] = parts
+            started = time.perf_counter()
+            frames.append((filename, load_analysis_image(image_path)))
+            decode_seconds[filename] = time.perf_counter() - started
+        except Exception as e:
+            outcomes.append((filename, None, e))
+    
+    measured = calculator.measure_images(frames, cached_parts)
+    for filename, measurement, _ in measured:
+        if measurement is not None:
+            measurement["timings"]["decode"] = decode_seconds[filename]
+    
+    if cache is not None:
+        for filename, measurement, _ in measured:
+            if measurement is None:
+                continue
+            try:
+                cache.put(content_hashes[filename], calculator.measurement_parts(measurement))
+            except Exception as e:
+                logger.warning(f"Could not cache measurement for {filename}: {e}")
+    
+    outcomes.extend(measured)
+    return outcomes
+
+def _noop():
+    return None
+
+def _measure_chunk(items: List[Tuple[str, str]]) -> List[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    return measure_files(_worker_calculator, items, _worker_cache)
+
+class AnalysisPool:
+    """Process pool that runs the per-image (map) half of the pipeline.
+
+    Every worker owns its own ScoreCalculator, so cascades and the YOLO model
+    are loaded once per worker and reused across images and uploads.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn rather than fork: forking after torch has started its thread pools can deadlock.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._executor
+    
+    def measure(self, items: List[Tuple[str, str]], batch_size: int = 1) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        """Measure (image_path, filename) items in batches, yielding (filename, measurement, error) as batches complete."""
+        executor = self._get_executor()
+        futures = {}
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            futures[executor.submit(_measure_chunk, chunk)] = chunk
+        
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield from future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    for _, filename in futures[future]:
+                        yield filename, None, e
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def warm_up(self):
+        """Start the workers so their cascades and detector load before the first job."""
+        executor = self._get_executor()
+        try:
+            for future in [executor.submit(_noop) for _ in range(self.max_workers)]:
+                future.result()
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+    
+    def shutdown(self, wait: bool = False):
+        """Stop the workers; with `wait`, block until they have exited and been reaped."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
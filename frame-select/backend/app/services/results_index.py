@@ -0,0 +1,101 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from core.models import ImageScore, ResultsResponse
+
+IMAGE_FIELDS = tuple(ImageScore.model_fields)
+DEFAULT_FIELDS = tuple(field for field in IMAGE_FIELDS if field != "debug_info")
+
+def parse_score_bounds(values: Optional[Sequence[str]]) -> Dict[str, float]:
+    """Parse `name:value` query bounds such as `sharpness:0.6`."""
+    bounds = {}
+    for value in values or ():
+        name, separator, threshold = value.partition(":")
+        try:
+            bounds[name] = float(threshold)
+        except ValueError:
+            separator = ""
+        if not separator or not name:
+            raise ValueError(f"Invalid score bound '{value}', expected name:value")
+    return bounds
+
+class ResultsIndex:
+    """Column-oriented index over one upload's scored images.
+
+    Scores are held as numpy columns and tags as boolean masks, so filtering is
+    a handful of vectorized comparisons. Sort orders are computed once per key
+    and reused by every page request.
+    """
+
+    def __init__(self, results: ResultsResponse):
+        self.images = results.images
+        self.partial = bool((results.metadata or {}).get("partial"))
+        self.ids = [image.image_id for image in self.images]
+        self.columns: Dict[str, np.ndarray] = {
+            "final_score": np.array([image.final_score for image in self.images], dtype=np.float64),
+            "rank": np.array([image.rank if image.rank is not None else i + 1 for i, image in enumerate(self.images)], dtype=np.float64),
+        }
+
+        score_types = sorted({score_type for image in self.images for score_type in image.scores})
+        for score_type in score_types:
+            self.columns[score_type] = np.array(
+                [image.scores.get(score_type, np.nan) for image in self.images], dtype=np.float64
+            )
+
+        self.tags: Dict[str, np.ndarray] = {}
+        for row, image in enumerate(self.images):
+            for tag in image.tags:
+                if tag not in self.tags:
+                    self.tags[tag] = np.zeros(len(self.images), dtype=bool)
+                self.tags[tag][row] = True
+
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    @property
+    def sort_keys(self) -> List[str]:
+        return ["image_id", *self.columns]
+
+    def _order(self, sort: str, descending: bool) -> np.ndarray:
+        """Row order for a sort key; ties keep rank order and missing scores sort last."""
+        key = (sort, descending)
+        if key not in self._orders:
+            if sort == "image_id":
+                order = np.array(sorted(range(len(self.ids)), key=self.ids.__getitem__), dtype=np.int64)
+                self._orders[key] = order[::-1] if descending else order
+            elif sort in self.columns:
+                values = -self.columns[sort] if descending else self.columns[sort]
+                self._orders[key] = np.lexsort((self.columns["rank"], values))
+            else:
+                raise ValueError(f"Cannot sort by '{sort}'. Valid keys: {', '.join(self.sort_keys)}")
+        return self._orders[key]
+
+    def query(self, offset: int = 0, limit: int = 50, sort: str = "rank", descending: bool = False,
+              tags: Sequence[str] = (), exclude_tags: Sequence[str] = (),
+              min_scores: Optional[Dict[str, float]] = None, max_scores: Optional[Dict[str, float]] = None,
+              fields: Sequence[str] = DEFAULT_FIELDS) -> Dict[str, Any]:
+        unknown_fields = set(fields) - set(IMAGE_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+
+        mask = np.ones(len(self.images), dtype=bool)
+        for tag in tags:
+            mask &= self.tags.get(tag, np.zeros(len(self.images), dtype=bool))
+        for tag in exclude_tags:
+            if tag in self.tags:
+                mask &= ~self.tags[tag]
+
+        for bounds, compare in ((min_scores, np.greater_equal), (max_scores, np.less_equal)):
+            for column, value in (bounds or {}).items():
+                if column not in self.columns:
+                    raise ValueError(f"Cannot filter on '{column}'. Valid scores: {', '.join(self.columns)}")
+                mask &= compare(self.columns[column], value)
+
+        order = self._order(sort, descending)
+        matches = order[mask[order]]
+
+        page = matches[offset:offset + limit]
+        return {
+            "total": int(len(matches)),
+            "offset": offset,
+            "limit": limit,
+            "images": [self.images[row].model_dump(include=set(fields)) for row in page.tolist()],
+        }
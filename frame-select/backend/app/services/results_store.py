@@ -0,0 +1,168 @@
+import os
+import json
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Tuple
+from core.config import settings
+from core.utils import ensure_dir, json_default
+from core.models import ResultsResponse, ImageScore
+from services.storage import StorageService
+from services.results_index import ResultsIndex
+
+class ResultsWriter:
+    """Appends one NDJSON record per scored image to an upload's partial results log.
+    
+    Used as a context manager, the log is deleted if the block raises (a cancelled or
+    failed reduce), so readers go back to the last complete results.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w')
+    
+    def append(self, image: ImageScore):
+        self._file.write(json.dumps(image.model_dump()) + "\n")
+        self._file.flush()
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+class ResultsStore:
+    """Per-upload results persistence.
+
+    While a job runs, scored images are appended to `<upload_id>.partial.ndjson`;
+    when it finishes, the log is compacted into the final `<upload_id>.json`.
+    Recently loaded final results, and their query index, are kept in memory
+    keyed by file mtime, and must be treated as read-only by callers.
+    """
+
+    def __init__(self, storage_service: StorageService, cache_size: int = settings.RESULTS_CACHE_SIZE):
+        self.storage = storage_service
+        self.cache_size = cache_size
+        # upload_id -> [mtime, results, index or None]
+        self._cache: "OrderedDict[str, list]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def open_writer(self, upload_id: str) -> ResultsWriter:
+        return ResultsWriter(self.storage.get_partial_results_path(upload_id))
+    
+    def compact(self, upload_id: str, results: ResultsResponse):
+        results_path = self.storage.get_results_path(upload_id)
+        temp_path = results_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(results.model_dump(), f, indent=2)
+        os.replace(temp_path, results_path)
+        
+        partial_path = self.storage.get_partial_results_path(upload_id)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    
+    def write_chunk(self, upload_id: str, job_id: str, chunk_index: int, records: List[Dict]):
+        """Persist the measurements of one map task so any worker can run the reduce step."""
+        chunk_dir = self.storage.get_chunk_results_dir(upload_id, job_id)
+        ensure_dir(chunk_dir)
+        
+        chunk_path = os.path.join(chunk_dir, f"{chunk_index}.json")
+        temp_path = f"{chunk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(records, f, default=json_default)
+        os.replace(temp_path, chunk_path)
+    
+    def has_chunk(self, upload_id: str, job_id: str, chunk_index: int) -> bool:
+        return os.path.exists(os.path.join(self.storage.get_chunk_results_dir(upload_id, job_id), f"{chunk_index}.json"))
+    
+    def read_chunks(self, upload_id: str, job_id: str) -> Iterator[Dict]:
+        chunk_dir = self.storage.get_chunk_results_dir(upload_id, job_id)
+        if not os.path.isdir(chunk_dir):
+            return
+        
+        chunk_files = [name for name in os.listdir(chunk_dir) if name.endswith(".json")]
+        for name in sorted(chunk_files, key=lambda n: int(n.split(".")[0])):
+            with open(os.path.join(chunk_dir, name), 'r') as f:
+                yield from json.load(f)
+    
+    def clear_chunks(self, upload_id: str, job_id: str):
+        shutil.rmtree(self.storage.get_chunk_results_dir(upload_id, job_id), ignore_errors=True)
+    
+    def read_partial(self, upload_id: str, offset: int = 0) -> List[ImageScore]:
+        images, _ = self.tail_partial(upload_id, offset)
+        return images
+    
+    def tail_partial(self, upload_id: str, offset: int = 0) -> Tuple[List[ImageScore], int]:
+        """Complete records appended to the partial log since byte `offset`, and the offset after them.
+        
+        Raises FileNotFoundError when no job is writing results for the upload.
+        """
+        partial_path = self.storage.get_partial_results_path(upload_id)
+        
+        with open(partial_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        
+        complete = data[:data.rfind(b"\n") + 1]
+        images = [ImageScore(**json.loads(line)) for line in complete.splitlines() if line]
+        return images, offset + len(complete)
+    
+    def load(self, upload_id: str) -> ResultsResponse:
+        try:
+            images = self.read_partial(upload_id)
+        except FileNotFoundError:
+            # No job is writing results, or compact() removed the log after writing the final JSON.
+            pass
+        else:
+            return ResultsResponse(
+                upload_id=upload_id,
+                images=images,
+                metadata={"partial": True, "total_images": len(images)}
+            )
+        
+        results_path = self.storage.get_results_path(upload_id)
+        if not os.path.exists(results_path):
+            raise FileNotFoundError(f"Results not found for upload {upload_id}")
+        
+        mtime = os.path.getmtime(results_path)
+        with self._cache_lock:
+            cached = self._cache.get(upload_id)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(upload_id)
+                return cached[1]
+        
+        with open(results_path, 'r') as f:
+            data = json.load(f)
+        
+        results = ResultsResponse(**data)
+        
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[upload_id] = [mtime, results, None]
+                self._cache.move_to_end(upload_id)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        return results
+    
+    def index(self, upload_id: str) -> ResultsIndex:
+        """Query index over an upload's results; cached alongside final results, rebuilt for partial ones."""
+        results = self.load(upload_id)
+        
+        with self._cache_lock:
+            entry = self._cache.get(upload_id)
+            if entry is not None and entry[1] is results:
+                if entry[2] is None:
+                    entry[2] = ResultsIndex(results)
+                return entry[2]
+        
+        return ResultsIndex(results)
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+from core.config import settings
+from core.utils import ensure_dir, json_default
+
+logger = logging.getLogger(__name__)
+
+class MeasurementCache:
+    """Content-addressed cache of per-image measurements.
+
+    Entries are keyed by the SHA-256 of the original file bytes, so re-analysing
+    an upload or uploading the same frames again reuses earlier work. Each scorer's
+    part of a measurement is stored with that scorer's fingerprint (version plus
+    relevant settings) and is only reused while the fingerprint still matches;
+    parts with a stale fingerprint are dropped when the entry is next written.
+    Entries unused for `max_age_seconds` are pruned, then the least recently used
+    ones until the cache fits in `max_bytes`. Every process sharing the cache
+    writes to it, so pruning runs at most once per `prune_interval` across them,
+    coordinated through the mtime of a marker file.
+    """
+
+    def __init__(self, cache_dir: str, fingerprints: Dict[str, str],
+                 max_bytes: Optional[int] = settings.MEASUREMENT_CACHE_MAX_MB * 1024 * 1024,
+                 max_age_seconds: Optional[float] = settings.MEASUREMENT_CACHE_MAX_AGE_DAYS * 86400,
+                 prune_interval: float = settings.MEASUREMENT_CACHE_PRUNE_INTERVAL_SECONDS):
+        self.cache_dir = cache_dir
+        self.fingerprints = fingerprints
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.prune_interval = prune_interval
+        self._prune_marker = os.path.join(cache_dir, ".last_prune")
+        self._next_prune_check = 0.0
+        ensure_dir(cache_dir)
+
+    @staticmethod
+    def content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.json")
+
+    def _read(self, content_hash: str) -> Dict[str, Dict]:
+        try:
+            with open(self._entry_path(content_hash), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, content_hash: str) -> Dict[str, Any]:
+        """Return the cached measurement parts whose fingerprints match the current pipeline."""
+        parts = {
+            part: entry["value"]
+            for part, entry in self._read(content_hash).items()
+            if entry.get("fingerprint") == self.fingerprints.get(part)
+        }
+        if parts:
+            # The entry's mtime is its last use, for pruning.
+            try:
+                os.utime(self._entry_path(content_hash))
+            except OSError:
+                pass
+        return parts
+
+    def put(self, content_hash: str, parts: Dict[str, Any]):
+        entries = {
+            part: entry
+            for part, entry in self._read(content_hash).items()
+            if entry.get("fingerprint") == self.fingerprints.get(part)
+        }
+        for part, value in parts.items():
+            entries[part] = {"fingerprint": self.fingerprints.get(part), "value": value}
+
+        entry_path = self._entry_path(content_hash)
+        ensure_dir(os.path.dirname(entry_path))
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(entries, f, default=json_default)
+        os.replace(temp_path, entry_path)
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now < self._next_prune_check:
+            return
+        self._next_prune_check = now + min(self.prune_interval, 60.0)
+
+        try:
+            if now - os.path.getmtime(self._prune_marker) < self.prune_interval:
+                return
+        except FileNotFoundError:
+            pass
+        with open(self._prune_marker, 'w'):
+            pass
+        self.prune()
+
+    def prune(self) -> int:
+        """Remove expired entries, then the least recently used until the cache fits; returns the number removed."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            expired = self.max_age_seconds is not None and now - mtime > self.max_age_seconds
+            oversized = self.max_bytes is not None and total > self.max_bytes
+            if not expired and not oversized:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Pruned {removed} measurement cache entries, {total / 1024 / 1024:.1f} MB left")
+        return removed
+
+def create_measurement_cache(fingerprints: Dict[str, str]) -> Optional[MeasurementCache]:
+    if not settings.ENABLE_MEASUREMENT_CACHE:
+        return None
+    return MeasurementCache(settings.CACHE_PATH, fingerprints)
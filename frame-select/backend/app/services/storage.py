@@ -1,56 +1,94 @@
 import os
 import shutil
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from pathlib import Path
-from PIL import Image
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from core.config import settings
-from core.utils import ensure_dir, is_image_file, safe_filename
+from core.utils import ensure_dir, is_image_file, is_video_file, safe_filename
+from services.imaging import save_thumbnail
+from services.video import extract_frames
+
+logger = logging.getLogger(__name__)
 
 class StorageService:
     def __init__(self):
         ensure_dir(settings.UPLOADS_PATH)
         ensure_dir(settings.THUMBNAILS_PATH)
         ensure_dir(settings.RESULTS_PATH)
+        self._thumbnail_executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnail"
+        )
     
     async def save_uploaded_files(self, upload_id: str, files: List[UploadFile]) -> int:
+        """Stream uploads to disk off the event loop and generate their thumbnails concurrently.
+        
+        Videos are replaced by their sampled frames, which are counted and analyzed like photos.
+        """
         upload_dir = os.path.join(settings.UPLOADS_PATH, upload_id)
         thumb_dir = os.path.join(settings.THUMBNAILS_PATH, upload_id)
         
         ensure_dir(upload_dir)
         ensure_dir(thumb_dir)
         
-        saved_count = 0
+        loop = asyncio.get_running_loop()
+        pending = []
         
         for file in files:
-            if not is_image_file(file.filename):
+            if is_video_file(file.filename):
+                frame_names = await self._save_video(file, upload_dir)
+            elif is_image_file(file.filename):
+                frame_names = [safe_filename(file.filename)]
+                await run_in_threadpool(self._write_upload, file, os.path.join(upload_dir, frame_names[0]))
+            else:
                 continue
             
-            safe_name = safe_filename(file.filename)
-            
-            file_path = os.path.join(upload_dir, safe_name)
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
+            for safe_name in frame_names:
+                file_path = os.path.join(upload_dir, safe_name)
+                thumbnail = loop.run_in_executor(
+                    self._thumbnail_executor, self._generate_thumbnail, file_path, thumb_dir, safe_name
+                )
+                pending.append((file_path, safe_name, thumbnail))
+        
+        saved_count = 0
+        
+        for file_path, safe_name, thumbnail in pending:
             try:
-                self._generate_thumbnail(file_path, thumb_dir, safe_name)
+                await thumbnail
                 saved_count += 1
             except Exception as e:
                 os.remove(file_path)
-                print(f"Failed to process {safe_name}: {e}")
+                logger.warning(f"Failed to process {safe_name}: {e}")
         
         return saved_count
     
+    async def _save_video(self, file: UploadFile, upload_dir: str) -> List[str]:
+        """Spool a video upload next to the photos, extract its sampled frames, then drop the video."""
+        safe_name = safe_filename(file.filename)
+        video_path = os.path.join(upload_dir, safe_name)
+        await run_in_threadpool(self._write_upload, file, video_path)
+        
+        try:
+            return await run_in_threadpool(extract_frames, video_path, upload_dir, Path(safe_name).stem)
+        except Exception as e:
+            logger.warning(f"Failed to extract frames from {safe_name}: {e}")
+            return []
+        finally:
+            os.remove(video_path)
+    
+    def _write_upload(self, file: UploadFile, file_path: str):
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer, settings.UPLOAD_CHUNK_SIZE)
+    
     def _generate_thumbnail(self, image_path: str, thumb_dir: str, filename: str):
-        with Image.open(image_path) as img:
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            img.thumbnail((settings.THUMBNAIL_MAX_SIZE, settings.THUMBNAIL_MAX_SIZE), Image.Resampling.LANCZOS)
-            
-            thumb_path = os.path.join(thumb_dir, filename)
-            img.save(thumb_path, 'JPEG', quality=85, optimize=True)
+        save_thumbnail(image_path, os.path.join(thumb_dir, filename))
+    
+    def shutdown(self):
+        self._thumbnail_executor.shutdown(wait=False, cancel_futures=True)
     
     def upload_exists(self, upload_id: str) -> bool:
         upload_dir = os.path.join(settings.UPLOADS_PATH, upload_id)
@@ -75,4 +113,13 @@ class StorageService:
         return os.path.join(settings.THUMBNAILS_PATH, upload_id, filename)
     
     def get_results_path(self, upload_id: str) -> str:
-        return os.path.join(settings.RESULTS_PATH, f"{upload_id}.json")
\ No newline at end of file
+        return os.path.join(settings.RESULTS_PATH, f"{upload_id}.json")
+    
+    def get_partial_results_path(self, upload_id: str) -> str:
+        return os.path.join(settings.RESULTS_PATH, f"{upload_id}.partial.ndjson")
+    
+    def get_chunk_results_dir(self, upload_id: str, job_id: str) -> str:
+        return os.path.join(settings.RESULTS_PATH, f"{upload_id}.{job_id}.chunks")
+    
+    def get_profiles_dir(self, job_id: str) -> str:
+        return os.path.join(settings.PROFILES_PATH, job_id)
@@ -0,0 +1,109 @@
+import os
+import logging
+import cv2
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def frame_filename(stem: str, milliseconds: int) -> str:
+    """Frame image name; the zero-padded timestamp keeps frames in playback order."""
+    return f"{stem}_t{milliseconds:09d}.jpg"
+
+def frame_hash(frame: np.ndarray) -> np.ndarray:
+    """64-bit difference hash of a frame as a boolean array."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+def hash_distance(hash1: np.ndarray, hash2: np.ndarray) -> int:
+    return int(np.count_nonzero(hash1 != hash2))
+
+def sample_frames(video_path: str, config: Optional[Dict] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield `(milliseconds, frame)` for the frames worth scoring, decoding the video as a stream.
+
+    Frames are checked every `check_interval_seconds`; only checked frames are converted
+    to BGR, the rest are just grabbed. A checked frame is kept when the last kept frame
+    is `interval_seconds` old and the picture has changed by at least `min_hash_distance`
+    bits of its difference hash, or straight away when it differs by `scene_threshold`
+    bits from the previous check (a cut). Near-identical stretches (a static shot, a
+    paused subject) therefore yield nothing until something moves.
+    """
+    config = config or settings.VIDEO_SAMPLING
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {os.path.basename(video_path)}")
+
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0 or fps > 1000:
+            fps = None
+
+        check_ms = config["check_interval_seconds"] * 1000
+        interval_ms = config["interval_seconds"] * 1000
+
+        frame_index = 0
+        kept = 0
+        next_check_ms = 0.0
+        last_kept_ms = None
+        last_kept_hash = None
+        previous_hash = None
+
+        while kept < config["max_frames"]:
+            if not capture.grab():
+                break
+
+            # Prefer the container's presentation timestamp, which stays right for variable-frame-rate
+            # (phone) video; some streams report none (0 past the first frame), so fall back to the frame rate.
+            milliseconds = capture.get(cv2.CAP_PROP_POS_MSEC)
+            if not milliseconds or milliseconds <= 0:
+                milliseconds = frame_index * 1000 / fps if fps else 0.0
+            frame_index += 1
+            # Half a millisecond of slack so timestamp rounding (3999.99 vs 4000) does not skip a check.
+            if milliseconds + 0.5 < next_check_ms:
+                continue
+            next_check_ms = milliseconds + check_ms
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+
+            current_hash = frame_hash(frame)
+            scene_change = previous_hash is not None and hash_distance(current_hash, previous_hash) >= config["scene_threshold"]
+            previous_hash = current_hash
+
+            if last_kept_hash is None:
+                keep = True
+            elif scene_change:
+                keep = True
+            else:
+                keep = (milliseconds - last_kept_ms >= interval_ms
+                        and hash_distance(current_hash, last_kept_hash) >= config["min_hash_distance"])
+
+            if keep:
+                last_kept_ms = milliseconds
+                last_kept_hash = current_hash
+                kept += 1
+                yield int(round(milliseconds)), frame
+
+        if kept >= config["max_frames"]:
+            logger.warning(f"Stopped sampling {os.path.basename(video_path)} at {kept} frames (max_frames)")
+    finally:
+        capture.release()
+
+def extract_frames(video_path: str, output_dir: str, stem: str, config: Optional[Dict] = None) -> List[str]:
+    """Write the sampled frames of a video to `output_dir` as JPEGs and return their filenames."""
+    config = config or settings.VIDEO_SAMPLING
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, config["jpeg_quality"]]
+
+    filenames = []
+    for milliseconds, frame in sample_frames(video_path, config):
+        filename = frame_filename(stem, milliseconds)
+        if cv2.imwrite(os.path.join(output_dir, filename), frame, encode_params):
+            filenames.append(filename)
+        else:
+            logger.warning(f"Failed to write frame {filename}")
+
+    logger.info(f"Extracted {len(filenames)} frames from {os.path.basename(video_path)}")
+    return filenames
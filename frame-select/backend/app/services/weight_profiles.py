@@ -0,0 +1,44 @@
+import os
+import json
+import threading
+from typing import Dict, List
+from core.config import settings
+from core.models import WeightProfile
+from core.utils import ensure_dir
+
+class WeightProfileStore:
+    """Named SCORING_WEIGHTS overrides (e.g. one per sport) persisted as a single JSON file."""
+
+    def __init__(self, path: str = settings.WEIGHT_PROFILES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def list(self) -> List[WeightProfile]:
+        return [WeightProfile(name=name, weights=weights) for name, weights in sorted(self._read().items())]
+
+    def get(self, name: str) -> Dict[str, float]:
+        profiles = self._read()
+        if name not in profiles:
+            raise KeyError(f"Weight profile not found: {name}")
+        return profiles[name]
+
+    def save(self, name: str, weights: Dict[str, float]):
+        if not name:
+            raise ValueError("Profile name must not be empty")
+
+        with self._lock:
+            profiles = self._read()
+            profiles[name] = weights
+
+            ensure_dir(os.path.dirname(self.path))
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,44 @@
+import os
+import sys
+import signal
+import logging
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(__file__))
+
+from core.config import settings
+from services.storage import StorageService
+from services.analyze import AnalysisService
+from services.job_queue import JobQueue
+from services.job_runner import JobRunner
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame Select analysis worker")
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS,
+                        help="number of map or reduce tasks this process runs concurrently")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    storage_service = StorageService()
+    analysis_service = AnalysisService(storage_service)
+    job_runner = JobRunner(JobQueue(), analysis_service, workers=args.workers)
+    
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    
+    logging.getLogger(__name__).info(f"Analysis worker {job_runner.runner_id} started with {args.workers} workers, storage at {settings.STORAGE_BASE_PATH}")
+    job_runner.start(warm_up=settings.WARM_UP_ON_STARTUP)
+    
+    while not stopped.wait(1.0):
+        pass
+    
+    job_runner.stop()
+    job_runner.join(timeout=settings.JOB_HEARTBEAT_SECONDS)
+    analysis_service.shutdown()
+    storage_service.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import json
+import argparse
+from typing import Dict, Optional
+
+def _change(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return ""
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def _load(path: str) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports written by run.py")
+    parser.add_argument("baseline", help="report from the earlier commit")
+    parser.add_argument("candidate", help="report from the later commit")
+    args = parser.parse_args()
+
+    baseline = _load(args.baseline)
+    candidate = _load(args.candidate)
+
+    print(f"baseline  {baseline['git']['commit']}  {baseline['corpus']['name']} ({baseline['corpus']['images']} images)")
+    print(f"candidate {candidate['git']['commit']}  {candidate['corpus']['name']} ({candidate['corpus']['images']} images)")
+    if baseline["corpus"]["name"] != candidate["corpus"]["name"]:
+        print("warning: reports were produced from different corpora", file=sys.stderr)
+
+    print(f"\n{'stage':<22}{'p50 before':>12}{'p50 after':>12}{'change':>10}{'p90 change':>12}")
+    stages = candidate.get("scorers", {})
+    for stage, after in stages.items():
+        before = baseline.get("scorers", {}).get(stage)
+        if not before or "p50_ms" not in after:
+            continue
+        print(f"{stage:<22}{before['p50_ms']:>12.1f}{after['p50_ms']:>12.1f}"
+              f"{_change(before['p50_ms'], after['p50_ms']):>10}{_change(before['p90_ms'], after['p90_ms']):>12}")
+
+    before, after = baseline.get("pipeline"), candidate.get("pipeline")
+    if before and after:
+        print(f"\n{'pipeline':<22}{'before':>12}{'after':>12}{'change':>10}")
+        for key in ("images_per_sec", "measure_seconds", "reduce_seconds"):
+            print(f"{key:<22}{before[key]:>12}{after[key]:>12}{_change(before[key], after[key]):>10}")
+
+    print(f"\n{'peak RSS MB':<22}{'before':>12}{'after':>12}{'change':>10}")
+    for key, after_mb in candidate.get("peak_rss_mb", {}).items():
+        before_mb = baseline.get("peak_rss_mb", {}).get(key)
+        print(f"{key:<22}{before_mb if before_mb is not None else '-':>12}{after_mb:>12}{_change(before_mb, after_mb):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import cv2
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List
+from PIL import Image
+
+CORPUS_VERSION = 1
+
+SIZES = [(800, 600), (1600, 1067), (1920, 1080), (1080, 1920), (3000, 2000), (4000, 3000)]
+BLUR_SIGMAS = [0.0, 0.0, 1.5, 4.0]
+BURST_PROBABILITY = 0.3
+FACE_PROBABILITY = 0.4
+
+def _scene(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    """A gradient background with random shapes, so edges and textures vary per scene."""
+    top = rng.integers(0, 256, 3)
+    bottom = rng.integers(0, 256, 3)
+    ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    image = (top * (1 - ramp) + bottom * ramp).repeat(width, axis=1).astype(np.uint8)
+
+    for _ in range(int(rng.integers(8, 30))):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(width // 40 + 1, width // 5 + 2))
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            cv2.circle(image, (x, y), size // 2, color, -1)
+
+    noise = rng.normal(0, 6, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+def _draw_face(image: np.ndarray, rng: np.random.Generator):
+    """A stylised frontal face: skin-toned oval, darker eyes, brows and mouth."""
+    height, width = image.shape[:2]
+    face_w = int(min(width, height) * rng.uniform(0.12, 0.3))
+    face_h = int(face_w * 1.3)
+    cx = int(rng.integers(face_w, width - face_w))
+    cy = int(rng.integers(face_h, height - face_h))
+
+    cv2.ellipse(image, (cx, cy), (face_w // 2, face_h // 2), 0, 0, 360, (140, 170, 215), -1)
+    for side in (-1, 1):
+        eye = (cx + side * face_w // 5, cy - face_h // 8)
+        cv2.ellipse(image, eye, (face_w // 10, face_w // 18), 0, 0, 360, (40, 30, 30), -1)
+        cv2.line(image, (eye[0] - face_w // 8, eye[1] - face_w // 8), (eye[0] + face_w // 8, eye[1] - face_w // 8), (50, 40, 40), max(1, face_w // 30))
+    cv2.ellipse(image, (cx, cy + face_h // 5), (face_w // 5, face_w // 12), 0, 0, 180, (60, 50, 120), max(1, face_w // 25))
+
+def _burst_frame(base: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """A near-duplicate of `base`: a small shift plus sensor noise."""
+    height, width = base.shape[:2]
+    shift = np.float32([[1, 0, rng.uniform(-0.01, 0.01) * width], [0, 1, rng.uniform(-0.01, 0.01) * height]])
+    frame = cv2.warpAffine(base, shift, (width, height), borderMode=cv2.BORDER_REFLECT)
+    noise = rng.normal(0, 3, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+def _save(image: np.ndarray, path: str, taken_at: datetime):
+    exif = Image.Exif()
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = taken_at.strftime("%Y:%m:%d %H:%M:%S")
+    exif_ifd[0x9291] = f"{taken_at.microsecond // 10000:02d}"
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(path, "JPEG", quality=90, exif=exif)
+
+def generate_corpus(dest: str, count: int, seed: int = 0) -> List[Dict]:
+    """Write `count` deterministic JPEGs to `dest` and return their manifest.
+
+    Images vary in size and blur, some contain a stylised face, and about a
+    third of scenes are shot as bursts of near-duplicates 100 ms apart. The same
+    (count, seed) always produces the same files.
+    """
+    os.makedirs(dest, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    taken_at = datetime(2024, 5, 18, 14, 0, 0)
+    manifest = []
+    scene = 0
+
+    while len(manifest) < count:
+        width, height = SIZES[int(rng.integers(len(SIZES)))]
+        base = _scene(rng, width, height)
+        has_face = bool(rng.random() < FACE_PROBABILITY)
+        if has_face:
+            _draw_face(base, rng)
+
+        burst = int(rng.integers(3, 7)) if rng.random() < BURST_PROBABILITY else 1
+        sigma = float(BLUR_SIGMAS[int(rng.integers(len(BLUR_SIGMAS)))])
+
+        for shot in range(min(burst, count - len(manifest))):
+            frame = base if shot == 0 else _burst_frame(base, rng)
+            if sigma > 0:
+                frame = cv2.GaussianBlur(frame, (0, 0), sigma)
+
+            filename = f"synthetic_{len(manifest):05d}.jpg"
+            _save(frame, os.path.join(dest, filename), taken_at)
+            manifest.append({
+                "filename": filename,
+                "scene": scene,
+                "burst_size": burst,
+                "width": width,
+                "height": height,
+                "face": has_face,
+                "blur_sigma": sigma
+            })
+            taken_at += timedelta(milliseconds=100)
+
+        taken_at += timedelta(seconds=int(rng.integers(5, 120)))
+        scene += 1
+
+    return manifest
+
+def synthetic_corpus(cache_dir: str, count: int, seed: int = 0) -> str:
+    """Return a directory holding the synthetic corpus for (count, seed), generating it on first use."""
+    dest = os.path.join(cache_dir, f"synthetic_v{CORPUS_VERSION}_n{count}_s{seed}")
+    manifest_path = os.path.join(dest, "manifest.json")
+    if os.path.exists(manifest_path):
+        return dest
+
+    shutil.rmtree(dest, ignore_errors=True)
+    manifest = generate_corpus(dest, count, seed)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return dest
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from run import BACKEND_DIR, BENCHMARKS_DIR, git_revision
+from corpus import synthetic_corpus
+
+UPLOAD_ID = "drift"
+
+def parse_sizes(values: List[str]) -> Dict[str, Optional[int]]:
+    """Parse `scorer=size` overrides; `full` or `none` means ANALYSIS_MAX_SIZE."""
+    sizes = {}
+    for value in values:
+        name, _, size = value.partition("=")
+        sizes[name] = None if size.lower() in ("full", "none") else int(size)
+    return sizes
+
+def analyze(sizes: Dict[str, Optional[int]]) -> Dict:
+    from core.config import settings
+    from services.storage import StorageService
+    from services.analyze import AnalysisService
+
+    settings.SCORER_MAX_SIZE = sizes
+    storage_service = StorageService()
+    analysis_service = AnalysisService(storage_service)
+    try:
+        analysis_service.warm_up()
+        timings = {}
+        started = time.perf_counter()
+        results = analysis_service.analyze_upload(UPLOAD_ID, timings=timings)
+        elapsed = time.perf_counter() - started
+    finally:
+        analysis_service.shutdown()
+        storage_service.shutdown()
+
+    return {"results": results, "seconds": elapsed, "timings": timings}
+
+def _spearman(baseline_ranks: np.ndarray, candidate_ranks: np.ndarray) -> float:
+    if len(baseline_ranks) < 2:
+        return 1.0
+    return float(np.corrcoef(baseline_ranks, candidate_ranks)[0, 1])
+
+def drift_report(baseline: Dict, candidate: Dict) -> Dict:
+    before = {image.image_id: image for image in baseline["results"].images}
+    after = {image.image_id: image for image in candidate["results"].images}
+    common = sorted(set(before) & set(after))
+
+    scores = {}
+    for score_type in sorted({key for image in before.values() for key in image.scores}):
+        deltas = np.array([abs(after[i].scores.get(score_type, 0.0) - before[i].scores.get(score_type, 0.0)) for i in common])
+        scores[score_type] = {"mean_abs": round(float(deltas.mean()), 4), "max_abs": round(float(deltas.max()), 4)}
+    final_deltas = np.array([abs(after[i].final_score - before[i].final_score) for i in common])
+    scores["final_score"] = {"mean_abs": round(float(final_deltas.mean()), 4), "max_abs": round(float(final_deltas.max()), 4)}
+
+    ranking = {
+        "spearman": round(_spearman(np.array([before[i].rank for i in common]), np.array([after[i].rank for i in common])), 4),
+        "max_rank_shift": int(max(abs(after[i].rank - before[i].rank) for i in common)),
+    }
+    for k in (10, 25, 50):
+        if k < len(common):
+            top_before = {i for i in common if before[i].rank <= k}
+            top_after = {i for i in common if after[i].rank <= k}
+            ranking[f"top_{k}_overlap"] = round(len(top_before & top_after) / k, 3)
+
+    tags_added: Dict[str, int] = {}
+    tags_removed: Dict[str, int] = {}
+    for i in common:
+        # Duplicate group numbering is arbitrary, so compare group membership separately.
+        old = {tag for tag in before[i].tags if not tag.startswith("duplicate_group_")}
+        new = {tag for tag in after[i].tags if not tag.startswith("duplicate_group_")}
+        for tag in new - old:
+            tags_added[tag] = tags_added.get(tag, 0) + 1
+        for tag in old - new:
+            tags_removed[tag] = tags_removed.get(tag, 0) + 1
+
+    def groups(results) -> set:
+        report = results.duplicate_report
+        return {frozenset(group.images) for group in report.groups} if report else set()
+
+    before_groups, after_groups = groups(baseline["results"]), groups(candidate["results"])
+
+    stages = sorted(set(baseline["timings"]) | set(candidate["timings"]))
+    return {
+        "images": len(common),
+        "scores": scores,
+        "ranking": ranking,
+        "tags_added": tags_added,
+        "tags_removed": tags_removed,
+        "duplicate_groups": {
+            "baseline": len(before_groups),
+            "candidate": len(after_groups),
+            "unchanged": len(before_groups & after_groups),
+        },
+        "seconds": {"baseline": round(baseline["seconds"], 3), "candidate": round(candidate["seconds"], 3)},
+        "stage_seconds": {
+            stage: {
+                "baseline": round(baseline["timings"].get(stage, 0.0), 3),
+                "candidate": round(candidate["timings"].get(stage, 0.0), 3),
+            }
+            for stage in stages
+        },
+    }
+
+def print_report(report: Dict):
+    print(f"\n{report['images']} images, candidate sizes {report['candidate_sizes']}")
+    print(f"\n{'score':<16}{'mean |d|':>10}{'max |d|':>10}")
+    for score_type, stats in report["scores"].items():
+        print(f"{score_type:<16}{stats['mean_abs']:>10.4f}{stats['max_abs']:>10.4f}")
+    print(f"\nranking: {report['ranking']}")
+    print(f"tags added: {report['tags_added'] or '-'}  removed: {report['tags_removed'] or '-'}")
+    print(f"duplicate groups: {report['duplicate_groups']}")
+    print(f"\n{'stage':<22}{'baseline s':>12}{'candidate s':>12}")
+    for stage, seconds in report["stage_seconds"].items():
+        print(f"{stage:<22}{seconds['baseline']:>12.2f}{seconds['candidate']:>12.2f}")
+    print(f"{'total':<22}{report['seconds']['baseline']:>12.2f}{report['seconds']['candidate']:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score drift between full-resolution analysis and per-scorer working resolutions"
+    )
+    parser.add_argument("--count", type=int, default=100, help="number of synthetic images")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic corpus seed")
+    parser.add_argument("--fixtures", help="use the images in this folder instead of a synthetic corpus")
+    parser.add_argument("--size", action="append", default=[], metavar="SCORER=SIZE",
+                        help="override a scorer's working size for the candidate run, e.g. action=400 (default: SCORER_MAX_SIZE)")
+    parser.add_argument("--output", default=os.path.join(BENCHMARKS_DIR, "results"), help="folder for the JSON report")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        corpus_dir = os.path.abspath(args.fixtures)
+    else:
+        corpus_dir = synthetic_corpus(os.path.join(BENCHMARKS_DIR, "corpus"), args.count, args.seed)
+
+    os.chdir(BACKEND_DIR)
+    from core.config import settings
+    filenames = sorted(
+        name for name in os.listdir(corpus_dir)
+        if os.path.splitext(name)[1].lower() in settings.SUPPORTED_FORMATS
+    )
+    if not filenames:
+        parser.error(f"No images found in {corpus_dir}")
+
+    upload_dir = os.path.join(settings.UPLOADS_PATH, UPLOAD_ID)
+    os.makedirs(upload_dir)
+    for filename in filenames:
+        shutil.copy(os.path.join(corpus_dir, filename), upload_dir)
+
+    candidate_sizes = {**settings.SCORER_MAX_SIZE, **parse_sizes(args.size)}
+    baseline = analyze({score_type: None for score_type in candidate_sizes})
+    candidate = analyze(candidate_sizes)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "corpus": {"path": corpus_dir, "images": len(filenames)},
+        "analysis_max_size": settings.ANALYSIS_MAX_SIZE,
+        "candidate_sizes": candidate_sizes,
+        **drift_report(baseline, candidate),
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = os.path.join(args.output, f"drift_{timestamp}_{report['git']['commit']}.json")
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\nSaved {output_path}")
+
+if __name__ == "__main__":
+    # Both runs measure in this process (the pool's workers would not see the size
+    # overrides) on scratch storage with the measurement cache off.
+    scratch_dir = tempfile.mkdtemp(prefix="frame_select_drift_")
+    os.environ["STORAGE_PATH"] = os.path.join(scratch_dir, "storage")
+    os.environ["ENABLE_MEASUREMENT_CACHE"] = "false"
+    os.environ["MAX_WORKERS"] = "1"
+    try:
+        main()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "app"))
+
+from corpus import synthetic_corpus
+
+UPLOAD_ID = "benchmark"
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p90_ms": round(float(np.percentile(values, 90)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+def peak_rss_mb() -> Dict[str, float]:
+    """High-water resident set size of this process and of its reaped children (pool workers)."""
+    if resource is None:
+        return {}
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+def git_revision() -> Dict[str, object]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except OSError:
+        return {"commit": "unknown", "dirty": False}
+
+def timed(samples: List[float], fn: Callable, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+def bench_scorers(corpus_dir: str, filenames: List[str]) -> Dict[str, Dict]:
+    """Time decoding and each scorer's per-image work on its own.
+
+    Every scorer gets a fresh ImageContext, so shared intermediates (grayscale,
+    Laplacian, face detections) are charged to each scorer that needs them.
+    """
+    from pipeline.context import ImageContext
+    from pipeline.score import ScoreCalculator
+    from services.imaging import load_analysis_image
+
+    calculator = ScoreCalculator()
+    started = time.perf_counter()
+    calculator.warm_up()
+    warm_up = time.perf_counter() - started
+
+    scorers = calculator.scorers
+    stages = {
+        "sharpness": lambda image, filename: scorers["sharpness"].measure(image, filename, ImageContext(image, filename)),
+        "composition": lambda image, filename: scorers["composition"].score(image, filename, ImageContext(image, filename)),
+        "emotion": lambda image, filename: scorers["emotion"].score(image, filename, ImageContext(image, filename)),
+        "action": lambda image, filename: scorers["action"].score(image, filename, ImageContext(image, filename)),
+        "duplicate_statistics": lambda image, filename: scorers["duplicate"].measure_statistics(image, filename, ImageContext(image, filename)),
+        "duplicate_detection": lambda image, filename: scorers["duplicate"].detect_batch([image]),
+    }
+    samples: Dict[str, List[float]] = {"decode": [], **{stage: [] for stage in stages}}
+
+    for filename in filenames:
+        image = timed(samples["decode"], load_analysis_image, os.path.join(corpus_dir, filename))
+        for stage, fn in stages.items():
+            timed(samples[stage], fn, image, filename)
+
+    report = {stage: percentiles(values) for stage, values in samples.items()}
+    report["warm_up"] = {"seconds": round(warm_up, 3)}
+    return report
+
+def bench_pipeline(corpus_dir: str, filenames: List[str]) -> Dict:
+    """Run AnalysisService.analyze_upload on the corpus as a fresh upload."""
+    from core.config import settings
+    from services.storage import StorageService
+    from services.analyze import AnalysisService
+
+    storage_service = StorageService()
+    upload_dir = os.path.join(settings.UPLOADS_PATH, UPLOAD_ID)
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    os.makedirs(upload_dir)
+    for filename in filenames:
+        shutil.copy(os.path.join(corpus_dir, filename), upload_dir)
+
+    analysis_service = AnalysisService(storage_service)
+    try:
+        started = time.perf_counter()
+        analysis_service.warm_up()
+        warm_up = time.perf_counter() - started
+
+        progress_at = []
+        started = time.perf_counter()
+        results = analysis_service.analyze_upload(UPLOAD_ID, progress_callback=lambda _: progress_at.append(time.perf_counter()))
+        elapsed = time.perf_counter() - started
+    finally:
+        # Wait for the pool workers to exit so RUSAGE_CHILDREN includes their peak RSS.
+        analysis_service.shutdown(wait=True)
+        storage_service.shutdown()
+
+    # Progress fires once per measured image, then during the reduce step. Pool
+    # workers return images in batches, so only the phase split is meaningful here.
+    measured_at = progress_at[:len(filenames)]
+    measure_seconds = (measured_at[-1] - started) if measured_at else 0.0
+    return {
+        "images": len(results.images),
+        "warm_up_seconds": round(warm_up, 3),
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(len(filenames) / elapsed, 2),
+        "measure_seconds": round(measure_seconds, 3),
+        "reduce_seconds": round(elapsed - measure_seconds, 3),
+        "duplicate_groups": len(results.duplicate_report.groups) if results.duplicate_report else 0,
+    }
+
+def print_report(report: Dict):
+    corpus = report["corpus"]
+    print(f"\n{corpus['name']}: {corpus['images']} images, commit {report['git']['commit']}{' (dirty)' if report['git']['dirty'] else ''}")
+
+    scorers = report.get("scorers")
+    if scorers:
+        print(f"\n{'stage':<22}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, stats in scorers.items():
+            if "p50_ms" in stats:
+                print(f"{stage:<22}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+
+    pipeline = report.get("pipeline")
+    if pipeline:
+        print(f"\npipeline: {pipeline['images_per_sec']} images/sec "
+              f"({pipeline['seconds']}s total, {pipeline['measure_seconds']}s measure, {pipeline['reduce_seconds']}s reduce)")
+
+    print(f"peak RSS MB: {report['peak_rss_mb']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Frame Select analysis pipeline")
+    parser.add_argument("--count", type=int, default=100, help="number of synthetic images")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic corpus seed")
+    parser.add_argument("--fixtures", help="benchmark the images in this folder instead of a synthetic corpus")
+    parser.add_argument("--stages", choices=["all", "scorers", "pipeline"], default="all")
+    parser.add_argument("--output", default=os.path.join(BENCHMARKS_DIR, "results"), help="folder for the JSON report")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        corpus_dir = os.path.abspath(args.fixtures)
+        corpus_name = f"fixtures:{os.path.basename(corpus_dir.rstrip(os.sep))}"
+    else:
+        corpus_dir = synthetic_corpus(os.path.join(BENCHMARKS_DIR, "corpus"), args.count, args.seed)
+        corpus_name = os.path.basename(corpus_dir)
+
+    # The backend resolves model paths relative to its own folder.
+    os.chdir(BACKEND_DIR)
+    from core.config import settings
+    filenames = sorted(
+        name for name in os.listdir(corpus_dir)
+        if os.path.splitext(name)[1].lower() in settings.SUPPORTED_FORMATS
+    )
+    if not filenames:
+        parser.error(f"No images found in {corpus_dir}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "host": {"name": socket.gethostname(), "platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "settings": {
+            "MAX_WORKERS": settings.MAX_WORKERS,
+            "ANALYSIS_MAX_SIZE": settings.ANALYSIS_MAX_SIZE,
+            "FAST_JPEG_DECODE": settings.FAST_JPEG_DECODE,
+            "DUPLICATE_DETECTOR_BACKEND": settings.DUPLICATE_DETECTION["detector_backend"],
+        },
+        "corpus": {"name": corpus_name, "path": corpus_dir, "images": len(filenames)},
+    }
+
+    if args.stages in ("all", "scorers"):
+        report["scorers"] = bench_scorers(corpus_dir, filenames)
+    if args.stages in ("all", "pipeline"):
+        report["pipeline"] = bench_pipeline(corpus_dir, filenames)
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    os.makedirs(args.output, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = os.path.join(args.output, f"{timestamp}_{report['git']['commit']}.json")
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\nSaved {output_path}")
+
+if __name__ == "__main__":
+    # Benchmark uploads, results and caches go to a scratch storage folder, and the
+    # measurement cache is off so every run measures from scratch.
+    scratch_dir = tempfile.mkdtemp(prefix="frame_select_bench_")
+    os.environ["STORAGE_PATH"] = os.path.join(scratch_dir, "storage")
+    os.environ["ENABLE_MEASUREMENT_CACHE"] = "false"
+    try:
+        main()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
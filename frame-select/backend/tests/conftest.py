@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app imports its modules top-level (`from core.config import settings`), as when run from backend/app.
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+
+# Settings resolve their storage paths at import time; keep test runs out of app/storage.
+os.environ.setdefault("STORAGE_PATH", tempfile.mkdtemp(prefix="frame_select_tests_"))
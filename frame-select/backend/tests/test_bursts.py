@@ -0,0 +1,176 @@
+import itertools
+
+import numpy as np
+
+from core.config import settings
+from pipeline.bursts import capture_position, comparison_windows, find_bursts, windowed_neighbors
+from pipeline.duplicate import DuplicateDetector
+
+CONFIG = {**settings.DUPLICATE_DETECTION, "burst_gap_seconds": 2.0, "max_sequence_gap": 3}
+
+def burst_images(filenames, bursts):
+    return [[filenames[i] for i in burst["indices"]] for burst in bursts]
+
+def compared_pairs(windows):
+    return {pair for window in windows for pair in itertools.combinations(sorted(window), 2)}
+
+def test_capture_position_fallbacks():
+    assert capture_position("a.jpg", 12.5) == ("exif", "exif", 12.5)
+    assert capture_position("clip_t000001500.jpg", None) == ("video:clip", "video", 1.5)
+    assert capture_position("IMG_0042 copy.jpg", None) == ("sequence:IMG_", "filename", 42.0)
+    assert capture_position("IMG_0042.jpg", None) == ("sequence:IMG_", "filename", 42.0)
+    assert capture_position("holiday.jpg", None) is None
+
+def test_exif_bursts_split_on_gaps():
+    filenames = ["a.jpg", "b.jpg", "c.jpg", "d.jpg", "e.jpg"]
+    times = {"a.jpg": 100.0, "b.jpg": 100.4, "c.jpg": 101.9, "d.jpg": 110.0, "e.jpg": 110.1}
+    bursts = find_bursts(filenames, times, CONFIG)
+    assert burst_images(filenames, bursts) == [["a.jpg", "b.jpg", "c.jpg"], ["d.jpg", "e.jpg"]]
+    assert bursts[0]["start"] == 100.0 and bursts[0]["end"] == 101.9
+
+def test_without_exif_falls_back_to_filename_numbers():
+    filenames = ["IMG_0003.jpg", "IMG_0001.jpg", "IMG_0002.jpg", "IMG_0020.jpg", "IMG_0021 copy.jpg"]
+    bursts = find_bursts(filenames, {}, CONFIG)
+    assert burst_images(filenames, bursts) == [
+        ["IMG_0001.jpg", "IMG_0002.jpg", "IMG_0003.jpg"],
+        ["IMG_0020.jpg", "IMG_0021 copy.jpg"]
+    ]
+    assert {burst["source"] for burst in bursts} == {"filename"}
+
+def test_mixed_clocks_are_never_interleaved():
+    filenames = ["IMG_0001.jpg", "IMG_0002.jpg", "clip_t000000000.jpg", "clip_t000000500.jpg", "photo.jpg"]
+    times = {"photo.jpg": 1.0}
+    bursts = find_bursts(filenames, times, CONFIG)
+
+    assert sorted(burst["source"] for burst in bursts) == ["exif", "filename", "video"]
+    assert {burst["clock"] for burst in bursts} == {"exif", "sequence:IMG_", "video:clip"}
+    # Clocks share no time base, so nothing on one clock is compared with another.
+    windows = comparison_windows(bursts, max_window_size=64)
+    assert compared_pairs(windows) == {(0, 1), (2, 3)}
+
+def test_unplaceable_images_form_one_unordered_burst():
+    filenames = ["holiday.jpg", "IMG_0001.jpg", "beach.png"]
+    bursts = find_bursts(filenames, {}, CONFIG)
+    unordered = [burst for burst in bursts if burst["source"] == "unordered"]
+    assert len(unordered) == 1 and unordered[0]["indices"] == [0, 2]
+    assert unordered[0]["start"] is None
+
+def test_windows_cover_adjacent_windows_only():
+    bursts = [{"indices": list(range(10)), "clock": "exif", "source": "exif", "start": 0.0, "end": 9.0}]
+    windows = comparison_windows(bursts, max_window_size=3)
+    assert windows == [[0, 1, 2, 3, 4, 5], [3, 4, 5, 6, 7, 8], [6, 7, 8, 9]]
+    pairs = compared_pairs(windows)
+    assert (2, 3) in pairs and (0, 5) in pairs
+    assert (0, 6) not in pairs
+
+def test_consecutive_bursts_on_a_clock_are_adjacent():
+    bursts = [
+        {"indices": [0, 1], "clock": "exif", "source": "exif", "start": 0.0, "end": 0.1},
+        {"indices": [2], "clock": "exif", "source": "exif", "start": 9.0, "end": 9.0},
+        {"indices": [3], "clock": "exif", "source": "exif", "start": 30.0, "end": 30.0},
+    ]
+    pairs = compared_pairs(comparison_windows(bursts, max_window_size=64))
+    assert pairs == {(0, 1), (0, 2), (1, 2), (2, 3)}
+
+def test_few_unordered_images_join_every_window():
+    bursts = [
+        {"indices": [0, 1], "clock": "exif", "source": "exif", "start": 0.0, "end": 0.1},
+        {"indices": [2, 3], "clock": "sequence:IMG_", "source": "filename", "start": 1.0, "end": 2.0},
+        {"indices": [4, 5], "clock": "unordered", "source": "unordered", "start": None, "end": None},
+    ]
+    pairs = compared_pairs(comparison_windows(bursts, max_window_size=2))
+    for unordered in (4, 5):
+        assert all(tuple(sorted((unordered, other))) in pairs for other in range(6) if other != unordered)
+    assert (1, 2) not in pairs
+
+def test_many_unordered_images_are_only_compared_with_each_other():
+    unordered = list(range(2, 7))
+    bursts = [
+        {"indices": [0, 1], "clock": "exif", "source": "exif", "start": 0.0, "end": 0.1},
+        {"indices": unordered, "clock": "unordered", "source": "unordered", "start": None, "end": None},
+    ]
+    windows = comparison_windows(bursts, max_window_size=3)
+    assert sorted(windows) == [[0, 1], unordered]
+
+def test_only_unordered_images():
+    bursts = [{"indices": [0, 1, 2], "clock": "unordered", "source": "unordered", "start": None, "end": None}]
+    assert comparison_windows(bursts, max_window_size=2) == [[0, 1, 2]]
+
+def test_windowed_neighbors_maps_back_to_global_indices():
+    windows = [[0, 2, 5], [2, 5, 7]]
+    # Every image matches every later image in its window.
+    find = lambda window: {i: list(range(i + 1, len(window))) for i in range(len(window))}
+    assert windowed_neighbors(windows, find) == {0: [2, 5], 2: [5, 7], 5: [7], 7: []}
+
+def make_detector(config_overrides):
+    detector = DuplicateDetector()
+    detector.config = {**settings.DUPLICATE_DETECTION, **config_overrides}
+    return detector
+
+def add_bursts(detector, rng, bursts=40):
+    times = {}
+    captured = 1000.0
+    index = 0
+    for _ in range(bursts):
+        features = rng.normal(size=32)
+        image_hash = tuple(int(v) for v in rng.integers(0, 2**64, 3, dtype=np.uint64))
+        for shot in range(int(rng.integers(1, 5))):
+            filename = f"DSC_{index:04d}.jpg"
+            noise = rng.normal(scale=0.001, size=32) if shot else 0.0
+            detector.add_measurement(filename, {"features": features + noise, "hash": image_hash})
+            times[filename] = captured
+            captured += 0.1
+            index += 1
+        captured += float(rng.integers(5, 60))
+    detector.set_capture_times(times)
+
+def test_windowed_grouping_matches_global_search():
+    windowed = make_detector({"enable_time_windows": True, "max_window_size": 4})
+    exhaustive = make_detector({"enable_time_windows": False})
+    add_bursts(windowed, np.random.default_rng(0))
+    add_bursts(exhaustive, np.random.default_rng(0))
+
+    windowed_groups = windowed.analyze_all_images()["duplicate_groups"]
+    assert windowed_groups
+    assert windowed_groups == exhaustive.analyze_all_images()["duplicate_groups"]
+
+def test_bursts_are_computed_once_for_the_whole_upload():
+    detector = make_detector({"enable_time_windows": True})
+    add_bursts(detector, np.random.default_rng(1), bursts=5)
+    # An image without a hash is left out of the hash search but is still part of its burst.
+    detector.image_hashes["DSC_0000.jpg"] = ()
+    detector.split_into_bursts()
+    analysis = detector.analyze_all_images()
+    report = detector.get_duplicate_report()
+
+    assert sum(len(burst["images"]) for burst in detector.bursts) == len(detector.image_features)
+    assert analysis["bursts"] == len(report["bursts"])
+    assert all(burst["count"] > 1 for burst in report["bursts"])
+
+def test_merge_folds_every_overlapping_group():
+    detector = DuplicateDetector()
+    merged = detector._merge_overlapping_groups([["a", "b"], ["c", "d"], ["x", "y"], ["b", "c", "e"], ["y", "a"]])
+    assert merged == [["a", "b", "c", "d", "e", "x", "y"]]
+
+def test_merge_keeps_first_seen_order_and_disjoint_groups():
+    detector = DuplicateDetector()
+    merged = detector._merge_overlapping_groups([["b", "a"], ["c", "d"], ["a", "e"], ["d", "c"]])
+    assert merged == [["b", "a", "e"], ["c", "d"]]
+
+def test_report_reuses_the_finished_analysis(monkeypatch):
+    detector = make_detector({"enable_time_windows": True})
+    add_bursts(detector, np.random.default_rng(2), bursts=5)
+    searches = []
+    find_by_hash = detector.find_duplicates_by_hash
+    monkeypatch.setattr(detector, "find_duplicates_by_hash", lambda: searches.append(1) or find_by_hash())
+
+    analysis = detector.analyze_all_images()
+    report = detector.get_duplicate_report()
+    assert len(searches) == 1
+    assert report["summary"] is analysis
+    assert [group["images"] for group in report["groups"]] == analysis["duplicate_groups"]
+
+    # New images invalidate it.
+    detector.add_measurement("DSC_9999.jpg", {"features": np.zeros(32), "hash": (0, 0, 0)})
+    detector.get_duplicate_report()
+    assert len(searches) == 2
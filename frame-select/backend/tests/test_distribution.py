@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pipeline.distribution import SortedDistribution
+
+QUANTILES = [0, 1, 12.5, 25, 50, 85, 90, 99, 100]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10, 101, 1000])
+def test_percentile_matches_numpy_exactly(size):
+    values = np.random.default_rng(size).gamma(2.0, 50.0, size)
+    distribution = SortedDistribution(values.tolist())
+    for q in QUANTILES:
+        assert distribution.percentile(q) == np.percentile(values, q)
+
+def test_percentile_with_ties_matches_numpy():
+    values = [5.0, 1.0, 5.0, 5.0, 2.0, 2.0, 9.0]
+    distribution = SortedDistribution(values)
+    for q in QUANTILES:
+        assert distribution.percentile(q) == np.percentile(values, q)
+
+def test_percentile_of_empty_distribution_raises():
+    with pytest.raises(ValueError):
+        SortedDistribution().percentile(50)
+
+def test_values_added_after_a_query_are_included():
+    rng = np.random.default_rng(0)
+    first, second = rng.normal(size=50), rng.normal(size=30)
+    distribution = SortedDistribution(first.tolist())
+    distribution.percentile(50)
+    for value in second:
+        distribution.add(float(value))
+
+    combined = np.concatenate([first, second])
+    assert len(distribution) == 80
+    assert distribution.max == combined.max()
+    assert distribution.percentile(85) == np.percentile(combined, 85)
+
+def test_merge_matches_a_single_distribution():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(size=n) for n in (10, 0, 25)]
+    merged = SortedDistribution()
+    for part in parts:
+        merged.merge(SortedDistribution(part.tolist()))
+
+    combined = np.concatenate(parts)
+    assert merged.values.tolist() == np.sort(combined).tolist()
+    assert merged.percentile(33) == np.percentile(combined, 33)
+
+def test_rank_counts_values_less_than_or_equal():
+    values = [3.0, 1.0, 2.0, 2.0, 5.0]
+    distribution = SortedDistribution(values)
+    for query in [0.0, 1.0, 1.5, 2.0, 4.9, 5.0, 6.0]:
+        assert distribution.rank(query) == sum(value <= query for value in values)
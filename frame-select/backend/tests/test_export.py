@@ -0,0 +1,40 @@
+import io
+import os
+import zipfile
+
+from services.export import stream_zip
+
+def write_files(tmp_path, sizes):
+    files = []
+    for index, size in enumerate(sizes):
+        path = tmp_path / f"image_{index}.jpg"
+        path.write_bytes(os.urandom(size))
+        files.append((str(path), f"export/image_{index}.jpg"))
+    return files
+
+def test_stream_zip_produces_a_valid_archive(tmp_path):
+    files = write_files(tmp_path, [0, 1, 1000, 70_000])
+    archive = b"".join(stream_zip(files, chunk_size=4096))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == [arcname for _, arcname in files]
+        for path, arcname in files:
+            info = zip_file.getinfo(arcname)
+            assert info.compress_type == zipfile.ZIP_STORED
+            with open(path, 'rb') as f:
+                assert zip_file.read(arcname) == f.read()
+
+def test_stream_zip_yields_data_before_the_archive_is_complete(tmp_path):
+    files = write_files(tmp_path, [50_000, 50_000])
+    chunks = stream_zip(files, chunk_size=8192)
+    first = next(chunks)
+    assert first.startswith(b"PK\x03\x04")
+    rest = b"".join(chunks)
+    # Several reads per file, each handed out as it is written.
+    assert len(first) < 20_000 and len(first) + len(rest) > 100_000
+
+def test_stream_zip_of_no_files_is_an_empty_archive():
+    archive = b"".join(stream_zip([]))
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_file:
+        assert zip_file.namelist() == []
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from pipeline.hash_index import MultiIndexHashTable, nibble_distance, pack_hashes, popcount64
+
+def hex_distance(hash1, hash2) -> int:
+    """Reference: the original character-wise comparison of the concatenated hex hash strings."""
+    text1 = "".join(f"{value:016x}" for value in hash1)
+    text2 = "".join(f"{value:016x}" for value in hash2)
+    return sum(c1 != c2 for c1, c2 in zip(text1, text2))
+
+def random_hashes(rng, count, words=3, near_duplicates=0):
+    hashes = [tuple(int(v) for v in rng.integers(0, 2**64, words, dtype=np.uint64)) for _ in range(count)]
+    for _ in range(near_duplicates):
+        source = hashes[rng.integers(len(hashes))]
+        # Flip a few hex digits so some pairs land within the threshold.
+        text = list("".join(f"{value:016x}" for value in source))
+        for position in rng.choice(len(text), size=rng.integers(0, 6), replace=False):
+            text[position] = f"{(int(text[position], 16) + int(rng.integers(1, 16))) % 16:x}"
+        hashes.append(tuple(int("".join(text[i:i + 16]), 16) for i in range(0, len(text), 16)))
+    return hashes
+
+def test_popcount_matches_python():
+    values = np.array([0, 1, 2**64 - 1, 0x0123456789ABCDEF, 2**63], dtype=np.uint64)
+    assert popcount64(values).tolist() == [bin(int(v)).count("1") for v in values]
+
+def test_nibble_distance_matches_hex_comparison():
+    rng = np.random.default_rng(0)
+    hashes = random_hashes(rng, 50, near_duplicates=50)
+    codes = pack_hashes(hashes)
+    for i, query in enumerate(hashes):
+        expected = [hex_distance(query, other) for other in hashes]
+        assert nibble_distance(codes, codes[i]).tolist() == expected
+
+@pytest.mark.parametrize("threshold", [0, 1, 3, 5])
+def test_neighbors_match_brute_force(threshold):
+    rng = np.random.default_rng(threshold)
+    hashes = random_hashes(rng, 150, near_duplicates=150)
+    neighbors = MultiIndexHashTable(pack_hashes(hashes), threshold).neighbors()
+    assert any(neighbors.values())
+
+    for i in range(len(hashes)):
+        expected = [j for j in range(i + 1, len(hashes)) if hex_distance(hashes[i], hashes[j]) <= threshold]
+        assert neighbors.get(i, []) == expected
+
+def test_exact_duplicates_are_neighbors():
+    hashes = [(1, 2, 3), (4, 5, 6), (1, 2, 3), (1, 2, 3)]
+    neighbors = MultiIndexHashTable(pack_hashes(hashes), 0).neighbors()
+    assert neighbors.get(0) == [2, 3]
+    assert neighbors.get(2) == [3]
+    assert not neighbors.get(1)
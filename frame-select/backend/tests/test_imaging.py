@@ -0,0 +1,43 @@
+import io
+
+import pytest
+from PIL import Image
+
+from services.imaging import embedded_preview
+
+def mpo(main_size, preview_sizes):
+    frames = [Image.new('RGB', main_size, 'red')] + [Image.new('RGB', size, 'blue') for size in preview_sizes]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, 'MPO', save_all=True, append_images=frames[1:])
+    buffer.seek(0)
+    return Image.open(buffer)
+
+def is_closed(image):
+    try:
+        image.im
+    except ValueError:
+        return True
+    return False
+
+def test_embedded_preview_picks_the_smallest_usable_frame(monkeypatch):
+    copies = []
+    copy = Image.Image.copy
+    def recording_copy(image):
+        copies.append(copy(image))
+        return copies[-1]
+    monkeypatch.setattr(Image.Image, "copy", recording_copy)
+
+    # 400x400 has the wrong aspect ratio and 100x67 is below the minimum size.
+    with mpo((1200, 800), [(600, 400), (300, 200), (900, 600), (400, 400), (100, 67)]) as pil_img:
+        preview = embedded_preview(pil_img, 256)
+        assert pil_img.tell() == 0
+
+    assert preview.size == (300, 200)
+    assert not is_closed(preview)
+    # The larger frame copied before it was found is closed.
+    assert [is_closed(image) for image in copies if image is not preview] == [True]
+
+@pytest.mark.parametrize("preview_sizes", [[], [(200, 133)], [(800, 800)]])
+def test_embedded_preview_without_usable_frames_returns_none(preview_sizes):
+    with mpo((1200, 800), preview_sizes) as pil_img:
+        assert embedded_preview(pil_img, 256) is None
@@ -0,0 +1,143 @@
+import time
+
+import pytest
+
+from services.job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), stale_after=60)
+
+def enqueue(queue, upload_id="upload", count=5, chunk_size=2, priority=0):
+    return queue.enqueue(upload_id, [f"{i}.jpg" for i in range(count)], priority, chunk_size=chunk_size)
+
+def finish_map_phase(queue, worker="w1"):
+    while True:
+        work = queue.claim(worker)
+        if work is None or work["kind"] != "map":
+            return work
+        queue.complete_task(work["task"]["task_id"], worker)
+
+def test_enqueue_splits_into_chunks_and_dedupes_active_jobs(queue):
+    job = enqueue(queue)
+    assert job["status"] == "queued" and job["phase"] == "map" and job["total_tasks"] == 3
+    assert enqueue(queue)["job_id"] == job["job_id"]
+    assert enqueue(queue, upload_id="other")["job_id"] != job["job_id"]
+
+def test_claims_map_chunks_in_order_then_the_reduce(queue):
+    job = enqueue(queue)
+    claimed = []
+    for _ in range(3):
+        work = queue.claim("w1")
+        assert work["kind"] == "map"
+        claimed.append(work["task"]["filenames"])
+        queue.complete_task(work["task"]["task_id"], "w1")
+    assert claimed == [["0.jpg", "1.jpg"], ["2.jpg", "3.jpg"], ["4.jpg"]]
+
+    job = queue.get(job["job_id"])
+    assert job["phase"] == "reduce" and job["done_tasks"] == 3 and job["progress"] == pytest.approx(0.9)
+
+    work = queue.claim("w2")
+    assert work["kind"] == "reduce" and work["job"]["worker_id"] == "w2"
+    assert queue.claim("w3") is None
+
+    queue.finish(job["job_id"], "w2", "completed")
+    job = queue.get(job["job_id"])
+    assert job["status"] == "completed" and job["progress"] == 1.0
+
+def test_higher_priority_jobs_are_claimed_first(queue):
+    enqueue(queue, upload_id="low", count=1)
+    urgent = enqueue(queue, upload_id="high", count=1, priority=5)
+    assert queue.claim("w1")["job"]["job_id"] == urgent["job_id"]
+
+def test_empty_upload_goes_straight_to_reduce(queue):
+    job = enqueue(queue, count=0)
+    assert job["phase"] == "reduce" and job["total_tasks"] == 0
+    assert queue.claim("w1")["kind"] == "reduce"
+
+def test_stale_map_task_is_requeued(queue):
+    enqueue(queue, count=1)
+    work = queue.claim("dead")
+    assert queue.claim("w2") is None
+
+    queue.stale_after = 0.01
+    time.sleep(0.05)
+    retry = queue.claim("w2")
+    assert retry["kind"] == "map" and retry["task"]["task_id"] == work["task"]["task_id"]
+
+    # The original worker no longer owns the task, so its late completion is ignored.
+    queue.complete_task(work["task"]["task_id"], "dead")
+    assert queue.get(work["job"]["job_id"])["done_tasks"] == 0
+
+def test_heartbeat_keeps_claimed_work(queue):
+    enqueue(queue, count=1)
+    work = queue.claim("w1")
+    queue.stale_after = 0.2
+    time.sleep(0.1)
+    queue.heartbeat("map", work["task"]["task_id"], "w1")
+    time.sleep(0.15)
+    assert queue.claim("w2") is None
+
+def test_stale_reduce_is_requeued(queue):
+    job = enqueue(queue, count=1)
+    finish_map_phase(queue)
+    assert queue.get(job["job_id"])["worker_id"] == "w1"
+
+    queue.stale_after = 0.01
+    time.sleep(0.05)
+    work = queue.claim("w2")
+    assert work["kind"] == "reduce" and work["job"]["worker_id"] == "w2"
+
+    # A finish from the worker that lost the reduce does not overwrite the new claim.
+    queue.finish(job["job_id"], "w1", "failed", "late")
+    assert queue.get(job["job_id"])["status"] == "running"
+
+def test_release_returns_work_to_the_queue(queue):
+    enqueue(queue, count=1)
+    work = queue.claim("w1")
+    queue.release("map", work["task"]["task_id"], "w1")
+    assert queue.claim("w2")["task"]["task_id"] == work["task"]["task_id"]
+
+def test_cancel_queued_job_settles_immediately(queue):
+    job = enqueue(queue)
+    cancelled = queue.request_cancel(job["job_id"])
+    assert cancelled["status"] == "cancelled" and cancelled["cancel_requested"]
+    assert queue.claim("w1") is None
+
+def test_cancel_waits_for_running_chunks(queue):
+    job = enqueue(queue)
+    work = queue.claim("w1")
+
+    job = queue.request_cancel(job["job_id"])
+    assert job["status"] == "running" and queue.cancel_requested(job["job_id"])
+    assert queue.claim("w2") is None
+
+    queue.cancel_task(work["task"]["task_id"], "w1")
+    assert queue.get(job["job_id"])["status"] == "cancelled"
+
+def test_cancel_during_reduce_is_left_to_the_reducer(queue):
+    job = enqueue(queue, count=1)
+    finish_map_phase(queue)
+    assert queue.request_cancel(job["job_id"])["status"] == "running"
+
+    queue.finish(job["job_id"], "w1", "cancelled")
+    assert queue.get(job["job_id"])["status"] == "cancelled"
+    assert queue.request_cancel(job["job_id"])["status"] == "cancelled"
+
+def test_failed_chunk_fails_the_job_once(queue):
+    job = enqueue(queue)
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+
+    assert queue.fail_task(first["task"]["task_id"], "w1", "boom") is True
+    assert queue.fail_task(second["task"]["task_id"], "w2", "boom again") is False
+    job = queue.get(job["job_id"])
+    assert job["status"] == "failed" and job["error"] == "boom"
+    assert queue.claim("w3") is None
+
+def test_timings_accumulate_and_status_counts(queue):
+    job = enqueue(queue, count=1)
+    queue.add_timings(job["job_id"], {"decode": 1.0})
+    queue.add_timings(job["job_id"], {"decode": 0.5, "reduce": 2.0})
+    assert queue.get(job["job_id"])["timings"] == {"decode": 1.5, "reduce": 2.0}
+    assert queue.status_counts() == {"queued": 1}
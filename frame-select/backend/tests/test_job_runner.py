@@ -0,0 +1,123 @@
+import os
+import time
+import uuid
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from core.config import settings
+from core.models import ImageScore, ResultsResponse
+from services.analyze import AnalysisService
+from services.job_queue import JobQueue
+from services.job_runner import JobRunner
+from services.storage import StorageService
+
+class StubCalculator:
+    """Stands in for ScoreCalculator so the reduce can run without models."""
+
+    def reset_for_upload(self):
+        pass
+
+    def assemble_measurement(self, filename, parts):
+        return {"filename": filename, **parts}
+
+    def add_measurement(self, measurement):
+        return 1.0
+
+    def finalize_duplicate_analysis(self, capture_times=None):
+        return {}
+
+    def score_measurement(self, measurement, variance):
+        return {"final_score": measurement["score"], "tags": [], "scores": {}}
+
+    def get_duplicate_report(self):
+        return {}
+
+@pytest.fixture
+def service():
+    service = AnalysisService(StorageService())
+    yield service
+    service.shutdown()
+
+def make_upload(count):
+    upload_id = str(uuid.uuid4())
+    upload_dir = os.path.join(settings.UPLOADS_PATH, upload_id)
+    os.makedirs(upload_dir)
+    filenames = [f"{i}.jpg" for i in range(count)]
+    for filename in filenames:
+        Image.new('RGB', (8, 8)).save(os.path.join(upload_dir, filename))
+    return upload_id, filenames
+
+def test_cancelled_reduce_keeps_the_previous_results(service, tmp_path):
+    upload_id, filenames = make_upload(3)
+    previous = ResultsResponse(
+        upload_id=upload_id,
+        images=[ImageScore(image_id=name, final_score=0.5, tags=[], scores={}, rank=1) for name in filenames],
+        metadata={"total_images": 3}
+    )
+    service.results_store.compact(upload_id, previous)
+
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"))
+    job = queue.enqueue(upload_id, filenames, chunk_size=3)
+    service.results_store.write_chunk(upload_id, job["job_id"], 0, [{"filename": name, "parts": {"score": 0.9}} for name in filenames])
+
+    checks = []
+    def cancel_after_first_image():
+        checks.append(True)
+        return len(checks) > 1
+
+    runner = JobRunner(queue, service, workers=0)
+    runner._should_cancel = lambda job_id: cancel_after_first_image
+    runner._run_reduce(job, "w1", StubCalculator())
+
+    assert not os.path.exists(service.storage.get_partial_results_path(upload_id))
+    assert not os.path.exists(service.storage.get_chunk_results_dir(upload_id, job["job_id"]))
+    results = service.results_store.load(upload_id)
+    assert results.metadata == {"total_images": 3}
+    assert [image.final_score for image in results.images] == [0.5] * 3
+
+def test_failed_map_chunk_discards_measured_chunks(service, tmp_path):
+    upload_id, filenames = make_upload(2)
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"))
+    job = queue.enqueue(upload_id, filenames, chunk_size=1)
+    service.results_store.write_chunk(upload_id, job["job_id"], 0, [{"filename": filenames[0], "parts": None}])
+
+    def broken_measure(*args, **kwargs):
+        raise RuntimeError("decoder crashed")
+    service.measure_chunk = broken_measure
+
+    work = queue.claim("w1")
+    JobRunner(queue, service, workers=0)._run_map(work["job"], work["task"], "w1", None)
+
+    assert queue.get(job["job_id"])["status"] == "failed"
+    assert not os.path.exists(service.storage.get_chunk_results_dir(upload_id, job["job_id"]))
+
+def test_workers_survive_queue_errors(service, tmp_path, monkeypatch):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"))
+    failures = {"claim": 2, "heartbeat": 2}
+    def flaky(name, method):
+        def call(*args, **kwargs):
+            if failures[name]:
+                failures[name] -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return method(*args, **kwargs)
+        return call
+    monkeypatch.setattr(queue, "claim", flaky("claim", queue.claim))
+    monkeypatch.setattr(queue, "heartbeat", flaky("heartbeat", queue.heartbeat))
+    monkeypatch.setattr(settings, "JOB_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.01)
+
+    runner = JobRunner(queue, service, workers=1)
+    runner._claimed["w0"] = ("map", 1)
+    runner.start()
+    try:
+        deadline = time.monotonic() + 5
+        while any(failures.values()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        assert not any(failures.values())
+        assert all(thread.is_alive() for thread in runner._threads)
+    finally:
+        runner.stop()
+        runner.join(timeout=1)
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.config import settings
+from core.models import ImageScore, ResultsResponse
+from services.weight_profiles import WeightProfileStore
+
+def image(image_id, **scores):
+    return ImageScore(image_id=image_id, final_score=0.0, tags=[], scores=scores)
+
+@pytest.fixture
+def upload_id(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.analysis_service, "weight_profiles", WeightProfileStore(str(tmp_path / "profiles.json")))
+    upload_id = str(uuid.uuid4())
+    main.analysis_service.results_store.compact(upload_id, ResultsResponse(
+        upload_id=upload_id,
+        images=[image("sharp.jpg", sharpness=1.0, action=0.0), image("action.jpg", sharpness=0.0, action=1.0)],
+        metadata={"total_images": 2}
+    ))
+    return upload_id
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+def rerank(client, upload_id, **request):
+    response = client.post(f"/results/{upload_id}/rerank", json=request)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_weights_override_the_profile_which_overrides_the_defaults(client, upload_id):
+    results = rerank(client, upload_id)
+    assert [i["image_id"] for i in results["images"]] == ["sharp.jpg", "action.jpg"]
+    assert results["metadata"]["weights"] == settings.SCORING_WEIGHTS
+
+    main.analysis_service.weight_profiles.save("sport", {**settings.SCORING_WEIGHTS, "action": 0.9, "sharpness": 0.05})
+    results = rerank(client, upload_id, profile="sport")
+    assert [(i["image_id"], i["rank"]) for i in results["images"]] == [("action.jpg", 1), ("sharp.jpg", 2)]
+    assert results["images"][0]["final_score"] == pytest.approx(0.9)
+    assert results["metadata"]["weight_profile"] == "sport"
+
+    results = rerank(client, upload_id, profile="sport", weights={"sharpness": 1.0})
+    assert results["images"][0]["image_id"] == "sharp.jpg"
+    assert results["metadata"]["weights"] == {**settings.SCORING_WEIGHTS, "action": 0.9, "sharpness": 1.0}
+
+def test_saved_profiles_can_be_loaded_by_name(client, upload_id):
+    saved = rerank(client, upload_id, weights={"action": 0.8}, save_as="sport")
+    assert saved["metadata"]["weight_profile"] == "sport"
+    assert client.get("/profiles").json() == [{"name": "sport", "weights": saved["metadata"]["weights"]}]
+
+    loaded = client.get(f"/results/{upload_id}", params={"profile": "sport"}).json()
+    assert loaded["images"] == saved["images"]
+    assert loaded["metadata"]["weights"] == {**settings.SCORING_WEIGHTS, "action": 0.8}
+
+@pytest.mark.parametrize("weights", [{"colour": 0.5}, {"action": -0.1}])
+def test_invalid_weights_are_rejected(client, upload_id, weights):
+    response = client.post(f"/results/{upload_id}/rerank", json={"weights": weights, "save_as": "broken"})
+    assert response.status_code == 400
+    assert main.analysis_service.weight_profiles.list() == []
+
+def test_unknown_profiles_are_not_found(client, upload_id):
+    assert client.post(f"/results/{upload_id}/rerank", json={"profile": "missing"}).status_code == 404
@@ -0,0 +1,61 @@
+import pytest
+
+from core.models import ImageScore, ResultsResponse
+from services.results_index import ResultsIndex, parse_score_bounds
+
+def image(image_id, rank, tags, **scores):
+    return ImageScore(image_id=image_id, final_score=sum(scores.values()), tags=tags, scores=scores,
+                      rank=rank, debug_info={"note": image_id})
+
+@pytest.fixture
+def index():
+    return ResultsIndex(ResultsResponse(upload_id="u", images=[
+        image("a.jpg", 1, ["sharp", "face"], sharpness=0.9, emotion=0.8),
+        image("b.jpg", 2, ["sharp"], sharpness=0.7),
+        image("c.jpg", 3, ["face", "duplicate"], sharpness=0.4, emotion=0.6),
+        image("d.jpg", 4, [], sharpness=0.2, emotion=0.1),
+    ]))
+
+def ids(page):
+    return [image["image_id"] for image in page["images"]]
+
+def test_parse_score_bounds():
+    assert parse_score_bounds(None) == {}
+    assert parse_score_bounds(["sharpness:0.6", "emotion:.5"]) == {"sharpness": 0.6, "emotion": 0.5}
+    for value in ("sharpness", "sharpness:high", ":0.5"):
+        with pytest.raises(ValueError):
+            parse_score_bounds([value])
+
+def test_tags_must_all_match_and_excluded_tags_must_not(index):
+    assert ids(index.query(tags=["face"])) == ["a.jpg", "c.jpg"]
+    assert ids(index.query(tags=["face", "sharp"])) == ["a.jpg"]
+    assert ids(index.query(tags=["unknown"])) == []
+    assert ids(index.query(exclude_tags=["duplicate", "unknown"])) == ["a.jpg", "b.jpg", "d.jpg"]
+
+def test_score_bounds_are_inclusive_and_skip_missing_scores(index):
+    assert ids(index.query(min_scores={"sharpness": 0.7})) == ["a.jpg", "b.jpg"]
+    assert ids(index.query(max_scores={"sharpness": 0.4})) == ["c.jpg", "d.jpg"]
+    # b.jpg has no emotion score, so it fails any bound on it.
+    assert ids(index.query(min_scores={"emotion": 0.0}, max_scores={"emotion": 0.8})) == ["a.jpg", "c.jpg", "d.jpg"]
+
+def test_missing_scores_sort_last_in_both_directions(index):
+    assert ids(index.query(sort="emotion")) == ["d.jpg", "c.jpg", "a.jpg", "b.jpg"]
+    assert ids(index.query(sort="emotion", descending=True)) == ["a.jpg", "c.jpg", "d.jpg", "b.jpg"]
+
+def test_pages_count_every_match(index):
+    page = index.query(offset=1, limit=2, sort="sharpness", descending=True)
+    assert page["total"] == 4
+    assert ids(page) == ["b.jpg", "c.jpg"]
+
+def test_fields_project_each_image(index):
+    assert "debug_info" not in index.query()["images"][0]
+    assert index.query(limit=1, fields=["image_id", "rank"])["images"] == [{"image_id": "a.jpg", "rank": 1}]
+    assert index.query(limit=1, fields=["debug_info"])["images"] == [{"debug_info": {"note": "a.jpg"}}]
+
+def test_unknown_fields_and_keys_are_rejected(index):
+    with pytest.raises(ValueError, match="Unknown fields: colour"):
+        index.query(fields=["image_id", "colour"])
+    with pytest.raises(ValueError, match="Cannot sort by 'colour'"):
+        index.query(sort="colour")
+    with pytest.raises(ValueError, match="Cannot filter on 'colour'"):
+        index.query(min_scores={"colour": 0.5})
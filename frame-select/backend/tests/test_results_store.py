@@ -0,0 +1,58 @@
+import os
+import uuid
+
+import pytest
+
+from core.models import ImageScore, ResultsResponse
+from services.results_store import ResultsStore
+from services.storage import StorageService
+
+def image(image_id, score):
+    return ImageScore(image_id=image_id, final_score=score, tags=[], scores={})
+
+@pytest.fixture
+def store():
+    return ResultsStore(StorageService())
+
+def test_load_reads_the_partial_log_while_a_job_writes_it(store):
+    upload_id = str(uuid.uuid4())
+    with store.open_writer(upload_id) as writer:
+        writer.append(image("a.jpg", 0.5))
+        writer.append(image("b.jpg", 0.7))
+
+    results = store.load(upload_id)
+    assert results.metadata["partial"] is True
+    assert [i.image_id for i in results.images] == ["a.jpg", "b.jpg"]
+
+def test_load_falls_back_to_the_compacted_results_when_the_log_disappears(store, monkeypatch):
+    upload_id = str(uuid.uuid4())
+    with store.open_writer(upload_id) as writer:
+        writer.append(image("a.jpg", 0.5))
+    final = ResultsResponse(upload_id=upload_id, images=[image("a.jpg", 0.5)], metadata={"total_images": 1})
+
+    # compact() removes the log between load() seeing it and reading it.
+    read_partial = store.read_partial
+    def compact_then_read(upload_id, offset=0):
+        store.compact(upload_id, final)
+        return read_partial(upload_id, offset)
+    monkeypatch.setattr(store, "read_partial", compact_then_read)
+
+    results = store.load(upload_id)
+    assert results.metadata == {"total_images": 1}
+    assert not os.path.exists(store.storage.get_partial_results_path(upload_id))
+
+def test_load_without_results_raises_file_not_found(store):
+    with pytest.raises(FileNotFoundError):
+        store.load(str(uuid.uuid4()))
+
+def test_tail_partial_returns_only_complete_records(store):
+    upload_id = str(uuid.uuid4())
+    with store.open_writer(upload_id) as writer:
+        writer.append(image("a.jpg", 0.5))
+    path = store.storage.get_partial_results_path(upload_id)
+    with open(path, 'a') as f:
+        f.write('{"image_id": "b.jp')
+
+    images, offset = store.tail_partial(upload_id)
+    assert [i.image_id for i in images] == ["a.jpg"]
+    assert store.tail_partial(upload_id, offset) == ([], offset)
@@ -0,0 +1,63 @@
+import os
+import time
+
+from services.score_cache import MeasurementCache
+
+def make_cache(tmp_path, fingerprints=None, **kwargs):
+    kwargs.setdefault("max_bytes", None)
+    kwargs.setdefault("max_age_seconds", None)
+    return MeasurementCache(str(tmp_path), fingerprints or {"sharpness": "v1", "faces": "v1"}, **kwargs)
+
+def age(cache, content_hash, seconds):
+    mtime = time.time() - seconds
+    os.utime(cache._entry_path(content_hash), (mtime, mtime))
+
+def test_get_returns_only_parts_with_current_fingerprints(tmp_path):
+    make_cache(tmp_path).put("ab" * 32, {"sharpness": 1.0, "faces": [1]})
+    cache = make_cache(tmp_path, {"sharpness": "v1", "faces": "v2"})
+    assert cache.get("ab" * 32) == {"sharpness": 1.0}
+
+def test_put_drops_parts_with_stale_fingerprints(tmp_path):
+    make_cache(tmp_path).put("ab" * 32, {"sharpness": 1.0, "faces": [1]})
+    cache = make_cache(tmp_path, {"sharpness": "v2", "faces": "v2"})
+    cache.put("ab" * 32, {"sharpness": 2.0})
+    assert cache._read("ab" * 32) == {"sharpness": {"fingerprint": "v2", "value": 2.0}}
+
+def test_prune_removes_entries_unused_for_max_age(tmp_path):
+    cache = make_cache(tmp_path, max_age_seconds=3600)
+    cache.put("aa" * 32, {"sharpness": 1.0})
+    cache.put("bb" * 32, {"sharpness": 2.0})
+    age(cache, "aa" * 32, 7200)
+
+    assert cache.prune() == 1
+    assert cache.get("aa" * 32) == {}
+    assert cache.get("bb" * 32) == {"sharpness": 2.0}
+
+def test_prune_evicts_least_recently_used_entries_beyond_max_bytes(tmp_path):
+    cache = make_cache(tmp_path)
+    hashes = [f"{i:02x}" * 32 for i in range(4)]
+    for seconds, content_hash in zip([400, 300, 200, 100], hashes):
+        cache.put(content_hash, {"sharpness": [0.5] * 100})
+        age(cache, content_hash, seconds)
+    entry_size = os.path.getsize(cache._entry_path(hashes[0]))
+
+    # Reading the oldest entry makes it the most recently used.
+    assert cache.get(hashes[0])
+    cache.max_bytes = 2 * entry_size
+    assert cache.prune() == 2
+    assert [bool(cache.get(content_hash)) for content_hash in hashes] == [True, False, False, True]
+
+def test_put_prunes_at_most_once_per_interval(tmp_path):
+    cache = make_cache(tmp_path, max_age_seconds=3600, prune_interval=3600)
+    cache.put("aa" * 32, {"sharpness": 1.0})
+    age(cache, "aa" * 32, 7200)
+
+    # The first put pruned; the next one is within the interval, even from another process.
+    other = make_cache(tmp_path, max_age_seconds=3600, prune_interval=3600)
+    other.put("bb" * 32, {"sharpness": 2.0})
+    assert cache.get("aa" * 32) == {"sharpness": 1.0}
+
+    age(cache, "aa" * 32, 7200)
+    os.utime(cache._prune_marker, (0, 0))
+    make_cache(tmp_path, max_age_seconds=3600, prune_interval=3600).put("cc" * 32, {"sharpness": 3.0})
+    assert cache.get("aa" * 32) == {}
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from pipeline.similarity import FeatureSimilarityIndex, feature_matrix
+
+def normalize(features: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+def dense_neighbors(features: np.ndarray, threshold: float):
+    """Reference: full cosine-similarity matrix."""
+    normalized = normalize(features)
+    similarities = normalized @ normalized.T
+    return {
+        i: [j for j in range(i + 1, len(features)) if similarities[i, j] >= threshold]
+        for i in range(len(features))
+    }
+
+def clustered_features(rng, clusters=20, per_cluster=5, width=32):
+    centers = rng.normal(size=(clusters, width))
+    features = np.repeat(centers, per_cluster, axis=0) + rng.normal(scale=0.02, size=(clusters * per_cluster, width))
+    features[3] = 0.0
+    return features[rng.permutation(len(features))]
+
+@pytest.mark.parametrize("block_bytes", [8, 8 * 7 * 100, 64 * 1024 * 1024])
+@pytest.mark.parametrize("threshold", [0.95, 0.99])
+def test_neighbors_match_dense_similarity(block_bytes, threshold):
+    features = clustered_features(np.random.default_rng(0))
+    neighbors = FeatureSimilarityIndex(features, block_bytes=block_bytes).neighbors(threshold)
+    expected = dense_neighbors(features, threshold)
+
+    assert any(expected.values())
+    for i in range(len(features)):
+        assert neighbors.get(i, []) == expected[i]
+
+def test_neighbors_of_subset_use_positions_in_subset():
+    features = clustered_features(np.random.default_rng(1))
+    index = FeatureSimilarityIndex(features, block_bytes=8 * 10 * 100)
+    subset = sorted(np.random.default_rng(2).choice(len(features), size=40, replace=False).tolist())
+
+    neighbors = index.neighbors(0.95, subset)
+    expected = dense_neighbors(features[subset], 0.95)
+    for i in range(len(subset)):
+        assert neighbors.get(i, []) == expected[i]
+
+def test_pairwise_matches_dense_similarity():
+    features = clustered_features(np.random.default_rng(3))
+    indices = [4, 9, 17, 30]
+    similarities = FeatureSimilarityIndex(features).pairwise(indices)
+
+    normalized = normalize(features)
+    expected = [float(normalized[i] @ normalized[j]) for a, i in enumerate(indices) for j in indices[a + 1:]]
+    assert similarities == pytest.approx(expected)
+
+def test_feature_matrix_left_pads_shorter_vectors():
+    matrix = feature_matrix([np.array([1.0, 2.0, 3.0]), np.array([5.0]), np.array([])])
+    assert matrix.tolist() == [[1.0, 2.0, 3.0], [0.0, 0.0, 5.0], [0.0, 0.0, 0.0]]
@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from core.config import settings
+from pipeline.score import ScoreCalculator
+from services.parallel import measure_files
+from services.score_cache import MeasurementCache
+
+class StubDetector:
+    """One fixed box per image, so detection features are present without loading YOLO."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, images):
+        self.calls += len(images)
+        return [(np.array([[1.0, 1.0, 20.0, 20.0]]), np.array([0.9]), np.array([0.0])) for _ in images]
+
+def calculator(triage_enabled):
+    calculator = ScoreCalculator()
+    calculator.triage.config = {**settings.TRIAGE, "enabled": triage_enabled}
+    calculator.scorers["duplicate"]._detector = StubDetector()
+    return calculator
+
+def measure(calculator, path, cache=None):
+    [(_, measurement, error)] = measure_files(calculator, [(path, "dark.jpg")], cache)
+    assert error is None
+    return measurement
+
+def test_frames_rejected_by_triage_are_detected_once_triage_is_off(tmp_path):
+    path = str(tmp_path / "dark.jpg")
+    Image.new('RGB', (64, 48), (2, 2, 2)).save(path)
+    cache = MeasurementCache(str(tmp_path / "cache"), calculator(True).part_fingerprints())
+
+    rejected = measure(calculator(True), path, cache)
+    assert rejected["triage"]["rejected"]
+    assert calculator(True).assemble_measurement("dark.jpg", cache.get(cache.content_hash(path))) is not None
+
+    cold = measure(calculator(False), path)
+    warm_calculator = calculator(False)
+    warm = measure(warm_calculator, path, cache)
+
+    assert warm_calculator.scorers["duplicate"].detector.calls == 1
+    assert len(warm["duplicate"]["features"]) == len(cold["duplicate"]["features"])
+    assert len(warm["duplicate"]["features"]) > len(rejected["duplicate"]["features"])
@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from services.video import extract_frames, frame_filename
+
+CONFIG = {
+    "interval_seconds": 0.5,
+    "check_interval_seconds": 0.1,
+    "min_hash_distance": 4,
+    "scene_threshold": 20,
+    "max_frames": 100,
+    "jpeg_quality": 90
+}
+
+def write_clip(path, scenes, seconds_per_scene=2, fps=30):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (320, 180))
+    if not writer.isOpened():
+        pytest.skip("No MPEG-4 encoder available")
+    for scene in scenes:
+        frame = cv2.resize(scene, (320, 180), interpolation=cv2.INTER_CUBIC)
+        for _ in range(seconds_per_scene * fps):
+            writer.write(frame)
+    writer.release()
+
+def test_static_scenes_yield_one_frame_each_at_their_cut(tmp_path):
+    rng = np.random.default_rng(0)
+    scenes = [rng.integers(0, 255, (18, 32, 3), dtype=np.uint8) for _ in range(3)]
+    clip = tmp_path / "clip.mp4"
+    write_clip(clip, scenes)
+
+    filenames = extract_frames(str(clip), str(tmp_path), "clip", CONFIG)
+    assert filenames == [frame_filename("clip", ms) for ms in (0, 2000, 4000)]
+    assert all((tmp_path / filename).exists() for filename in filenames)
+
+def test_max_frames_caps_sampling(tmp_path):
+    rng = np.random.default_rng(1)
+    scenes = [rng.integers(0, 255, (18, 32, 3), dtype=np.uint8) for _ in range(4)]
+    clip = tmp_path / "clip.mp4"
+    write_clip(clip, scenes, seconds_per_scene=1)
+
+    assert len(extract_frames(str(clip), str(tmp_path), "clip", {**CONFIG, "max_frames": 2})) == 2
+
+def test_unreadable_video_raises(tmp_path):
+    broken = tmp_path / "broken.mov"
+    broken.write_bytes(b"not a video")
+    with pytest.raises(ValueError):
+        extract_frames(str(broken), str(tmp_path), "broken", CONFIG)
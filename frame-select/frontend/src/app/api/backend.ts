@@ -18,6 +18,15 @@ export interface JobStatus {
   error?: string;
 }
 
+export interface JobProgress {
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+  progress: number;
+  phase: 'map' | 'reduce';
+  done_tasks: number;
+  total_tasks: number;
+  error?: string | null;
+}
+
 export interface ImageScore {
   image_id: string;
   final_score: number;
@@ -40,6 +49,15 @@ export interface DuplicateGroup {
   recommended_keep?: string;
 }
 
+export interface DuplicateBurst {
+  burst_id: number;
+  images: string[];
+  count: number;
+  source: string;
+  start?: number;
+  end?: number;
+}
+
 export interface DuplicateReport {
   summary: {
     duplicate_groups: string[][];
@@ -48,8 +66,10 @@ export interface DuplicateReport {
     cluster_groups: number;
     total_duplicates: number;
     unique_images: number;
+    bursts?: number;
   };
   groups: DuplicateGroup[];
+  bursts?: DuplicateBurst[];
   recommendations: string[];
 }
 
@@ -112,6 +132,34 @@ class BackendAPI {
     return response.json();
   }
 
+  // Follows the job's Server-Sent Events until it finishes and resolves with its final progress.
+  watchJob(jobId: string, onProgress: (progress: JobProgress) => void): Promise<JobProgress> {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${this.baseUrl}/jobs/${jobId}/events`);
+
+      source.addEventListener('progress', (event) => {
+        onProgress(JSON.parse((event as MessageEvent).data));
+      });
+
+      source.addEventListener('done', (event) => {
+        source.close();
+        resolve(JSON.parse((event as MessageEvent).data));
+      });
+
+      source.addEventListener('error', (event) => {
+        const data = (event as MessageEvent).data;
+        if (data) {
+          // Sent by the backend, e.g. when the job no longer exists.
+          source.close();
+          reject(new Error(JSON.parse(data).detail || 'Failed to follow job'));
+        } else if (source.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost connection to the backend'));
+        }
+        // Otherwise the browser is reconnecting on its own.
+      });
+    });
+  }
+
   async getResults(uploadId: string): Promise<ResultsResponse> {
     const response = await fetch(`${this.baseUrl}/results/${uploadId}`);
 
@@ -4,7 +4,7 @@ import { useState } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
 import UploadDropzone from '@/components/UploadDropzone';
-import { api, JobStatus } from '@/app/api/backend';
+import { api } from '@/app/api/backend';
 
 export default function UploadPage() {
   const [files, setFiles] = useState<File[]>([]);
@@ -39,21 +39,14 @@ export default function UploadPage() {
 
       const analyzeResponse = await api.analyze(uploadResponse.upload_id);
       
-      const jobId = analyzeResponse.job_id;
-      let jobStatus: JobStatus;
-      
-      do {
-        await new Promise(resolve => setTimeout(resolve, 1000));
-        jobStatus = await api.getJobStatus(jobId);
-        
-        setProgress(jobStatus.progress * 100);
+      const jobStatus = await api.watchJob(analyzeResponse.job_id, (update) => {
+        setProgress(update.progress * 100);
         
-        if (jobStatus.status === 'running') {
-          const processed = Math.floor(jobStatus.progress * uploadResponse.count);
+        if (update.status === 'running') {
+          const processed = Math.floor(update.progress * uploadResponse.count);
           setCurrentStep(`Analyzing ${processed} of ${uploadResponse.count} images...`);
         }
-        
-      } while (jobStatus.status === 'queued' || jobStatus.status === 'running');
+      });
 
       if (jobStatus.status === 'completed') {
         router.push(`/results/${uploadResponse.upload_id}`);
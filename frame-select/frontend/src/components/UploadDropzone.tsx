@@ -25,7 +25,7 @@ export default function UploadDropzone({ onFilesSelected }: UploadDropzoneProps)
     setIsDragOver(false);
     
     const files = Array.from(e.dataTransfer.files).filter(file => 
-      file.type.startsWith('image/')
+      file.type.startsWith('image/') || file.type.startsWith('video/')
     );
     
     if (files.length > 0) {
@@ -55,7 +55,7 @@ export default function UploadDropzone({ onFilesSelected }: UploadDropzoneProps)
       <input
         type="file"
         multiple
-        accept="image/*"
+        accept="image/*,video/*"
         onChange={handleFileInput}
         ref={fileInputRef}
         style={{ display: 'none' }}
@@ -71,7 +71,7 @@ export default function UploadDropzone({ onFilesSelected }: UploadDropzoneProps)
         <h3>Select or Drop Images</h3>
         <p>
           Choose multiple photos from your sports burst sequences.<br/>
-          Supports JPG, PNG, TIFF, and other image formats.
+          Supports JPG, PNG, TIFF, and other image formats, or MP4, MOV and other video clips.
         </p>
         <button className="button" type="button">
           Browse Files